@@ -1,41 +1,39 @@
 import selenium
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait, Select
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.action_chains import ActionChains
-from selenium.common.exceptions import TimeoutException, NoSuchElementException, ElementClickInterceptedException, StaleElementReferenceException
+from selenium.common.exceptions import TimeoutException, ElementClickInterceptedException, StaleElementReferenceException
 import pandas as pd
 import time
 from datetime import datetime
 import logging
 import os
-import re
+
+from pmo_driver import create_chrome_driver
+from pmo_pacing import Pacer, postback_idle, scorecard_tree_present, modal_closed, STABILITY_WINDOW
+from pmo_grid import BASE_URL, LOGIN_PATH, should_skip_store
+from pmo_runner import ExtractionRunner
+from pmo_backends import (SeleniumBackend, FAILURE_STALE_NODE, FAILURE_EMPTY_GRID,
+                          FAILURE_MODAL_FAILED)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# 🆕 Keywords untuk filter toko yang harus di-skip
-SKIP_KEYWORDS = ['tutup', 'renovasi', 'maintenance', 'pindah', 'closed', 'relokasi','Tutup','(Tutup)','(tutup)']
-
-def should_skip_store(store_name):
-    """Check if store should be skipped based on keywords"""
-    for keyword in SKIP_KEYWORDS:
-        if re.search(rf'\b{keyword}\b', store_name, re.IGNORECASE):
-            logger.info(f"⏭️  SKIPPED ({keyword.title()}): {store_name}")
-            return True
-    return False
-
 class PMODataExtractor:
+    EMPTY_REVENUE_RETRIES = 2  # re-reads of a blank Revenue cell before it is recorded as 0
+
     def __init__(self, username, password, year=None, month=None, target_regionals=None, 
-                 headless=False, extract_scores=False):
+                 headless=False, extract_scores=False, performance_profile=False,
+                 pacing_profile=None):
         self.username = username
         self.password = password
         self.driver = None
         self.wait = None
-        self.setup_driver(headless)
+        self.last_failure = None  # FAILURE_* kind of the last failed store selection
+        self.pacer = Pacer(pacing_profile)
+        self.setup_driver(headless, performance_profile)
         
         self.target_regionals = target_regionals or ['E']
         self.extract_scores = extract_scores  # 🆕 Flag untuk memilih antara score atau financial data
@@ -49,22 +47,12 @@ class PMODataExtractor:
             self.current_month = current_date.month
         
         self.results = []
-        self.last_extracted_values = {}
     
-    def setup_driver(self, headless=False):
+    def setup_driver(self, headless=False, performance_profile=False):
         """Initialize Chrome driver with options"""
-        chrome_options = Options()
-        if headless:
-            chrome_options.add_argument('--headless')
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        chrome_options.add_argument('--disable-gpu')
-        chrome_options.add_argument('--window-size=1920,1080')
-        chrome_options.add_argument('--disable-blink-features=AutomationControlled')
-        
+        self.driver_settings = {'headless': headless, 'performance_profile': performance_profile}
         try:
-            self.driver = webdriver.Chrome(options=chrome_options)
-            self.driver.maximize_window()
+            self.driver = create_chrome_driver(headless, performance_profile)
             self.wait = WebDriverWait(self.driver, 30)
             logger.info("Chrome driver initialized successfully")
         except Exception as e:
@@ -75,7 +63,7 @@ class PMODataExtractor:
         """Handle login process"""
         try:
             logger.info("Navigating to login page")
-            self.driver.get("https://pmo.mykg.id/Systems/Login.aspx")
+            self.driver.get(f"{BASE_URL}{LOGIN_PATH}")
             
             username_field = self.wait.until(
                 EC.presence_of_element_located((By.ID, "txt_UserID"))
@@ -119,7 +107,8 @@ class PMODataExtractor:
             
             actions = ActionChains(self.driver)
             actions.move_to_element(performance_menu).perform()
-            time.sleep(3)
+            self.pacer.settle('menu_hover', 3, ready=lambda: self.driver.find_element(
+                By.ID, "ctl00_MenuControlHorizontal1_NavigationMenu:submenu:16").is_displayed())
             
             submenu = self.wait.until(
                 EC.visibility_of_element_located((By.ID, "ctl00_MenuControlHorizontal1_NavigationMenu:submenu:16"))
@@ -162,7 +151,7 @@ class PMODataExtractor:
                 EC.presence_of_element_located((By.ID, "ctl00_ContentPlaceHolder1_ddlPeriod"))
             ))
             year_dropdown.select_by_visible_text(self.current_year)
-            time.sleep(3)
+            self.pacer.settle('period_postback', 3, ready=lambda: postback_idle(self.driver))
             
             month_dropdown = Select(self.driver.find_element(By.ID, "ctl00_ContentPlaceHolder1_ddlMonth"))
             month_names = ["January", "February", "March", "April", "May", "June",
@@ -170,7 +159,7 @@ class PMODataExtractor:
             
             selected_month_name = month_names[self.current_month - 1]
             month_dropdown.select_by_visible_text(selected_month_name)
-            time.sleep(3)
+            self.pacer.settle('period_postback', 3, ready=lambda: postback_idle(self.driver))
             
             logger.info(f"Year and month selected successfully: {self.current_year} - {selected_month_name}")
             
@@ -184,7 +173,7 @@ class PMODataExtractor:
             try:
                 logger.info(f"Attempting to click View Other Scorecard (attempt {attempt + 1}/{max_attempts})")
                 
-                time.sleep(5)
+                self.pacer.settle('postback', 5, ready=lambda: postback_idle(self.driver))
                 
                 view_btn = self.wait.until(
                     EC.element_to_be_clickable((By.ID, "ctl00_ContentPlaceHolder1_btnViewOtherSCO"))
@@ -193,18 +182,18 @@ class PMODataExtractor:
                 try:
                     view_btn.click()
                     logger.info("View Other Scorecard button clicked successfully")
-                    time.sleep(5)
+                    self.pacer.settle('modal_open', 5, ready=lambda: scorecard_tree_present(self.driver))
                     return True
                 except ElementClickInterceptedException:
                     logger.warning("Regular click intercepted, trying JavaScript click")
                     self.driver.execute_script("arguments[0].click();", view_btn)
-                    time.sleep(5)
+                    self.pacer.settle('modal_open', 5, ready=lambda: scorecard_tree_present(self.driver))
                     return True
                     
             except Exception as e:
                 logger.warning(f"Attempt {attempt + 1} failed: {e}")
                 if attempt < max_attempts - 1:
-                    time.sleep(5)
+                    self.pacer.retry_sleep(5)
                     continue
                 else:
                     logger.error(f"All {max_attempts} attempts failed to click View Other Scorecard")
@@ -221,7 +210,7 @@ class PMODataExtractor:
             try:
                 logger.info(f"Getting stores for Regional {regional_letter} (attempt {attempt + 1})")
                 
-                time.sleep(5)
+                self.pacer.settle('modal_open', 5, ready=lambda: scorecard_tree_present(self.driver))
                 
                 regional_divs = {
                     'A': 'ctl00_ContentPlaceHolder1_OrganizationTreeView1_tvHierarchyn22Nodes',
@@ -276,13 +265,13 @@ class PMODataExtractor:
                 else:
                     logger.warning(f"No stores found in Regional {regional_letter} on attempt {attempt + 1}")
                     if attempt < max_attempts - 1:
-                        time.sleep(3)
+                        self.pacer.retry_sleep(3)
                         continue
                 
             except Exception as e:
                 logger.error(f"Attempt {attempt + 1} failed to get stores for regional {regional_letter}: {e}")
                 if attempt < max_attempts - 1:
-                    time.sleep(3)
+                    self.pacer.retry_sleep(3)
                     continue
         
         logger.error(f"Failed to get stores for Regional {regional_letter} after all attempts")
@@ -313,6 +302,7 @@ class PMODataExtractor:
             stable_count = 0
             required_stable_count = 3
             last_value = None
+            changed_at = start_time
             
             while time.time() - start_time < max_wait_time:
                 try:
@@ -323,10 +313,13 @@ class PMODataExtractor:
                         stable_count += 1
                         logger.info(f"Value stable ({stable_count}/{required_stable_count}): {current_value}")
                         
-                        if stable_count >= required_stable_count:
+                        if stable_count >= required_stable_count and \
+                                time.time() - changed_at >= STABILITY_WINDOW:
                             logger.info(f"Data has stabilized for {store_name}: {'Total Score' if self.extract_scores else 'Revenue'} = {current_value}")
                             
-                            time.sleep(2)
+                            # How long the grid took to show its final value sets the poll interval
+                            self.pacer.observe('stability_poll', changed_at - start_time)
+                            self.pacer.settle('data_settle', 2, ready=lambda: postback_idle(self.driver))
                             
                             # Additional verification based on extraction type
                             if self.extract_scores:
@@ -351,17 +344,18 @@ class PMODataExtractor:
                             logger.info(f"Value changed from '{last_value}' to '{current_value}' - resetting stability counter")
                         stable_count = 0
                         last_value = current_value
+                        changed_at = time.time()
                     
-                    time.sleep(1.5)
+                    self.pacer.sleep('stability_poll', 1.5)
                     
                 except StaleElementReferenceException:
                     logger.warning("Stale element during data refresh wait")
                     stable_count = 0
-                    time.sleep(2)
+                    self.pacer.retry_sleep(2)
                     continue
                 except Exception as e:
                     logger.warning(f"Error during stability check: {e}")
-                    time.sleep(2)
+                    self.pacer.retry_sleep(2)
                     continue
             
             logger.warning(f"Data refresh timeout for {store_name} after {max_wait_time}s")
@@ -390,8 +384,9 @@ class PMODataExtractor:
                 
                 if not target_store:
                     logger.error(f"Could not find store '{store_name}' in fresh store list")
+                    self.last_failure = FAILURE_STALE_NODE if fresh_stores else FAILURE_MODAL_FAILED
                     if attempt < max_attempts - 1:
-                        time.sleep(3)
+                        self.pacer.retry_sleep(3)
                         continue
                     else:
                         return False
@@ -399,7 +394,7 @@ class PMODataExtractor:
                 store_element = target_store['element']
                 
                 self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", store_element)
-                time.sleep(2)
+                self.pacer.settle('scroll', 2, ready=lambda: postback_idle(self.driver))
                 
                 try:
                     store_element.click()
@@ -413,322 +408,33 @@ class PMODataExtractor:
                     return True
                 else:
                     logger.warning(f"Data refresh verification failed for {store_name}")
+                    self.last_failure = FAILURE_EMPTY_GRID
                     if attempt < max_attempts - 1:
-                        time.sleep(5)
+                        self.pacer.retry_sleep(5)
                         continue
                     else:
                         return False
                     
             except StaleElementReferenceException:
                 logger.warning(f"Stale element reference for store '{store_name}' on attempt {attempt + 1}")
+                self.last_failure = FAILURE_STALE_NODE
                 if attempt < max_attempts - 1:
-                    time.sleep(3)
+                    self.pacer.retry_sleep(3)
                     continue
             except Exception as e:
                 logger.error(f"Error selecting store '{store_name}' on attempt {attempt + 1}: {e}")
                 if attempt < max_attempts - 1:
-                    time.sleep(3)
+                    self.pacer.retry_sleep(3)
                     continue
         
         logger.error(f"Failed to select store '{store_name}' after all attempts")
         return False
     
-    def extract_score_data(self):
-        """Extract all score metrics from the page"""
-        scores = {}
-        
-        # 🆕 Mapping of score types to their element IDs
-        score_mapping = {
-            'Financial_Score': 'ctl00_ContentPlaceHolder1_lblAchievementYTD_F',
-            'Customer_Score': 'ctl00_ContentPlaceHolder1_lblAchievementYTD_CS',
-            'Internal_Business_Process_Score': 'ctl00_ContentPlaceHolder1_lblAchievementYTD_IBP',
-            'Learning_and_Growth_Score': 'ctl00_ContentPlaceHolder1_lblAchievementYTD_LG',
-            'Total_Score': 'ctl00_ContentPlaceHolder1_lblAchievementYTD_Total'
-        }
-        
-        for score_name, element_id in score_mapping.items():
-            try:
-                score_element = self.driver.find_element(By.ID, element_id)
-                score_value = score_element.text.strip()
-                
-                # Clean and convert the score value
-                if score_value == "-" or score_value == "":
-                    scores[score_name] = 0.0
-                else:
-                    try:
-                        scores[score_name] = float(score_value)
-                    except ValueError:
-                        scores[score_name] = 0.0
-                        logger.warning(f"Could not convert {score_name} value to float: '{score_value}'")
-                
-                logger.info(f"{score_name.replace('_', ' ')}: {scores[score_name]}")
-                
-            except NoSuchElementException:
-                logger.warning(f"Score element not found: {element_id}")
-                scores[score_name] = 0.0
-            except Exception as e:
-                logger.error(f"Error extracting {score_name}: {e}")
-                scores[score_name] = 0.0
-        
-        return scores
-    
-    def extract_metric_by_id(self, metric_name, control_number, max_attempts=3):
-        """Extract achievement data with improved error handling and retry"""
-        for attempt in range(max_attempts):
-            try:
-                element_id = f"ctl00_ContentPlaceHolder1_grvScorecard_ctl0{control_number}_lblYTDAchievement{self.current_month}"
-                
-                logger.info(f"Extracting {metric_name} (ID: {element_id}, attempt {attempt + 1})")
-                
-                achievement_element = self.wait.until(
-                    EC.presence_of_element_located((By.ID, element_id))
-                )
-                
-                time.sleep(1.5)
-                
-                achievement_element = self.driver.find_element(By.ID, element_id)
-                value = achievement_element.text.strip()
-                
-                logger.info(f"{metric_name} raw value: '{value}'")
-                
-                if value == "-" or value == "" or value is None:
-                    if attempt < max_attempts - 1 and metric_name == "Revenue":
-                        logger.warning(f"Revenue empty on attempt {attempt + 1}, retrying...")
-                        time.sleep(3)
-                        continue
-                    return 0.0
-                else:
-                    clean_value = value.replace(",", "")
-                    try:
-                        return float(clean_value)
-                    except ValueError:
-                        logger.warning(f"Could not convert {metric_name} value to float: '{value}'")
-                        if attempt < max_attempts - 1:
-                            time.sleep(2)
-                            continue
-                        return 0.0
-                    
-            except TimeoutException:
-                logger.warning(f"Timeout for {metric_name} (attempt {attempt + 1})")
-                if attempt < max_attempts - 1:
-                    time.sleep(2)
-                    continue
-                return 0.0
-            except NoSuchElementException:
-                logger.warning(f"Element not found for {metric_name}")
-                if attempt < max_attempts - 1:
-                    time.sleep(2)
-                    continue
-                return 0.0
-            except Exception as e:
-                logger.error(f"Error extracting {metric_name}: {e}")
-                if attempt < max_attempts - 1:
-                    time.sleep(2)
-                    continue
-                return 0.0
-        
-        return 0.0
-    
-    def detect_store_structure_prioritize_operating_profit(self):
-        """
-        Detect store structure by checking which control has 'Operating Profit' label.
-        - Control 06 has 'Operating Profit' label → NO EBITDA
-        - Control 07 has 'Operating Profit' label → HAS EBITDA (ctl06 is EBITDA)
-        """
-        try:
-            logger.info("Detecting store structure by checking Operating Profit label position")
-            
-            time.sleep(2)
-            
-            # Check control 06 label
-            label_06_id = "ctl00_ContentPlaceHolder1_grvScorecard_ctl06_lblKPI"
-            label_07_id = "ctl00_ContentPlaceHolder1_grvScorecard_ctl07_lblKPI"
-            
-            label_06_text = None
-            label_07_text = None
-            
-            # Try to get label text from control 06
-            try:
-                label_06_element = self.driver.find_element(By.ID, label_06_id)
-                label_06_text = label_06_element.text.strip()
-                logger.info(f"Control 06 label: '{label_06_text}'")
-            except Exception as e:
-                logger.warning(f"Could not read control 06 label: {e}")
-            
-            # Try to get label text from control 07
-            try:
-                label_07_element = self.driver.find_element(By.ID, label_07_id)
-                label_07_text = label_07_element.text.strip()
-                logger.info(f"Control 07 label: '{label_07_text}'")
-            except Exception as e:
-                logger.warning(f"Could not read control 07 label: {e}")
-            
-            # Decision logic: Check which control has "Operating Profit" in the label
-            
-            # Case 1: Control 06 has "Operating Profit" → NO EBITDA
-            if label_06_text and "Operating Profit" in label_06_text:
-                logger.info("=" * 60)
-                logger.info("✓ Control 06 label contains 'Operating Profit'")
-                logger.info("  → Store has NO EBITDA")
-                logger.info("  → Operating Profit at control 06")
-                logger.info("=" * 60)
-                
-                return {
-                    'operating_profit_position': 6,
-                    'ebitda_position': None,
-                    'has_ebitda': False,
-                    'structure_type': 'no_ebitda_op_at_06'
-                }
-            
-            # Case 2: Control 07 has "Operating Profit" → HAS EBITDA
-            if label_07_text and "Operating Profit" in label_07_text:
-                logger.info("=" * 60)
-                logger.info("✓ Control 07 label contains 'Operating Profit'")
-                logger.info("  → Store HAS EBITDA")
-                logger.info("  → EBITDA at control 06")
-                logger.info("  → Operating Profit at control 07")
-                logger.info("=" * 60)
-                
-                return {
-                    'operating_profit_position': 7,
-                    'ebitda_position': 6,
-                    'has_ebitda': True,
-                    'structure_type': 'has_ebitda_op_at_07'
-                }
-            
-            # Fallback: If we can't read labels, assume NO EBITDA (safest default)
-            logger.warning("Could not determine structure from labels, defaulting to NO EBITDA")
-            logger.info("=" * 60)
-            logger.info("⚠ Fallback: Assuming NO EBITDA structure")
-            logger.info("  → Operating Profit at control 06")
-            logger.info("=" * 60)
-            
-            return {
-                'operating_profit_position': 6,
-                'ebitda_position': None,
-                'has_ebitda': False,
-                'structure_type': 'fallback_no_ebitda'
-            }
-                
-        except Exception as e:
-            logger.error(f"Error detecting store structure: {e}")
-            return {
-                'operating_profit_position': 6,
-                'ebitda_position': None,
-                'has_ebitda': False,
-                'structure_type': 'error_fallback'
-            }
-    
-    def extract_store_data(self, store_info):
-        """Extract all metrics data for a store"""
-        try:
-            store_name = store_info['name']
-            regional = store_info['regional']
-            
-            logger.info(f"Extracting data for {store_name} (Regional {regional})")
-            
-            time.sleep(10)
-            
-            if self.extract_scores:
-                # 🆕 Extract score data
-                scores = self.extract_score_data()
-                
-                result = {
-                    'Regional': regional,
-                    'Store': store_name,
-                    'Year': self.current_year,
-                    'Month': self.current_month,
-                    'Financial_Score': scores['Financial_Score'],
-                    'Customer_Score': scores['Customer_Score'],
-                    'Internal_Business_Process_Score': scores['Internal_Business_Process_Score'],
-                    'Learning_and_Growth_Score': scores['Learning_and_Growth_Score'],
-                    'Total_Score': scores['Total_Score'],
-                    'Error_Message': 'None',
-                    'Extraction_DateTime': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                }
-            else:
-                # Original financial data extraction
-                revenue = self.extract_metric_by_id("Revenue", 2, max_attempts=3)
-                cogs = self.extract_metric_by_id("COGS", 3)
-                cogs_to_revenue = self.extract_metric_by_id("COGS to Revenue", 4)
-                operating_expense = self.extract_metric_by_id("Operating Expense", 5)
-                
-                structure_info = self.detect_store_structure_prioritize_operating_profit()
-                
-                operating_profit = self.extract_metric_by_id("Operating Profit", 
-                                                             structure_info['operating_profit_position'])
-                
-                ebitda = 0.0
-                if structure_info['has_ebitda'] and structure_info['ebitda_position']:
-                    ebitda = self.extract_metric_by_id("EBITDA", structure_info['ebitda_position'])
-                
-                logger.info(f"Final extracted values - OP: {operating_profit}, EBITDA: {ebitda}, Revenue: {revenue}")
-                
-                result = {
-                    'Regional': regional,
-                    'Store': store_name,
-                    'Year': self.current_year,
-                    'Month': self.current_month,
-                    'Revenue_ACH': revenue,
-                    'COGS_ACH': cogs,
-                    'COGS_to_Revenue_ACH': cogs_to_revenue,
-                    'Operating_Expense_ACH': operating_expense,
-                    'EBITDA_ACH': ebitda,
-                    'Operating_Profit_ACH': operating_profit,
-                    'Has_EBITDA': structure_info['has_ebitda'],
-                    'Structure_Type': structure_info['structure_type'],
-                    'OP_Position': structure_info['operating_profit_position'],
-                    'EBITDA_Position': structure_info.get('ebitda_position', 'N/A'),
-                    'Error_Message': 'None',
-                    'Extraction_DateTime': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                }
-            
-            self.results.append(result)
-            logger.info(f"✓ Data extracted successfully for {store_name}")
-            
-        except Exception as e:
-            logger.error(f"Error extracting data for {store_info['name']}: {e}")
-            
-            # Create error record
-            result = {
-                'Regional': store_info['regional'],
-                'Store': store_info['name'],
-                'Year': self.current_year,
-                'Month': self.current_month,
-                'Error_Message': str(e),
-                'Extraction_DateTime': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            }
-            
-            # Fill with zeros for all metrics if error
-            if self.extract_scores:
-                result.update({
-                    'Financial_Score': 0.0,
-                    'Customer_Score': 0.0,
-                    'Internal_Business_Process_Score': 0.0,
-                    'Learning_and_Growth_Score': 0.0,
-                    'Total_Score': 0.0
-                })
-            else:
-                result.update({
-                    'Revenue_ACH': 0.0,
-                    'COGS_ACH': 0.0,
-                    'COGS_to_Revenue_ACH': 0.0,
-                    'Operating_Expense_ACH': 0.0,
-                    'EBITDA_ACH': 0.0,
-                    'Operating_Profit_ACH': 0.0,
-                    'Has_EBITDA': False,
-                    'Structure_Type': 'error',
-                    'OP_Position': 0,
-                    'EBITDA_Position': 'N/A'
-                })
-            
-            self.results.append(result)
-    
     def close_modal_if_open(self, max_attempts=3):
         """Check if modal is open and close it if needed"""
         for attempt in range(max_attempts):
             try:
-                time.sleep(3)
+                self.pacer.settle('postback', 3, ready=lambda: postback_idle(self.driver))
                 
                 close_buttons = self.driver.find_elements(By.XPATH, "//input[@value='Close']")
                 
@@ -736,12 +442,12 @@ class PMODataExtractor:
                     if close_btn.is_displayed():
                         try:
                             close_btn.click()
-                            time.sleep(3)
+                            self.pacer.settle('modal_close', 3, ready=lambda: modal_closed(self.driver))
                             logger.info("Modal closed successfully")
                             return True
                         except:
                             self.driver.execute_script("arguments[0].click();", close_btn)
-                            time.sleep(3)
+                            self.pacer.settle('modal_close', 3, ready=lambda: modal_closed(self.driver))
                             logger.info("Modal closed with JavaScript click")
                             return True
                 
@@ -751,149 +457,25 @@ class PMODataExtractor:
             except Exception as e:
                 logger.warning(f"Attempt {attempt + 1} to close modal failed: {e}")
                 if attempt < max_attempts - 1:
-                    time.sleep(3)
+                    self.pacer.retry_sleep(3)
                     continue
                     
         logger.warning("Could not close modal after all attempts")
         return False
     
-    def process_regional(self, regional_letter):
-        """Process all stores in a regional with improved error handling"""
-        try:
-            logger.info(f"Processing Regional {regional_letter}")
-            
-            if not self.click_view_other_scorecard():
-                logger.error(f"Failed to open modal for Regional {regional_letter}")
-                return
-            
-            stores = self.get_stores_by_regional_fresh(regional_letter)
-            
-            if not stores:
-                logger.warning(f"No stores found for Regional {regional_letter}")
-                return
-            
-            logger.info(f"Found {len(stores)} stores in Regional {regional_letter}")
-            
-            successful_stores = 0
-            failed_stores = 0
-            
-            for i, store_info in enumerate(stores):
-                store_name = store_info['name']
-                
-                try:
-                    logger.info(f"\n{'='*60}")
-                    logger.info(f"Processing store {i+1}/{len(stores)}: {store_name}")
-                    logger.info(f"{'='*60}\n")
-                    
-                    if self.select_store_robust(store_info):
-                        self.extract_store_data(store_info)
-                        successful_stores += 1
-                        
-                        time.sleep(5)
-                    else:
-                        logger.error(f"Failed to select store: {store_name}")
-                        self.add_error_record(store_info, "Failed to select store")
-                        failed_stores += 1
-                    
-                    if i < len(stores) - 1:
-                        logger.info("Preparing for next store selection...")
-                        
-                        self.close_modal_if_open()
-                        time.sleep(6)
-                        
-                        if not self.click_view_other_scorecard():
-                            logger.error("Failed to reopen modal for next store")
-                            time.sleep(3)
-                        
-                except Exception as e:
-                    logger.error(f"Error processing store {store_name}: {e}")
-                    self.add_error_record(store_info, f"Processing error: {str(e)}")
-                    failed_stores += 1
-                    
-                    if i < len(stores) - 1:
-                        try:
-                            logger.info("Attempting recovery for next store...")
-                            self.close_modal_if_open()
-                            time.sleep(5)
-                            if not self.click_view_other_scorecard():
-                                logger.warning("Recovery attempt failed, but continuing...")
-                        except:
-                            logger.warning("Recovery attempt had errors, but continuing...")
-                    
-                    continue
-            
-            logger.info(f"\n{'='*60}")
-            logger.info(f"Regional {regional_letter} processing complete:")
-            logger.info(f"  ✓ Successful: {successful_stores}")
-            logger.info(f"  ✗ Failed: {failed_stores}")
-            logger.info(f"{'='*60}\n")
-                        
-        except Exception as e:
-            logger.error(f"Critical error processing Regional {regional_letter}: {e}")
-        finally:
-            try:
-                self.close_modal_if_open()
-            except:
-                pass
-    
-    def add_error_record(self, store_info, error_message):
-        """Add an error record for a failed store extraction"""
-        try:
-            if self.extract_scores:
-                result = {
-                    'Regional': store_info['regional'],
-                    'Store': store_info['name'],
-                    'Year': self.current_year,
-                    'Month': self.current_month,
-                    'Financial_Score': 0,
-                    'Customer_Score': 0,
-                    'Internal_Business_Process_Score': 0,
-                    'Learning_and_Growth_Score': 0,
-                    'Total_Score': 0,
-                    'Error_Message': error_message,
-                    'Extraction_DateTime': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                }
-            else:
-                result = {
-                    'Regional': store_info['regional'],
-                    'Store': store_info['name'],
-                    'Year': self.current_year,
-                    'Month': self.current_month,
-                    'Revenue_ACH': 0,
-                    'COGS_ACH': 0,
-                    'COGS_to_Revenue_ACH': 0,
-                    'Operating_Expense_ACH': 0,
-                    'EBITDA_ACH': 0,
-                    'Operating_Profit_ACH': 0,
-                    'Has_EBITDA': False,
-                    'Structure_Type': 'error',
-                    'OP_Position': 'N/A',
-                    'EBITDA_Position': 'N/A',
-                    'Error_Message': error_message,
-                    'Extraction_DateTime': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                }
-            
-            self.results.append(result)
-            logger.info(f"Added error record for {store_info['name']}: {error_message}")
-        except Exception as e:
-            logger.error(f"Failed to add error record: {e}")
-    
     def run_extraction(self):
         """Main extraction process"""
         try:
-            self.login()
-            self.navigate_to_dashboard()
-            self.select_year_and_month()
-            
-            for regional in self.target_regionals:
-                try:
-                    self.last_extracted_values = {}
-                    self.process_regional(regional)
-                except Exception as e:
-                    logger.error(f"Failed to process Regional {regional}: {e}")
-                    continue
-            
-            self.save_results()
+            extract_type = "legacy_scores" if self.extract_scores else "legacy_financial"
+            runner = ExtractionRunner.from_env(SeleniumBackend(self), self.target_regionals,
+                                               self.current_year, self.current_month, extract_type,
+                                               on_record=self.results.append)
+            try:
+                runner.run()
+                
+                self.save_results()
+            finally:
+                runner.finish()
             
         except Exception as e:
             logger.error(f"Extraction failed: {e}")
@@ -930,114 +512,6 @@ class PMODataExtractor:
             logger.error(f"Error saving CSV: {e}")
             return False
 
-    def run(self):
-        """Main execution method"""
-        try:
-            logger.info("=" * 60)
-            logger.info("Starting PMO Data Extractor")
-            logger.info(f"Year: {self.current_year}, Month: {self.current_month}")
-            logger.info(f"Target Regionals: {self.target_regionals}")
-            logger.info(f"Extracting: {'Scores' if self.extract_scores else 'Financial Data'}")
-            logger.info("=" * 60)
-            
-            # Step 1: Login
-            self.login()
-            
-            # Step 2: Navigate to dashboard
-            self.navigate_to_dashboard()
-            
-            # Step 3: Select year and month
-            self.select_year_and_month()
-            
-            # Step 4: Click View Other Scorecard
-            if not self.click_view_other_scorecard():
-                logger.error("Failed to click View Other Scorecard. Exiting.")
-                return False
-            
-            # Step 5: Process each regional
-            for regional in self.target_regionals:
-                logger.info(f"\n{'='*50}")
-                logger.info(f"Processing Regional {regional}")
-                logger.info(f"{'='*50}")
-                
-                # Get all stores for this regional
-                stores = self.get_stores_by_regional_fresh(regional)
-                
-                if not stores:
-                    logger.warning(f"No active stores found in Regional {regional}")
-                    continue
-                
-                logger.info(f"Found {len(stores)} active stores to process")
-                
-                # Process each store
-                for i, store in enumerate(stores, 1):
-                    logger.info(f"\n[{i}/{len(stores)}] Processing store: {store['name']}")
-                    
-                    # Select the store
-                    if self.select_store_robust(store):
-                        # Extract data
-                        self.extract_store_data(store)
-                    else:
-                        logger.error(f"Failed to select store: {store['name']}")
-                        
-                        # Add error record
-                        error_result = {
-                            'Regional': regional,
-                            'Store': store['name'],
-                            'Year': self.current_year,
-                            'Month': self.current_month,
-                            'Error_Message': 'Failed to select store',
-                            'Extraction_DateTime': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                        }
-                        
-                        # Add zeros for all metrics
-                        if self.extract_scores:
-                            error_result.update({
-                                'Financial_Score': 0.0,
-                                'Customer_Score': 0.0,
-                                'Internal_Business_Process_Score': 0.0,
-                                'Learning_and_Growth_Score': 0.0,
-                                'Total_Score': 0.0
-                            })
-                        else:
-                            error_result.update({
-                                'Revenue_ACH': 0.0,
-                                'COGS_ACH': 0.0,
-                                'COGS_to_Revenue_ACH': 0.0,
-                                'Operating_Expense_ACH': 0.0,
-                                'EBITDA_ACH': 0.0,
-                                'Operating_Profit_ACH': 0.0,
-                                'Has_EBITDA': False,
-                                'Structure_Type': 'error',
-                                'OP_Position': 0,
-                                'EBITDA_Position': 'N/A'
-                            })
-                        
-                        self.results.append(error_result)
-                    
-                    # Small delay between stores
-                    time.sleep(2)
-            
-            # Step 6: Save results to CSV
-            if self.results:
-                self.save_to_csv()
-                logger.info(f"\n{'='*60}")
-                logger.info(f"EXTRACTION COMPLETE!")
-                logger.info(f"Total stores processed: {len(self.results)}")
-                logger.info(f"{'='*60}")
-            else:
-                logger.warning("No data was extracted")
-            
-            # Step 7: Close driver
-            self.driver.quit()
-            return True
-            
-        except Exception as e:
-            logger.error(f"Critical error in run method: {e}")
-            if self.driver:
-                self.driver.quit()
-            return False
-
     def save_results(self):
         """Save extracted data to CSV with summary"""
         try:
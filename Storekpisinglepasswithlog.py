@@ -1,301 +1,34 @@
-import json
-import csv
-import sqlite3
 from datetime import datetime
 import selenium
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait, Select
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.action_chains import ActionChains
-from selenium.common.exceptions import TimeoutException, NoSuchElementException, ElementClickInterceptedException, StaleElementReferenceException
-import pandas as pd
+from selenium.common.exceptions import TimeoutException, ElementClickInterceptedException, StaleElementReferenceException
 import time
 import logging
 import os
-import re
+
+from pmo_driver import create_chrome_driver
+from pmo_pacing import Pacer, postback_idle, scorecard_tree_present, modal_closed, STABILITY_WINDOW
+from pmo_grid import BASE_URL, LOGIN_PATH, should_skip_store
+from pmo_storage import DataStorage
+from pmo_runner import ExtractionRunner
+from pmo_prewarm import Prewarm
+from pmo_backends import (SeleniumBackend, FAILURE_STALE_NODE, FAILURE_EMPTY_GRID,
+                          FAILURE_MODAL_FAILED)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Keywords untuk filter toko yang harus di-skip
-SKIP_KEYWORDS = ['tutup', 'renovasi', 'maintenance', 'pindah', 'closed', 'relokasi','Tutup','(Tutup)','(tutup)']
-
-def should_skip_store(store_name):
-    """Check if store should be skipped based on keywords"""
-    for keyword in SKIP_KEYWORDS:
-        if re.search(rf'\b{keyword}\b', store_name, re.IGNORECASE):
-            logger.info(f"⏭️  SKIPPED ({keyword.title()}): {store_name}")
-            return True
-    return False
-
-class DataStorage:
-    """Class to handle multiple storage formats"""
-    
-    def __init__(self, base_filename=None):
-        self.base_filename = base_filename or f"pmo_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-        self.all_data = []
-        
-    def add_store_data(self, store_data):
-        """Add store data to storage"""
-        self.all_data.append(store_data)
-    
-    def save_to_csv(self, data=None):
-        """Save data to CSV file"""
-        data_to_save = data if data is not None else self.all_data
-        
-        if not data_to_save:
-            logger.warning("No data to save to CSV")
-            return None
-        
-        filename = f"{self.base_filename}.csv"
-        try:
-            df = pd.DataFrame(data_to_save)
-            df.to_csv(filename, index=False, encoding='utf-8-sig')
-            logger.info(f"✓ Data saved to CSV: {filename}")
-            logger.info(f"  Total records: {len(data_to_save)}")
-            return filename
-        except Exception as e:
-            logger.error(f"Error saving to CSV: {e}")
-            return None
-    
-    def save_to_json(self, data=None):
-        """Save data to JSON file with structured format"""
-        data_to_save = data if data is not None else self.all_data
-        
-        if not data_to_save:
-            logger.warning("No data to save to JSON")
-            return None
-        
-        filename = f"{self.base_filename}.json"
-        try:
-            # Create structured JSON format
-            json_data = {
-                "metadata": {
-                    "extraction_date": datetime.now().isoformat(),
-                    "total_stores": len(data_to_save),
-                    "data_format": "structured"
-                },
-                "stores": data_to_save
-            }
-            
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(json_data, f, ensure_ascii=False, indent=2)
-            
-            logger.info(f"✓ Data saved to JSON: {filename}")
-            return filename
-        except Exception as e:
-            logger.error(f"Error saving to JSON: {e}")
-            return None
-    
-    def save_to_sqlite(self, data=None):
-        """Save data to SQLite database"""
-        data_to_save = data if data is not None else self.all_data
-        
-        if not data_to_save:
-            logger.warning("No data to save to SQLite")
-            return None
-        
-        filename = f"{self.base_filename}.db"
-        try:
-            conn = sqlite3.connect(filename)
-            cursor = conn.cursor()
-            
-            # Create table for store information
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS stores (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    regional TEXT,
-                    store_name TEXT,
-                    year INTEGER,
-                    month INTEGER,
-                    extraction_type TEXT,
-                    extraction_datetime TEXT,
-                    error_message TEXT
-                )
-            ''')
-            
-            # Create table for scores
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS scores (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    store_id INTEGER,
-                    score_type TEXT,
-                    score_value REAL,
-                    FOREIGN KEY (store_id) REFERENCES stores (id)
-                )
-            ''')
-            
-            # Create table for KPIs
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS kpis (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    store_id INTEGER,
-                    kpi_number TEXT,
-                    kpi_name TEXT,
-                    kpi_value REAL,
-                    achievement_value TEXT,
-                    FOREIGN KEY (store_id) REFERENCES stores (id)
-                )
-            ''')
-            
-            # Insert data
-            for store_data in data_to_save:
-                # Insert store info
-                cursor.execute('''
-                    INSERT INTO stores (regional, store_name, year, month, extraction_type, 
-                                      extraction_datetime, error_message)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    store_data.get('Regional'),
-                    store_data.get('Store'),
-                    store_data.get('Year'),
-                    store_data.get('Month'),
-                    store_data.get('Extraction_Type'),
-                    store_data.get('Extraction_DateTime'),
-                    store_data.get('Error_Message', 'None')
-                ))
-                
-                store_id = cursor.lastrowid
-                
-                # Insert scores
-                score_types = ['Financial', 'Customer', 'Internal_Business_Process', 
-                             'Learning_and_Growth', 'Total']
-                for score_type in score_types:
-                    score_key = f"{score_type}_Score"
-                    if score_key in store_data:
-                        cursor.execute('''
-                            INSERT INTO scores (store_id, score_type, score_value)
-                            VALUES (?, ?, ?)
-                        ''', (store_id, score_type, store_data[score_key]))
-                
-                # Insert KPIs
-                for key, value in store_data.items():
-                    if key.startswith('KPI_') and key.endswith('_Name'):
-                        kpi_num = key.replace('_Name', '').replace('KPI_', '')
-                        kpi_name = value
-                        kpi_value_key = f"KPI_{kpi_num}_Value"
-                        kpi_value = store_data.get(kpi_value_key, 0.0)
-                        
-                        cursor.execute('''
-                            INSERT INTO kpis (store_id, kpi_number, kpi_name, kpi_value)
-                            VALUES (?, ?, ?, ?)
-                        ''', (store_id, kpi_num, kpi_name, kpi_value))
-            
-            conn.commit()
-            conn.close()
-            
-            logger.info(f"✓ Data saved to SQLite database: {filename}")
-            return filename
-        except Exception as e:
-            logger.error(f"Error saving to SQLite: {e}")
-            return None
-    
-    def save_to_text(self, data=None):
-        """Save data to human-readable text file"""
-        data_to_save = data if data is not None else self.all_data
-        
-        if not data_to_save:
-            logger.warning("No data to save to text")
-            return None
-        
-        filename = f"{self.base_filename}_report.txt"
-        try:
-            with open(filename, 'w', encoding='utf-8') as f:
-                f.write("=" * 80 + "\n")
-                f.write("PMO DATA EXTRACTION REPORT\n")
-                f.write("=" * 80 + "\n\n")
-                f.write(f"Extraction Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                f.write(f"Total Stores: {len(data_to_save)}\n\n")
-                
-                for i, store_data in enumerate(data_to_save, 1):
-                    f.write(f"\n{'='*60}\n")
-                    f.write(f"STORE {i}: {store_data.get('Store', 'Unknown')}\n")
-                    f.write(f"{'='*60}\n")
-                    f.write(f"Regional: {store_data.get('Regional', 'N/A')}\n")
-                    f.write(f"Year: {store_data.get('Year', 'N/A')}\n")
-                    f.write(f"Month: {store_data.get('Month', 'N/A')}\n")
-                    f.write(f"Extraction Type: {store_data.get('Extraction_Type', 'N/A')}\n")
-                    
-                    # Write scores
-                    f.write("\nSCORES:\n")
-                    f.write("-" * 40 + "\n")
-                    score_keys = [k for k in store_data.keys() if k.endswith('_Score')]
-                    for key in sorted(score_keys):
-                        score_name = key.replace('_', ' ').replace('Score', '').strip()
-                        f.write(f"{score_name}: {store_data[key]:.2f}\n")
-                    
-                    # Write KPIs
-                    f.write("\nKPIs:\n")
-                    f.write("-" * 40 + "\n")
-                    
-                    # Group KPIs by their numbers
-                    kpi_numbers = set()
-                    for key in store_data.keys():
-                        if key.startswith('KPI_') and '_Name' in key:
-                            kpi_num = key.split('_')[1]
-                            kpi_numbers.add(kpi_num)
-                    
-                    for kpi_num in sorted(kpi_numbers, key=lambda x: int(x)):
-                        name_key = f"KPI_{kpi_num}_Name"
-                        value_key = f"KPI_{kpi_num}_Value"
-                        
-                        if name_key in store_data and value_key in store_data:
-                            kpi_name = store_data[name_key]
-                            kpi_value = store_data[value_key]
-                            f.write(f"Control {kpi_num}: {kpi_name}\n")
-                            f.write(f"  YTD Achievement: {kpi_value:,.2f}\n")
-                    
-                    # Write extracted KPI count
-                    total_key = 'Total_KPIs_Extracted' if 'Total_KPIs_Extracted' in store_data else 'Financial_KPIs_Extracted'
-                    if total_key in store_data:
-                        f.write(f"\nTotal KPIs Extracted: {store_data[total_key]}\n")
-                    
-                    if store_data.get('Error_Message') not in ['None', None]:
-                        f.write(f"\n⚠️  ERROR: {store_data.get('Error_Message')}\n")
-            
-            logger.info(f"✓ Report saved to text file: {filename}")
-            return filename
-        except Exception as e:
-            logger.error(f"Error saving to text file: {e}")
-            return None
-    
-    def save_all_formats(self):
-        """Save data in all available formats"""
-        if not self.all_data:
-            logger.warning("No data to save")
-            return []
-        
-        saved_files = []
-        
-        # Save to CSV
-        csv_file = self.save_to_csv()
-        if csv_file:
-            saved_files.append(("CSV", csv_file))
-        
-        # Save to JSON
-        json_file = self.save_to_json()
-        if json_file:
-            saved_files.append(("JSON", json_file))
-        
-        # Save to SQLite
-        sqlite_file = self.save_to_sqlite()
-        if sqlite_file:
-            saved_files.append(("SQLite", sqlite_file))
-        
-        # Save to Text
-        text_file = self.save_to_text()
-        if text_file:
-            saved_files.append(("Text Report", text_file))
-        
-        return saved_files
-
-
 class PMOFastDataExtractor:
+    VALUE_FIELD = "YTDAchievement"  # grid column read for every KPI
+    LAST_CONTROL = 22  # last grid row (ctlNN) read in "all" mode
+    
     def __init__(self, username, password, year=None, month=None, target_regionals=None, 
-                 headless=False, extract_type="all", storage_formats=None):
+                 headless=False, extract_type="all", storage_formats=None,
+                 performance_profile=False, pacing_profile=None):
         """
         Initialize the PMO Data Extractor - FAST VERSION
         
@@ -315,13 +48,21 @@ class PMOFastDataExtractor:
                 - "sqlite": SQLite database
                 - "text": Text report
                 - "all": All formats (default)
+            performance_profile (bool): Lean Chrome (eager page loads, no images/CSS/fonts)
+            pacing_profile (str): "fast", "normal" or "safe" (default: $PMO_PACING_PROFILE or "normal")
         """
         self.username = username
         self.password = password
         self.driver = None
         self.wait = None
-        self.setup_driver(headless)
-        
+        self.last_failure = None  # FAILURE_* kind of the last failed store selection
+        self.pacer = Pacer(pacing_profile)
+        self.dashboard_ready = False  # set by prepare_session() when logged in ahead of the run
+        self.setup_driver(headless, performance_profile)
+        self.configure(year, month, target_regionals, extract_type, storage_formats)
+    
+    def configure(self, year=None, month=None, target_regionals=None, extract_type="all", storage_formats=None):
+        """Set what to extract and where to save it; see __init__ for the arguments"""
         self.target_regionals = target_regionals or ['E']
         self.extract_type = extract_type  # "all" or "financial"
         
@@ -350,31 +91,28 @@ class PMOFastDataExtractor:
         else:
             self.storage_formats = storage_formats
     
-    def setup_driver(self, headless=False):
+    def setup_driver(self, headless=False, performance_profile=False):
         """Initialize Chrome driver with options"""
-        chrome_options = Options()
-        if headless:
-            chrome_options.add_argument('--headless')
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        chrome_options.add_argument('--disable-gpu')
-        chrome_options.add_argument('--window-size=1920,1080')
-        chrome_options.add_argument('--disable-blink-features=AutomationControlled')
-        
+        self.driver_settings = {'headless': headless, 'performance_profile': performance_profile}
         try:
-            self.driver = webdriver.Chrome(options=chrome_options)
-            self.driver.maximize_window()
+            self.driver = create_chrome_driver(headless, performance_profile)
             self.wait = WebDriverWait(self.driver, 30)
             logger.info("Chrome driver initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize driver: {e}")
             raise
     
+    def prepare_session(self):
+        """Log in and open the dashboard ahead of run_extraction"""
+        self.login()
+        self.navigate_to_dashboard()
+        self.dashboard_ready = True
+    
     def login(self):
         """Handle login process"""
         try:
             logger.info("Navigating to login page")
-            self.driver.get("https://pmo.mykg.id/Systems/Login.aspx ")
+            self.driver.get(f"{BASE_URL}{LOGIN_PATH}")
             
             username_field = self.wait.until(
                 EC.presence_of_element_located((By.ID, "txt_UserID"))
@@ -418,7 +156,8 @@ class PMOFastDataExtractor:
             
             actions = ActionChains(self.driver)
             actions.move_to_element(performance_menu).perform()
-            time.sleep(3)
+            self.pacer.settle('menu_hover', 3, ready=lambda: self.driver.find_element(
+                By.ID, "ctl00_MenuControlHorizontal1_NavigationMenu:submenu:16").is_displayed())
             
             submenu = self.wait.until(
                 EC.visibility_of_element_located((By.ID, "ctl00_MenuControlHorizontal1_NavigationMenu:submenu:16"))
@@ -461,7 +200,7 @@ class PMOFastDataExtractor:
                 EC.presence_of_element_located((By.ID, "ctl00_ContentPlaceHolder1_ddlPeriod"))
             ))
             year_dropdown.select_by_visible_text(self.current_year)
-            time.sleep(3)
+            self.pacer.settle('period_postback', 3, ready=lambda: postback_idle(self.driver))
             
             month_dropdown = Select(self.driver.find_element(By.ID, "ctl00_ContentPlaceHolder1_ddlMonth"))
             month_names = ["January", "February", "March", "April", "May", "June",
@@ -469,7 +208,7 @@ class PMOFastDataExtractor:
             
             selected_month_name = month_names[self.current_month - 1]
             month_dropdown.select_by_visible_text(selected_month_name)
-            time.sleep(3)
+            self.pacer.settle('period_postback', 3, ready=lambda: postback_idle(self.driver))
             
             logger.info(f"Year and month selected successfully: {self.current_year} - {selected_month_name}")
             
@@ -483,7 +222,7 @@ class PMOFastDataExtractor:
             try:
                 logger.info(f"Attempting to click View Other Scorecard (attempt {attempt + 1}/{max_attempts})")
                 
-                time.sleep(5)
+                self.pacer.settle('postback', 5, ready=lambda: postback_idle(self.driver))
                 
                 view_btn = self.wait.until(
                     EC.element_to_be_clickable((By.ID, "ctl00_ContentPlaceHolder1_btnViewOtherSCO"))
@@ -492,18 +231,18 @@ class PMOFastDataExtractor:
                 try:
                     view_btn.click()
                     logger.info("View Other Scorecard button clicked successfully")
-                    time.sleep(5)
+                    self.pacer.settle('modal_open', 5, ready=lambda: scorecard_tree_present(self.driver))
                     return True
                 except ElementClickInterceptedException:
                     logger.warning("Regular click intercepted, trying JavaScript click")
                     self.driver.execute_script("arguments[0].click();", view_btn)
-                    time.sleep(5)
+                    self.pacer.settle('modal_open', 5, ready=lambda: scorecard_tree_present(self.driver))
                     return True
                     
             except Exception as e:
                 logger.warning(f"Attempt {attempt + 1} failed: {e}")
                 if attempt < max_attempts - 1:
-                    time.sleep(5)
+                    self.pacer.retry_sleep(5)
                     continue
                 else:
                     logger.error(f"All {max_attempts} attempts failed to click View Other Scorecard")
@@ -520,7 +259,7 @@ class PMOFastDataExtractor:
             try:
                 logger.info(f"Getting stores for Regional {regional_letter} (attempt {attempt + 1})")
                 
-                time.sleep(5)
+                self.pacer.settle('modal_open', 5, ready=lambda: scorecard_tree_present(self.driver))
                 
                 regional_divs = {
                     'A': 'ctl00_ContentPlaceHolder1_OrganizationTreeView1_tvHierarchyn22Nodes',
@@ -575,13 +314,13 @@ class PMOFastDataExtractor:
                 else:
                     logger.warning(f"No stores found in Regional {regional_letter} on attempt {attempt + 1}")
                     if attempt < max_attempts - 1:
-                        time.sleep(3)
+                        self.pacer.retry_sleep(3)
                         continue
                 
             except Exception as e:
                 logger.error(f"Attempt {attempt + 1} failed to get stores for regional {regional_letter}: {e}")
                 if attempt < max_attempts - 1:
-                    time.sleep(3)
+                    self.pacer.retry_sleep(3)
                     continue
         
         logger.error(f"Failed to get stores for Regional {regional_letter} after all attempts")
@@ -607,6 +346,7 @@ class PMOFastDataExtractor:
             stable_count = 0
             required_stable_count = 3
             last_value = None
+            changed_at = start_time
             
             while time.time() - start_time < max_wait_time:
                 try:
@@ -617,27 +357,31 @@ class PMOFastDataExtractor:
                         stable_count += 1
                         logger.info(f"Value stable ({stable_count}/{required_stable_count}): {current_value}")
                         
-                        if stable_count >= required_stable_count:
+                        if stable_count >= required_stable_count and \
+                                time.time() - changed_at >= STABILITY_WINDOW:
                             logger.info(f"Data has stabilized for {store_name}")
                             
-                            time.sleep(2)
+                            # How long the grid took to show its final value sets the poll interval
+                            self.pacer.observe('stability_poll', changed_at - start_time)
+                            self.pacer.settle('data_settle', 2, ready=lambda: postback_idle(self.driver))
                             return True
                     else:
                         if last_value is not None and current_value != last_value:
                             logger.info(f"Value changed from '{last_value}' to '{current_value}' - resetting stability counter")
                         stable_count = 0
                         last_value = current_value
+                        changed_at = time.time()
                     
-                    time.sleep(1.5)
+                    self.pacer.sleep('stability_poll', 1.5)
                     
                 except StaleElementReferenceException:
                     logger.warning("Stale element during data refresh wait")
                     stable_count = 0
-                    time.sleep(2)
+                    self.pacer.retry_sleep(2)
                     continue
                 except Exception as e:
                     logger.warning(f"Error during stability check: {e}")
-                    time.sleep(2)
+                    self.pacer.retry_sleep(2)
                     continue
             
             logger.warning(f"Data refresh timeout for {store_name} after {max_wait_time}s")
@@ -666,8 +410,9 @@ class PMOFastDataExtractor:
                 
                 if not target_store:
                     logger.error(f"Could not find store '{store_name}' in fresh store list")
+                    self.last_failure = FAILURE_STALE_NODE if fresh_stores else FAILURE_MODAL_FAILED
                     if attempt < max_attempts - 1:
-                        time.sleep(3)
+                        self.pacer.retry_sleep(3)
                         continue
                     else:
                         return False
@@ -675,7 +420,7 @@ class PMOFastDataExtractor:
                 store_element = target_store['element']
                 
                 self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", store_element)
-                time.sleep(2)
+                self.pacer.settle('scroll', 2, ready=lambda: postback_idle(self.driver))
                 
                 try:
                     store_element.click()
@@ -689,304 +434,33 @@ class PMOFastDataExtractor:
                     return True
                 else:
                     logger.warning(f"Data refresh verification failed for {store_name}")
+                    self.last_failure = FAILURE_EMPTY_GRID
                     if attempt < max_attempts - 1:
-                        time.sleep(5)
+                        self.pacer.retry_sleep(5)
                         continue
                     else:
                         return False
                     
             except StaleElementReferenceException:
                 logger.warning(f"Stale element reference for store '{store_name}' on attempt {attempt + 1}")
+                self.last_failure = FAILURE_STALE_NODE
                 if attempt < max_attempts - 1:
-                    time.sleep(3)
+                    self.pacer.retry_sleep(3)
                     continue
             except Exception as e:
                 logger.error(f"Error selecting store '{store_name}' on attempt {attempt + 1}: {e}")
                 if attempt < max_attempts - 1:
-                    time.sleep(3)
+                    self.pacer.retry_sleep(3)
                     continue
         
         logger.error(f"Failed to select store '{store_name}' after all attempts")
         return False
     
-    def extract_all_data_fast_single_pass(self):
-        """
-        Extract ALL data in ONE FAST PASS - from ctl02 to ctl22
-        This is the efficient version that reads everything at once
-        """
-        all_data = {}
-        kpi_count = 0
-        
-        try:
-            logger.info("Starting FAST single-pass extraction...")
-            
-            # First, extract scores if we want them
-            if self.extract_type == "all":
-                scores = self.extract_score_data_fast()
-                all_data.update(scores)
-            
-            # Now extract all KPIs from ctl02 to ctl22 in one pass
-            current_perspective = "Financial"
-            
-            for i in range(2, 23):  # ctl02 to ctl22
-                try:
-                    # Get KPI name
-                    kpi_id = f"ctl00_ContentPlaceHolder1_grvScorecard_ctl{i:02d}_lblKPI"
-                    kpi_element = self.driver.find_element(By.ID, kpi_id)
-                    kpi_name = kpi_element.text.strip()
-                    
-                    if not kpi_name:
-                        continue
-                    
-                    # Get YTD achievement
-                    achievement_id = f"ctl00_ContentPlaceHolder1_grvScorecard_ctl{i:02d}_lblYTDAchievement{self.current_month}"
-                    achievement_element = self.driver.find_element(By.ID, achievement_id)
-                    achievement_value = achievement_element.text.strip()
-                    
-                    # Convert achievement value to float
-                    numeric_value = 0.0
-                    if achievement_value not in ["-", "", None]:
-                        try:
-                            numeric_value = float(achievement_value.replace(",", ""))
-                        except ValueError:
-                            numeric_value = 0.0
-                    
-                    # Clean KPI name for column name
-                    clean_kpi_name = re.sub(r'[^\w\s]', '', kpi_name)
-                    clean_kpi_name = re.sub(r'\s+', '_', clean_kpi_name.strip())
-                    
-                    # Determine perspective based on control number and KPI name
-                    if self.extract_type == "all":
-                        # For "all" extraction, include perspective in column name
-                        if i <= 6 or "revenue" in kpi_name.lower() or "cogs" in kpi_name.lower() or "profit" in kpi_name.lower() or "expense" in kpi_name.lower():
-                            perspective = "Financial"
-                        elif "customer" in kpi_name.lower() or "satisfaction" in kpi_name.lower():
-                            perspective = "Customer"
-                        elif "stock" in kpi_name.lower() or "fulfillment" in kpi_name.lower() or "sales" in kpi_name.lower():
-                            perspective = "Customer"
-                        elif "productivity" in kpi_name.lower() or "conversion" in kpi_name.lower() or "fraud" in kpi_name.lower():
-                            perspective = "Internal_Business_Process"
-                        elif "learning" in kpi_name.lower() or "growth" in kpi_name.lower() or "hr" in kpi_name.lower():
-                            perspective = "Learning_and_Growth"
-                        else:
-                            perspective = "Other"
-                        
-                        # Create column name with perspective
-                        col_name = f"{perspective}_{clean_kpi_name}_ACH"
-                    else:
-                        # For "financial" extraction, just use Financial prefix
-                        col_name = f"Financial_{clean_kpi_name}_ACH"
-                    
-                    # Store in data dictionary
-                    all_data[col_name] = numeric_value
-                    
-                    # Also store with simple KPI number for reference
-                    all_data[f"KPI_{i:02d}_Value"] = numeric_value
-                    all_data[f"KPI_{i:02d}_Name"] = kpi_name
-                    
-                    # Log the extraction (this is the FAST log you see)
-                    logger.info(f"Control {i:02d}: {kpi_name}")
-                    logger.info(f"  YTD Achievement: {achievement_value}")
-                    
-                    kpi_count += 1
-                    
-                except NoSuchElementException:
-                    # If we can't find ctl22, we've reached the end
-                    if i == 22:
-                        logger.info(f"Control 22 not found. Total KPIs extracted: {kpi_count}")
-                        break
-                    else:
-                        # Some controls might be missing, continue
-                        continue
-                except Exception as e:
-                    logger.warning(f"Error extracting control {i:02d}: {e}")
-                    continue
-            
-            # Add summary info
-            all_data['Total_KPIs_Extracted'] = kpi_count
-            
-            logger.info(f"✓ FAST extraction complete: {kpi_count} KPIs extracted")
-            
-            return all_data
-            
-        except Exception as e:
-            logger.error(f"Error in fast single-pass extraction: {e}")
-            return all_data
-    
-    def extract_score_data_fast(self):
-        """Extract score metrics quickly"""
-        scores = {}
-        
-        # Mapping of score types to their element IDs
-        score_mapping = {
-            'Financial_Score': 'ctl00_ContentPlaceHolder1_lblAchievementYTD_F',
-            'Customer_Score': 'ctl00_ContentPlaceHolder1_lblAchievementYTD_CS',
-            'Internal_Business_Process_Score': 'ctl00_ContentPlaceHolder1_lblAchievementYTD_IBP',
-            'Learning_and_Growth_Score': 'ctl00_ContentPlaceHolder1_lblAchievementYTD_LG',
-            'Total_Score': 'ctl00_ContentPlaceHolder1_lblAchievementYTD_Total'
-        }
-        
-        for score_name, element_id in score_mapping.items():
-            try:
-                score_element = self.driver.find_element(By.ID, element_id)
-                score_value = score_element.text.strip()
-                
-                # Clean and convert the score value
-                if score_value == "-" or score_value == "":
-                    scores[score_name] = 0.0
-                else:
-                    try:
-                        scores[score_name] = float(score_value)
-                    except ValueError:
-                        scores[score_name] = 0.0
-                
-                logger.info(f"{score_name.replace('_', ' ')}: {scores[score_name]}")
-                
-            except NoSuchElementException:
-                scores[score_name] = 0.0
-            except Exception as e:
-                logger.warning(f"Error extracting {score_name}: {e}")
-                scores[score_name] = 0.0
-        
-        return scores
-    
-    def extract_financial_data_fast(self):
-        """Extract only financial data quickly"""
-        all_data = {}
-        kpi_count = 0
-        
-        try:
-            logger.info("Extracting financial data only (fast)...")
-            
-            # Extract only financial KPIs from ctl02 to ctl07
-            for i in range(2, 8):  # ctl02 to ctl07
-                try:
-                    # Get KPI name
-                    kpi_id = f"ctl00_ContentPlaceHolder1_grvScorecard_ctl{i:02d}_lblKPI"
-                    kpi_element = self.driver.find_element(By.ID, kpi_id)
-                    kpi_name = kpi_element.text.strip()
-                    
-                    if not kpi_name:
-                        continue
-                    
-                    # Get YTD achievement
-                    achievement_id = f"ctl00_ContentPlaceHolder1_grvScorecard_ctl{i:02d}_lblYTDAchievement{self.current_month}"
-                    achievement_element = self.driver.find_element(By.ID, achievement_id)
-                    achievement_value = achievement_element.text.strip()
-                    
-                    # Convert to float
-                    numeric_value = 0.0
-                    if achievement_value not in ["-", "", None]:
-                        try:
-                            numeric_value = float(achievement_value.replace(",", ""))
-                        except ValueError:
-                            numeric_value = 0.0
-                    
-                    # Clean KPI name for column name
-                    clean_kpi_name = re.sub(r'[^\w\s]', '', kpi_name)
-                    clean_kpi_name = re.sub(r'\s+', '_', clean_kpi_name.strip())
-                    
-                    # Create column name
-                    col_name = f"Financial_{clean_kpi_name}_ACH"
-                    
-                    # Store in data dictionary
-                    all_data[col_name] = numeric_value
-                    
-                    # Log the extraction
-                    logger.info(f"Financial KPI {i:02d}: {kpi_name}")
-                    logger.info(f"  YTD Achievement: {achievement_value}")
-                    
-                    kpi_count += 1
-                    
-                except Exception as e:
-                    # Stop if we can't find more financial KPIs
-                    if i == 2:
-                        logger.error(f"No revenue data found: {e}")
-                        break
-                    continue
-            
-            all_data['Financial_KPIs_Extracted'] = kpi_count
-            logger.info(f"✓ Financial extraction complete: {kpi_count} KPIs extracted")
-            
-            return all_data
-            
-        except Exception as e:
-            logger.error(f"Error extracting financial data: {e}")
-            return all_data
-    
-    def extract_store_data_fast(self, store_info):
-        """Extract data for a store - FAST VERSION (single pass)"""
-        try:
-            store_name = store_info['name']
-            regional = store_info['regional']
-            
-            logger.info(f"Extracting data for {store_name} (Regional {regional})")
-            
-            time.sleep(3)  # Small wait for page to settle
-            
-            # Base result structure
-            result = {
-                'Regional': regional,
-                'Store': store_name,
-                'Year': self.current_year,
-                'Month': self.current_month,
-                'Extraction_Type': self.extract_type,
-                'Error_Message': 'None',
-                'Extraction_DateTime': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                'Extraction_Method': 'Single-Pass-Fast'
-            }
-            
-            if self.extract_type == "financial":
-                # Extract only financial data (fast)
-                financial_data = self.extract_financial_data_fast()
-                result.update(financial_data)
-                
-            else:  # "all"
-                # Extract ALL data in ONE FAST PASS
-                all_data = self.extract_all_data_fast_single_pass()
-                result.update(all_data)
-            
-            # Add to storage
-            self.storage.add_store_data(result)
-            
-            logger.info(f"✓ FAST extraction complete for {store_name}")
-            
-            return result
-            
-        except Exception as e:
-            logger.error(f"Error extracting data for {store_info['name']}: {e}")
-            
-            # Create error record
-            result = {
-                'Regional': store_info['regional'],
-                'Store': store_info['name'],
-                'Year': self.current_year,
-                'Month': self.current_month,
-                'Extraction_Type': self.extract_type,
-                'Error_Message': str(e),
-                'Extraction_DateTime': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                'Extraction_Method': 'Error'
-            }
-            
-            # Fill with zeros/default values
-            if self.extract_type == "financial":
-                result.update({
-                    'Financial_KPIs_Extracted': 0
-                })
-            else:  # "all"
-                result.update({
-                    'Total_KPIs_Extracted': 0
-                })
-            
-            # Add to storage
-            self.storage.add_store_data(result)
-            return result
-    
     def close_modal_if_open(self, max_attempts=3):
         """Check if modal is open and close it if needed"""
         for attempt in range(max_attempts):
             try:
-                time.sleep(3)
+                self.pacer.settle('postback', 3, ready=lambda: postback_idle(self.driver))
                 
                 close_buttons = self.driver.find_elements(By.XPATH, "//input[@value='Close']")
                 
@@ -994,12 +468,12 @@ class PMOFastDataExtractor:
                     if close_btn.is_displayed():
                         try:
                             close_btn.click()
-                            time.sleep(3)
+                            self.pacer.settle('modal_close', 3, ready=lambda: modal_closed(self.driver))
                             logger.info("Modal closed successfully")
                             return True
                         except:
                             self.driver.execute_script("arguments[0].click();", close_btn)
-                            time.sleep(3)
+                            self.pacer.settle('modal_close', 3, ready=lambda: modal_closed(self.driver))
                             logger.info("Modal closed with JavaScript click")
                             return True
                 
@@ -1009,7 +483,7 @@ class PMOFastDataExtractor:
             except Exception as e:
                 logger.warning(f"Attempt {attempt + 1} to close modal failed: {e}")
                 if attempt < max_attempts - 1:
-                    time.sleep(3)
+                    self.pacer.retry_sleep(3)
                     continue
                     
         logger.warning("Could not close modal after all attempts")
@@ -1026,95 +500,18 @@ class PMOFastDataExtractor:
             logger.info(f"Storage Formats: {', '.join(self.storage_formats)}")
             logger.info("=" * 60)
             
-            # Step 1: Login
-            self.login()
-            
-            # Step 2: Navigate to dashboard
-            self.navigate_to_dashboard()
-            
-            # Step 3: Select year and month
-            self.select_year_and_month()
-            
-            # Step 4: Process each regional
-            for regional in self.target_regionals:
-                try:
-                    logger.info(f"\n{'='*50}")
-                    logger.info(f"Processing Regional {regional}")
-                    logger.info(f"{'='*50}")
-                    
-                    # Step 4a: Click View Other Scorecard
-                    if not self.click_view_other_scorecard():
-                        logger.error(f"Failed to open modal for Regional {regional}")
-                        continue
-                    
-                    # Step 4b: Get all stores for this regional
-                    stores = self.get_stores_by_regional_fresh(regional)
-                    
-                    if not stores:
-                        logger.warning(f"No active stores found in Regional {regional}")
-                        continue
-                    
-                    logger.info(f"Found {len(stores)} active stores to process")
-                    
-                    # Step 4c: Process each store
-                    for i, store in enumerate(stores, 1):
-                        logger.info(f"\n[{i}/{len(stores)}] Processing store: {store['name']}")
-                        
-                        # Select the store
-                        if self.select_store_robust(store):
-                            # Extract data using FAST single-pass method
-                            self.extract_store_data_fast(store)
-                        else:
-                            logger.error(f"Failed to select store: {store['name']}")
-                            # Add error record
-                            error_result = {
-                                'Regional': regional,
-                                'Store': store['name'],
-                                'Year': self.current_year,
-                                'Month': self.current_month,
-                                'Extraction_Type': self.extract_type,
-                                'Error_Message': 'Failed to select store',
-                                'Extraction_DateTime': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                                'Extraction_Method': 'Error'
-                            }
-                            self.storage.add_store_data(error_result)
-                        
-                        # Prepare for next store
-                        if i < len(stores):
-                            logger.info("Preparing for next store...")
-                            self.close_modal_if_open()
-                            time.sleep(3)
-                            
-                            if not self.click_view_other_scorecard():
-                                logger.error("Failed to reopen modal for next store")
-                                break
-                    
-                except Exception as e:
-                    logger.error(f"Error processing Regional {regional}: {e}")
-                    continue
-            
-            # Step 5: Save results in multiple formats
-            saved_files = []
-            
-            if "csv" in self.storage_formats:
-                csv_file = self.storage.save_to_csv()
-                if csv_file:
-                    saved_files.append(("CSV", csv_file))
-            
-            if "json" in self.storage_formats:
-                json_file = self.storage.save_to_json()
-                if json_file:
-                    saved_files.append(("JSON", json_file))
-            
-            if "sqlite" in self.storage_formats:
-                sqlite_file = self.storage.save_to_sqlite()
-                if sqlite_file:
-                    saved_files.append(("SQLite Database", sqlite_file))
-            
-            if "text" in self.storage_formats:
-                text_file = self.storage.save_to_text()
-                if text_file:
-                    saved_files.append(("Text Report", text_file))
+            # Steps 1-4: Login, dashboard, period and every regional via the shared runner
+            runner = ExtractionRunner.from_env(SeleniumBackend(self), self.target_regionals,
+                                               self.current_year, self.current_month, self.extract_type,
+                                               storage=self.storage, value_field=self.VALUE_FIELD,
+                                               last_control=self.LAST_CONTROL)
+            try:
+                runner.run(logged_in=self.dashboard_ready)
+                
+                # Step 5: Save results in multiple formats
+                saved_files = self.storage.save_formats(self.storage_formats)
+            finally:
+                runner.finish()
             
             # Display summary
             if saved_files:
@@ -1269,56 +666,75 @@ def get_user_input_fast():
 def main_fast():
     """Main function for fast version"""
     try:
-        year, month, target_regionals, extract_type, storage_formats = get_user_input_fast()
-        
-        print("\n" + "="*60)
-        print("Login Credentials")
-        print("="*60)
-        
         # Check for environment variables
         username = os.getenv('PMO_USERNAME')
         password = os.getenv('PMO_PASSWORD')
         
-        if not username:
-            username = input("Enter username: ")
-        else:
-            print(f"Using username from environment variable")
-        
-        if not password:
-            password = input("Enter password: ")
-        else:
-            print(f"Using password from environment variable")
-        
-        headless_input = input("\nRun in headless mode (no browser window)? (y/n): ").strip().lower()
-        headless = headless_input in ['y', 'yes']
+        # With credentials in the environment, Chrome starts and logs in while the prompts are answered;
+        # headless and lean mode then come from PMO_HEADLESS / PMO_LEAN
+        prewarm = Prewarm.from_env(PMOFastDataExtractor)
         
-        print(f"\n{'='*60}")
-        month_names = ["January", "February", "March", "April", "May", "June",
-                      "July", "August", "September", "October", "November", "December"]
-        
-        data_type_text = {
-            'financial': 'Financial Metrics Only (FAST)',
-            'all': 'ALL Data (FAST SINGLE PASS)'
-        }[extract_type]
-        
-        print(f"Starting FAST extraction:")
-        print(f"  Data Type: {data_type_text}")
-        print(f"  Period: {month_names[month-1]} {year}")
-        print(f"  Regionals: {', '.join(target_regionals)}")
-        print(f"  Storage Formats: {', '.join(storage_formats)}")
-        print(f"{'='*60}\n")
+        try:
+            year, month, target_regionals, extract_type, storage_formats = get_user_input_fast()
+            
+            print("\n" + "="*60)
+            print("Login Credentials")
+            print("="*60)
+            
+            if not username:
+                username = input("Enter username: ")
+            else:
+                print(f"Using username from environment variable")
+            
+            if not password:
+                password = input("Enter password: ")
+            else:
+                print(f"Using password from environment variable")
+            
+            performance_profile = False
+            if prewarm:
+                headless, performance_profile = prewarm.headless, prewarm.performance_profile
+                print(f"Headless: {'yes' if headless else 'no'}, lean profile: {'yes' if performance_profile else 'no'} "
+                      f"(PMO_HEADLESS / PMO_LEAN)")
+            else:
+                headless_input = input("\nRun in headless mode (no browser window)? (y/n): ").strip().lower()
+                headless = headless_input in ['y', 'yes']
+            
+            print(f"\n{'='*60}")
+            month_names = ["January", "February", "March", "April", "May", "June",
+                          "July", "August", "September", "October", "November", "December"]
+            
+            data_type_text = {
+                'financial': 'Financial Metrics Only (FAST)',
+                'all': 'ALL Data (FAST SINGLE PASS)'
+            }[extract_type]
+            
+            print(f"Starting FAST extraction:")
+            print(f"  Data Type: {data_type_text}")
+            print(f"  Period: {month_names[month-1]} {year}")
+            print(f"  Regionals: {', '.join(target_regionals)}")
+            print(f"  Storage Formats: {', '.join(storage_formats)}")
+            print(f"{'='*60}\n")
+        except BaseException:
+            # Ctrl-C or a failed prompt: the background login must not leave Chrome running
+            if prewarm:
+                prewarm.discard()
+            raise
         
-        # Create and run the extractor
-        extractor = PMOFastDataExtractor(
-            username=username,
-            password=password,
-            year=year,
-            month=month,
-            target_regionals=target_regionals,
-            headless=headless,
-            extract_type=extract_type,
-            storage_formats=storage_formats
-        )
+        # Create and run the extractor, reusing the browser that logged in during the prompts
+        extractor = prewarm.take(year, month, target_regionals, extract_type, storage_formats) if prewarm else None
+        if extractor is None:
+            extractor = PMOFastDataExtractor(
+                username=username,
+                password=password,
+                year=year,
+                month=month,
+                target_regionals=target_regionals,
+                headless=headless,
+                extract_type=extract_type,
+                storage_formats=storage_formats,
+                performance_profile=performance_profile
+            )
         
         success = extractor.run_extraction()
         
@@ -0,0 +1,370 @@
+import asyncio
+import os
+import re
+import logging
+from datetime import datetime
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
+
+from pmo_grid import (BASE_URL, LOGIN_PATH, DASHBOARD_PATH, REGIONAL_DIVS, MONTH_NAMES, READ_GRID_JS,
+                      STORE_NAME_ID, kpi_label_id, grid_texts, shown_store_name, should_skip_store,
+                      build_store_record, build_error_record)
+from pmo_storage import DataStorage
+from pmo_login_broker import ticket_cookies
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+GRID_ATTEMPTS = 3
+
+# Resolves once the heading above the grid names the store that was clicked
+HEADING_JS = f"""name => {{
+    const el = document.getElementById('{STORE_NAME_ID}');
+    return el !== null && el.textContent.trim() === name;
+}}"""
+
+
+def is_dashboard_postback(response):
+    return 'Dashboard.aspx' in response.url and response.request.method == 'POST'
+
+
+class PlaywrightWorker:
+    """One isolated browser context (own cookies / ASP.NET session) inside a shared Chromium"""
+
+    def __init__(self, worker_id, context, extractor):
+        self.worker_id = worker_id
+        self.context = context
+        self.extractor = extractor
+        self.page = None
+
+    async def start(self, shared_login=False):
+        """Log in (or, with shared_login, reuse the ticket cookies the context was created with)"""
+        self.page = await self.context.new_page()
+        self.page.set_default_timeout(30000)
+        if shared_login:
+            await self.page.goto(f"{BASE_URL}{DASHBOARD_PATH}")
+            shared_login = "Login.aspx" not in self.page.url
+            if shared_login:
+                logger.info(f"[W{self.worker_id}] Session created from the shared login")
+            else:
+                logger.warning(f"[W{self.worker_id}] Shared login not accepted, logging in normally")
+        if not shared_login:
+            await self.login()
+            await self.navigate_to_dashboard()
+        await self.select_year_and_month()
+
+    async def settle(self):
+        """Wait until the UpdatePanel postback has finished instead of sleeping"""
+        try:
+            await self.page.wait_for_load_state('networkidle', timeout=30000)
+        except PlaywrightTimeoutError:
+            logger.warning(f"[W{self.worker_id}] Network did not go idle within timeout")
+
+    async def login(self):
+        """Handle login process"""
+        logger.info(f"[W{self.worker_id}] Navigating to login page")
+        await self.page.goto(self.extractor.login_url)
+
+        await self.page.fill("#txt_UserID", self.extractor.username)
+        await self.page.fill("#txt_Password", self.extractor.password)
+        await self.page.click("#robLogin")
+        logger.info(f"[W{self.worker_id}] Login credentials submitted")
+
+        try:
+            await self.page.click("#btnSaveInputRole", timeout=10000)
+            logger.info(f"[W{self.worker_id}] Popup modal handled")
+        except PlaywrightTimeoutError:
+            logger.warning(f"[W{self.worker_id}] No popup modal found or timeout")
+
+        await self.page.wait_for_url(re.compile(r"Home/Home\.aspx"))
+        logger.info(f"[W{self.worker_id}] Login successful")
+
+    async def navigate_to_dashboard(self):
+        """Navigate to Performance Review Dashboard"""
+        try:
+            await self.page.hover("xpath=//a[text()='Performance Review']")
+            submenu = self.page.locator("[id='ctl00_MenuControlHorizontal1_NavigationMenu:submenu:16']")
+            await submenu.locator("a[href='Dashboard.aspx']").click()
+            await self.page.wait_for_url(re.compile(r"Dashboard\.aspx"))
+        except Exception as e:
+            logger.warning(f"[W{self.worker_id}] Menu navigation failed ({e}), trying direct navigation")
+            base_url = self.page.url.split('/Home/')[0]
+            await self.page.goto(f"{base_url}{DASHBOARD_PATH}")
+
+        await self.page.wait_for_selector("#ctl00_ContentPlaceHolder1_ddlPeriod", state="attached")
+        logger.info(f"[W{self.worker_id}] Successfully navigated to dashboard")
+
+    async def select_year_and_month(self):
+        """Select specified year and month"""
+        await self.page.select_option("#ctl00_ContentPlaceHolder1_ddlPeriod",
+                                      label=self.extractor.current_year)
+        await self.settle()
+        await self.page.select_option("#ctl00_ContentPlaceHolder1_ddlMonth",
+                                      label=MONTH_NAMES[self.extractor.current_month - 1])
+        await self.settle()
+        logger.info(f"[W{self.worker_id}] Period selected: {self.extractor.current_year}-{self.extractor.current_month:02d}")
+
+    async def open_scorecard_modal(self, regional_letter):
+        """Click View Other Scorecard and wait for the regional tree to render"""
+        await self.page.click("#ctl00_ContentPlaceHolder1_btnViewOtherSCO")
+        await self.settle()
+        await self.page.wait_for_selector(f"#{REGIONAL_DIVS[regional_letter]}", state="attached")
+
+    async def close_modal_if_open(self):
+        """Close the scorecard modal if one is visible"""
+        close_buttons = self.page.locator("input[value='Close']")
+        for i in range(await close_buttons.count()):
+            button = close_buttons.nth(i)
+            if await button.is_visible():
+                await button.click()
+                await self.settle()
+                return
+
+    def store_links(self, regional_letter):
+        return self.page.locator(f"#{REGIONAL_DIVS[regional_letter]} a[class*='NodeStyle']")
+
+    async def get_stores_by_regional(self, regional_letter):
+        """Get all active store names for a regional"""
+        names = await self.store_links(regional_letter).all_inner_texts()
+        stores = []
+        for name in (n.strip() for n in names):
+            if not name or name.startswith('RM -') or should_skip_store(name):
+                continue
+            stores.append({'name': name, 'regional': regional_letter})
+        logger.info(f"[W{self.worker_id}] ✓ Found {len(stores)} active stores in Regional {regional_letter}")
+        return stores
+
+    async def select_store(self, store_info):
+        """
+        Click a store in the tree and wait for the postback that answers the click; the previous
+        store's grid is still attached, so waiting for a selector or an idle network proves nothing.
+        As in HttpBackend.select_store, an answer with the previous store's heading or a blank
+        revenue cell is clicked again; a blank cell on the last attempt is kept.
+        """
+        name = store_info['name'].strip()
+        revenue_id = kpi_label_id(2, f"YTDAchievement{self.extractor.current_month}")
+        shown = None
+        for attempt in range(1, GRID_ATTEMPTS + 1):
+            if attempt > 1:
+                # The store click closed the modal
+                await self.open_scorecard_modal(store_info['regional'])
+            link = self.store_links(store_info['regional']).filter(
+                has_text=re.compile(rf"^\s*{re.escape(name)}\s*$")).first
+            async with self.page.expect_response(is_dashboard_postback) as response_info:
+                await link.click()
+            body = await (await response_info.value).text()
+
+            shown = shown_store_name(body)
+            if shown is not None and shown != name:
+                logger.warning(f"[W{self.worker_id}] Stale grid for {name} (showing {shown}), attempt {attempt}")
+                continue
+            if shown is None:
+                await self.settle()
+            else:
+                await self.page.wait_for_function(HEADING_JS, arg=name)
+            revenue = grid_texts(body).get(revenue_id)
+            if revenue not in ('', '-') or attempt == GRID_ATTEMPTS:
+                return
+            logger.warning(f"[W{self.worker_id}] Revenue empty for {name}, attempt {attempt}")
+        raise RuntimeError(f"Grid still shows '{shown}' instead of '{name}'")
+
+    async def extract_store(self, store_info):
+        """Select a store and read its grid in one page.evaluate call"""
+        extractor = self.extractor
+        try:
+            await self.select_store(store_info)
+            texts = await self.page.evaluate(f"() => {{ {READ_GRID_JS} }}")
+            result = build_store_record(texts, store_info, extractor.current_year, extractor.current_month,
+                                        extractor.extract_type, method='Playwright-Context')
+            logger.info(f"[W{self.worker_id}] ✓ Extraction complete for {store_info['name']}")
+            return result
+        except Exception as e:
+            logger.error(f"[W{self.worker_id}] Error extracting data for {store_info['name']}: {e}")
+            return build_error_record(store_info, extractor.current_year, extractor.current_month,
+                                      extractor.extract_type, str(e))
+
+    async def list_stores(self, regionals):
+        """Active stores of every regional, one modal each"""
+        stores = []
+        for regional in regionals:
+            try:
+                await self.open_scorecard_modal(regional)
+                stores.extend(await self.get_stores_by_regional(regional))
+            except Exception as e:
+                logger.error(f"[W{self.worker_id}] Error listing Regional {regional}: {e}")
+            await self.close_modal_if_open()
+        return stores
+
+    async def process_store(self, store_info, index, total):
+        """Open the store's regional in the modal, extract the store and close the modal again"""
+        logger.info(f"[W{self.worker_id}] [{index}/{total}] Processing store: {store_info['name']}")
+        extractor = self.extractor
+        try:
+            await self.open_scorecard_modal(store_info['regional'])
+            record = await self.extract_store(store_info)
+        except Exception as e:
+            logger.error(f"[W{self.worker_id}] Error opening the scorecard for {store_info['name']}: {e}")
+            record = build_error_record(store_info, extractor.current_year, extractor.current_month,
+                                        extractor.extract_type, str(e))
+        extractor.storage.add_store_data(record)
+        await self.close_modal_if_open()
+
+
+class PMOPlaywrightExtractor:
+    def __init__(self, username, password, year=None, month=None, target_regionals=None,
+                 headless=False, extract_type="all", storage_formats=None, workers=4):
+        """
+        Initialize the PMO Data Extractor - PLAYWRIGHT VERSION
+
+        Same arguments as PMOFastDataExtractor, plus:
+            workers (int): Number of browser contexts sharing one Chromium process.
+                Each context has its own cookies and therefore its own PMO session.
+        """
+        self.username = username
+        self.password = password
+        self.headless = headless
+        self.workers = max(1, workers)
+        self.login_url = f"{BASE_URL}{LOGIN_PATH}"
+
+        self.target_regionals = target_regionals or ['E']
+        self.extract_type = extract_type
+
+        if year and month:
+            self.current_year = str(year)
+            self.current_month = month
+        else:
+            current_date = datetime.now()
+            self.current_year = str(current_date.year)
+            self.current_month = current_date.month
+
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        regional_str = '_'.join(self.target_regionals)
+        prefix = {"financial": "pmo_financial", "scores": "pmo_scores"}.get(self.extract_type, "pmo_all_kpis")
+        self.storage = DataStorage(
+            f"{prefix}_{regional_str}_{self.current_year}_{self.current_month:02d}_{timestamp}")
+
+        if storage_formats is None or "all" in storage_formats:
+            self.storage_formats = ["csv", "json", "sqlite", "text"]
+        else:
+            self.storage_formats = storage_formats
+
+    async def _start_worker(self, worker_id, browser, storage_state=None):
+        """A logged-in worker in a new context, or None when its session could not start"""
+        context = await browser.new_context(viewport={'width': 1366, 'height': 768}, storage_state=storage_state)
+        worker = PlaywrightWorker(worker_id, context, self)
+        try:
+            await worker.start(shared_login=storage_state is not None)
+            return worker
+        except Exception as e:
+            logger.error(f"[W{worker_id}] Worker failed to start: {e}")
+            await context.close()
+            return None
+
+    async def _run_worker(self, worker, queue, total):
+        """Take stores from the shared queue until it is empty"""
+        try:
+            while True:
+                try:
+                    index, store = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                try:
+                    await worker.process_store(store, index, total)
+                except Exception as e:
+                    logger.error(f"[W{worker.worker_id}] Error processing store {store['name']}: {e}")
+        finally:
+            await worker.context.close()
+
+    async def run_async(self):
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=self.headless)
+            try:
+                # Worker 1 logs in; the other contexts start from its ticket cookies with their own session
+                first = await self._start_worker(1, browser)
+                if first is None:
+                    return
+                state = await first.context.storage_state()
+                storage_state = {'cookies': ticket_cookies(state['cookies']), 'origins': []}
+                starting = asyncio.gather(*(self._start_worker(i + 1, browser, storage_state)
+                                            for i in range(1, self.workers)))
+
+                # Meanwhile worker 1 reads the tree, and every context then takes single stores,
+                # so a run of one or two regionals still uses all of them
+                stores = await first.list_stores(self.target_regionals)
+                workers = [first] + [worker for worker in await starting if worker]
+                queue = asyncio.Queue()
+                for index, store in enumerate(stores, 1):
+                    queue.put_nowait((index, store))
+                logger.info(f"Dealing {len(stores)} stores to {len(workers)} browser contexts")
+                await asyncio.gather(*(self._run_worker(worker, queue, len(stores)) for worker in workers))
+            finally:
+                await browser.close()
+
+    def run_extraction(self):
+        """Main extraction process - PLAYWRIGHT VERSION"""
+        try:
+            logger.info("=" * 60)
+            logger.info("Starting PMO Data Extractor - PLAYWRIGHT VERSION")
+            logger.info(f"Extraction Type: {self.extract_type}")
+            logger.info(f"Year: {self.current_year}, Month: {self.current_month}")
+            logger.info(f"Target Regionals: {self.target_regionals}")
+            logger.info(f"Browser contexts: {self.workers}")
+            logger.info("=" * 60)
+
+            asyncio.run(self.run_async())
+
+            saved_files = self.storage.save_formats(self.storage_formats)
+
+            if saved_files:
+                logger.info(f"\n{'='*60}")
+                logger.info("PLAYWRIGHT EXTRACTION COMPLETED!")
+                logger.info(f"Total stores processed: {len(self.storage.all_data)}")
+                for format_name, file_path in saved_files:
+                    logger.info(f"  • {format_name}: {os.path.basename(file_path)}")
+                logger.info(f"{'='*60}")
+            else:
+                logger.warning("No data was extracted or saved")
+
+            return True
+
+        except Exception as e:
+            logger.error(f"Extraction failed: {e}")
+            return False
+
+
+def main_playwright():
+    """Main function for the Playwright version"""
+    from Storekpisinglepasswithlog2 import get_user_input_fast
+
+    try:
+        year, month, target_regionals, extract_type, storage_formats = get_user_input_fast()
+
+        username = os.getenv('PMO_USERNAME') or input("Enter username: ")
+        password = os.getenv('PMO_PASSWORD') or input("Enter password: ")
+
+        headless_input = input("\nRun in headless mode (no browser window)? (y/n): ").strip().lower()
+        workers_input = input("Number of parallel browser contexts (default 4): ").strip()
+
+        extractor = PMOPlaywrightExtractor(
+            username=username,
+            password=password,
+            year=year,
+            month=month,
+            target_regionals=target_regionals,
+            headless=headless_input in ['y', 'yes'],
+            extract_type=extract_type,
+            storage_formats=storage_formats,
+            workers=int(workers_input) if workers_input.isdigit() else 4
+        )
+
+        if extractor.run_extraction():
+            print("\n✓ Playwright data extraction completed successfully!")
+        else:
+            print("\n✗ Playwright data extraction failed or was incomplete")
+
+    except Exception as e:
+        print(f"\n✗ Playwright data extraction failed: {e}")
+
+
+if __name__ == "__main__":
+    main_playwright()
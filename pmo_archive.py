@@ -0,0 +1,357 @@
+"""
+Recording and browserless replay of scorecard pages.
+
+PageRecorder saves the raw grid of every store a run extracts (the page HTML,
+the grid fragment read from the DOM or the UpdatePanel delta captured over CDP,
+whatever the backend parsed) to a gzip-compressed JSON-lines archive, one line
+per store:
+
+    {"year", "month", "extract_type", "value_field", "last_control", "backend",
+     "regional", "store", "store_info", "raw", "captured", "record"}
+
+"record" is the row the run built from that page, so a replay can tell whether
+today's parsing code still produces the same rows.
+
+ReplayBackend serves an archive to ExtractionRunner instead of a browser: the
+stores, their order and their grids come from the archive, and everything after
+read_grid (build_store_record, classification, the storage sinks) runs
+unchanged. That makes parser and sink changes measurable on thousands of
+recorded pages in seconds, and checkable against what production produced.
+
+    PMO_RECORD=pages.jsonl.gz python Storekpisinglepasswithlog2.py
+    python pmo_runner.py --engine http --record pages.jsonl.gz
+    python pmo_archive.py info pages.jsonl.gz
+    python pmo_archive.py replay pages.jsonl.gz --check
+    python pmo_archive.py replay pages.jsonl.gz --repeat 20 --formats csv,sqlite
+"""
+import os
+import sys
+import gzip
+import json
+import time
+import logging
+import argparse
+import threading
+import zlib
+from functools import wraps
+from datetime import datetime
+from collections import Counter, defaultdict
+
+from pmo_grid import grid_texts
+from pmo_backends import ExtractionBackend, StoreFailure, FAILURE_STALE_NODE
+
+logger = logging.getLogger(__name__)
+
+# Row fields that differ between any two runs and are left out of --check
+VOLATILE_FIELDS = ('Extraction_DateTime', 'Extraction_Method')
+
+
+def plain_store_info(store_info):
+    """The JSON-safe part of a store_info dict (tree entries can carry WebElements)"""
+    plain = {}
+    for key, value in store_info.items():
+        if isinstance(value, (str, int, float, bool)) or value is None:
+            plain[key] = value
+        elif isinstance(value, (list, tuple)) and all(isinstance(item, (str, int, float)) for item in value):
+            plain[key] = list(value)
+    return plain
+
+
+def read_pages(path):
+    """Yield the pages of an archive; a run that was killed mid-write loses only its last page"""
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    except (EOFError, zlib.error, json.JSONDecodeError) as e:
+        logger.warning(f"Archive {path} is truncated ({e}); using the pages before that point")
+
+
+class PageArchive:
+    """Append-only gzip JSON-lines archive of recorded pages"""
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): Archive file; an existing archive is appended to
+        """
+        self.path = path
+        self.pages = 0
+        self._file = None
+        self._lock = threading.Lock()
+
+    def add(self, page):
+        with self._lock:
+            if self._file is None:
+                self._file = gzip.open(self.path, 'at', encoding='utf-8')
+            self._file.write(json.dumps(page, ensure_ascii=False, default=str) + '\n')
+            self.pages += 1
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        logger.info(f"✓ {self.pages} page(s) recorded to {self.path}")
+
+
+class PageRecorder:
+    def __init__(self, *archives):
+        """
+        Args:
+            archives: Where the pages go: PageArchive, pmo_rawstore.RawPageStore
+                (anything with add(page) and close())
+        """
+        self.archives = archives
+        self.missing = 0
+        self._local = threading.local()
+
+    @classmethod
+    def create(cls, record_path=None, raw_store=None):
+        """Recorder for an archive file and/or a raw page store directory, or None without either"""
+        archives = []
+        if record_path:
+            archives.append(PageArchive(record_path))
+        if raw_store:
+            from pmo_rawstore import RawPageStore
+            archives.append(RawPageStore(raw_store))
+        return cls(*archives) if archives else None
+
+    @classmethod
+    def from_env(cls):
+        """Recorder for $PMO_RECORD and $PMO_RAW_STORE, or None when neither is set"""
+        return cls.create(os.getenv('PMO_RECORD', '').strip(), os.getenv('PMO_RAW_STORE', '').strip())
+
+    def instrument_runner(self, runner):
+        """Record the grid behind every row an ExtractionRunner builds"""
+        backend = runner.backend
+        read_grid = backend.read_grid
+        add_record = runner.add_record
+        extract_store = runner.extract_store
+
+        @wraps(read_grid)
+        def recorded_read_grid():
+            texts = read_grid()
+            page = getattr(self._local, 'page', None)
+            if page is not None:
+                try:
+                    page['raw'] = backend.raw_grid()
+                except Exception as e:
+                    logger.warning(f"Could not read the raw grid of '{page['store']}': {e}")
+            return texts
+        backend.read_grid = recorded_read_grid
+
+        @wraps(add_record)
+        def recorded_add_record(record):
+            page = getattr(self._local, 'page', None)
+            if page is not None:
+                page['record'] = record
+            return add_record(record)
+        runner.add_record = recorded_add_record
+
+        @wraps(extract_store)
+        def recorded_extract_store(store_info):
+            self._local.page = {
+                'year': runner.year, 'month': runner.month, 'extract_type': runner.extract_type,
+                'value_field': runner.value_field, 'last_control': runner.last_control,
+                'backend': backend.name, 'regional': store_info.get('regional'),
+                'store': store_info.get('name'), 'store_info': plain_store_info(store_info),
+                'raw': None, 'captured': datetime.now().isoformat(), 'record': None,
+            }
+            try:
+                return extract_store(store_info)
+            finally:
+                page, self._local.page = self._local.page, None
+                if page['raw'] and page['record']:
+                    for archive in self.archives:
+                        try:
+                            archive.add(page)
+                        except Exception as e:
+                            logger.error(f"Error recording page of '{page['store']}': {e}")
+                elif page['record']:
+                    self.missing += 1
+        runner.extract_store = recorded_extract_store
+
+    def close(self):
+        if self.missing:
+            logger.warning(f"{self.missing} extracted store(s) had no raw grid to record")
+        for archive in self.archives:
+            archive.close()
+
+
+class ReplayBackend(ExtractionBackend):
+    """Serves recorded pages of one period in place of a browser"""
+    name = "replay"
+    method_label = "Replay"
+
+    def __init__(self, pages):
+        """
+        Args:
+            pages (list): Archive pages of one period, in recording order
+        """
+        self.stores = defaultdict(list)
+        self.pages = {}
+        for page in pages:
+            key = (page['regional'], page['store'])
+            if key not in self.pages:
+                self.stores[page['regional']].append(dict(page['store_info'], regional=page['regional']))
+            # A store recorded twice (retried, or appended by a later run) replays its last page
+            self.pages[key] = page
+        self.current = None
+
+    def login(self):
+        pass
+
+    def select_period(self, year, month):
+        pass
+
+    def list_stores(self, regional_letter):
+        return list(self.stores.get(regional_letter, []))
+
+    def select_store(self, store_info, max_attempts=None):
+        self.current = self.pages.get((store_info['regional'], store_info['name']))
+        if self.current is None:
+            raise StoreFailure(FAILURE_STALE_NODE, f"Store '{store_info['name']}' is not in the archive")
+        return True
+
+    def recycle(self):
+        pass
+
+    def restart_browser(self):
+        pass
+
+    def read_grid(self):
+        return grid_texts(self.current['raw'])
+
+    def raw_grid(self):
+        return self.current['raw'] if self.current else None
+
+
+def group_by_period(pages):
+    """{(year, month, value_field, last_control, extract_type): [pages]} in archive order"""
+    groups = defaultdict(list)
+    for page in pages:
+        groups[(str(page['year']), int(page['month']), page['value_field'], page['last_control'],
+                page['extract_type'])].append(page)
+    return groups
+
+
+def replay(pages, extract_type=None, on_record=None):
+    """
+    Rebuild the rows of recorded pages with the current code; returns [(page, record)].
+
+    Args:
+        pages (list): Archive pages (read_pages)
+        extract_type (str): Build this kind of row instead of the recorded one
+        on_record (callable): Called with every rebuilt row, e.g. DataStorage.add_store_data
+    """
+    from pmo_runner import ExtractionRunner
+    from pmo_driver import RecyclePolicy
+
+    results = []
+    for (year, month, value_field, last_control, recorded_type), group in group_by_period(pages).items():
+        backend = ReplayBackend(group)
+        runner = ExtractionRunner(backend, sorted(backend.stores), year, month, extract_type or recorded_type,
+                                  value_field=value_field, last_control=last_control, on_record=on_record,
+                                  recycle_policy=RecyclePolicy())
+        # Pair each rebuilt row with the page it came from
+        add_record = runner.add_record
+
+        def paired_add_record(record, backend=backend, add_record=add_record):
+            results.append((backend.current, record))
+            return add_record(record)
+        runner.add_record = paired_add_record
+        runner.run()
+    return results
+
+
+def differences(recorded, rebuilt):
+    """[(field, recorded value, rebuilt value)] for the fields of two rows that disagree"""
+    fields = (set(recorded) | set(rebuilt)) - set(VOLATILE_FIELDS)
+    return [(field, recorded.get(field), rebuilt.get(field)) for field in sorted(fields)
+            if recorded.get(field) != rebuilt.get(field)]
+
+
+def check(results, limit=20):
+    """Compare rebuilt rows with the recorded ones; returns the number of differing rows"""
+    changed = 0
+    for page, record in results:
+        if not page or not page.get('record'):
+            continue
+        diff = differences(page['record'], record)
+        if not diff:
+            continue
+        changed += 1
+        if changed <= limit:
+            shown = ', '.join(f"{field}: {old!r} -> {new!r}" for field, old, new in diff[:5])
+            logger.error(f"✗ {page['regional']}/{page['store']} {page['year']}-{page['month']:02d}: {shown}"
+                         f"{' ...' if len(diff) > 5 else ''}")
+    return changed
+
+
+def info(pages):
+    periods = Counter((str(page['year']), int(page['month']), page['extract_type'], page['value_field'])
+                      for page in pages)
+    regionals = Counter(page['regional'] for page in pages)
+    size = sum(len(page['raw']) for page in pages)
+    logger.info(f"{len(pages)} page(s), {size / 1024 / 1024:.1f} MB of raw grid")
+    for (year, month, extract_type, value_field), count in sorted(periods.items()):
+        logger.info(f"  {year}-{month:02d} {extract_type} ({value_field}): {count} page(s)")
+    logger.info(f"  Regionals: {', '.join(f'{regional} {count}' for regional, count in sorted(regionals.items()))}")
+
+
+def main():
+    from pmo_storage import DataStorage
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Inspect and replay recorded scorecard pages")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    info_parser = subparsers.add_parser('info', help="Periods, regionals and size of an archive")
+    info_parser.add_argument('archive')
+    replay_parser = subparsers.add_parser('replay', help="Rebuild the rows of an archive without a browser")
+    replay_parser.add_argument('archive')
+    replay_parser.add_argument('--extract-type', choices=['all', 'financial', 'scores',
+                                                          'legacy_financial', 'legacy_scores'], default=None,
+                               help="Build this row type instead of the recorded one")
+    replay_parser.add_argument('--repeat', type=int, default=1, help="Replay the archive this many times")
+    replay_parser.add_argument('--formats', default=None, help="Also save the rows: csv,json,sqlite,text")
+    replay_parser.add_argument('--check', action='store_true',
+                               help="Fail when a rebuilt row differs from the recorded one")
+    args = parser.parse_args()
+
+    pages = list(read_pages(args.archive))
+    if args.command == 'info':
+        info(pages)
+        return
+
+    # The runner's per-store logging would dominate the parse time being measured
+    logging.getLogger('pmo_runner').setLevel(logging.WARNING)
+    storage = DataStorage(f"pmo_replay_{datetime.now().strftime('%Y%m%d_%H%M%S')}") if args.formats else None
+    start_time = time.time()
+    results = []
+    for _ in range(args.repeat):
+        results = replay(pages, args.extract_type, storage.add_store_data if storage else None)
+    elapsed = time.time() - start_time
+    rows = len(results) * args.repeat
+    logger.info(f"Replayed {rows} page(s) in {elapsed:.2f}s "
+                f"({rows / elapsed if elapsed else 0:.0f} pages/s, {elapsed / rows * 1000 if rows else 0:.2f} ms/page)")
+
+    if storage:
+        start_time = time.time()
+        storage.save_formats(args.formats.split(','))
+        logger.info(f"Saved {len(storage.all_data)} row(s) in {time.time() - start_time:.2f}s")
+
+    if args.check:
+        if args.extract_type:
+            parser.error("--check compares with the recorded rows; leave out --extract-type")
+        changed = check(results)
+        if changed:
+            logger.error(f"✗ {changed} of {len(results)} row(s) differ from the recording")
+            sys.exit(1)
+        logger.info(f"✓ All {len(results)} rebuilt row(s) match the recording")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,566 @@
+"""
+Extraction backends.
+
+Every engine implements the same five operations so that ExtractionRunner
+(pmo_runner.py) can drive any of them and they can be benchmarked against
+each other on the same workload:
+
+    login()                   -> authenticate and land on the dashboard
+    select_period(year, month)
+    list_stores(regional)     -> [{'name', 'regional', ...}]
+    select_store(store_info)  -> True when the store's grid is showing
+    read_grid()               -> {element_id: text} of the scorecard labels
+
+showing() tells which store and period the dashboard shows, where the engine
+can, so that callers changing the period under a selected store can check it.
+
+raw_grid() returns the markup behind the last read_grid (page HTML, grid
+fragment or UpdatePanel delta) for page recording (pmo_archive.py).
+
+When a store fails, classify_failure() names what went wrong (one of the
+FAILURE_* kinds below) so that pmo_recovery can apply the cheapest fix.
+"""
+import os
+import json
+import time
+import logging
+import requests
+
+from pmo_driver import renderer_memory_mb
+from pmo_standby import WarmStandby
+from pmo_grid import (BASE_URL, LOGIN_PATH, DASHBOARD_PATH, MONTH_NAMES, READ_GRID_JS, RAW_GRID_JS,
+                      SHOWING_JS, TREE_ID_PREFIX, YEAR_SELECT_ID, MONTH_SELECT_ID, kpi_label_id, grid_texts,
+                      parse_label_texts, parse_form_fields, parse_tree_stores, parse_period, shown_store_name)
+
+logger = logging.getLogger(__name__)
+
+# Failure taxonomy, from cheapest to most expensive to recover from
+FAILURE_STALE_NODE = "stale_node"            # tree link went stale or could not be re-located
+FAILURE_EMPTY_GRID = "empty_grid"            # store clicked but the grid never filled
+FAILURE_MODAL_FAILED = "modal_failed"        # View Other Scorecard modal did not open
+FAILURE_SESSION_EXPIRED = "session_expired"  # server sent us back to Login.aspx
+FAILURE_DRIVER_LOST = "driver_lost"          # browser or chromedriver no longer answers
+FAILURE_SERVER_ERROR = "server_error"        # PMO answered with HTTP 5xx or its runtime error page
+FAILURE_UNKNOWN = "unknown"
+
+# Title of the ASP.NET error page PMO shows instead of the dashboard
+SERVER_ERROR_TITLES = ("Runtime Error", "Server Error")
+
+
+class BackendError(Exception):
+    """A backend step failed in a way the runner should report"""
+
+
+class StoreFailure(BackendError):
+    """A store could not be selected; kind is one of the FAILURE_* values"""
+
+    def __init__(self, kind, message):
+        super().__init__(message)
+        self.kind = kind
+
+
+def is_server_error(error):
+    """True for an HTTP error whose response has a 5xx status"""
+    response = getattr(error, 'response', None)
+    return response is not None and getattr(response, 'status_code', 0) >= 500
+
+
+class ExtractionBackend:
+    name = "base"
+    method_label = "Single-Pass-Fast"
+
+    def login(self):
+        raise NotImplementedError
+
+    def select_period(self, year, month):
+        raise NotImplementedError
+
+    def list_stores(self, regional_letter):
+        raise NotImplementedError
+
+    def select_store(self, store_info, max_attempts=None):
+        raise NotImplementedError
+
+    def reset_modal(self):
+        """Make the next select_store start from a freshly opened store tree"""
+        pass
+
+    def relocate_node(self):
+        """Make the next select_store look the store up again in the tree that is already open"""
+        pass
+
+    def recycle(self):
+        """Replace the underlying browser/connection; a new login is needed afterwards"""
+        raise NotImplementedError
+
+    def restart_browser(self):
+        """Replace the browser but keep the session: no login, same dashboard period"""
+        raise NotImplementedError
+
+    def failover(self):
+        """Switch to a spare that is already logged in; False when there is none"""
+        return False
+
+    def export_cookies(self):
+        """Cookies of the logged-in session as [{'name', 'value', 'domain', 'path', ...}]"""
+        raise NotImplementedError
+
+    def adopt_cookies(self, cookies):
+        """Continue with another session's cookies and land on the dashboard; raises if not accepted"""
+        raise NotImplementedError
+
+    def memory_mb(self):
+        """Renderer memory for RecyclePolicy, or None when the engine cannot measure it"""
+        return None
+
+    def session_expired(self):
+        """Cheap probe run before every store; True when the server has dropped the session"""
+        return False
+
+    def classify_failure(self, error):
+        """Map an exception raised while selecting a store to a FAILURE_* kind"""
+        if isinstance(error, StoreFailure):
+            return error.kind
+        if is_server_error(error):
+            return FAILURE_SERVER_ERROR
+        return FAILURE_UNKNOWN
+
+    def read_grid(self):
+        raise NotImplementedError
+
+    def showing(self):
+        """(store name, (year, month)) the dashboard shows; None for whatever the engine cannot tell"""
+        return None, None
+
+    def raw_grid(self):
+        """Markup the last read_grid parsed, or None when the engine cannot provide it"""
+        return None
+
+    def close(self):
+        pass
+
+
+class SeleniumBackend(ExtractionBackend):
+    """
+    Drives the Chrome session of an existing extractor object (PMOFastDataExtractor,
+    PMODataExtractor, ...), so each script keeps its own tree IDs and wait logic.
+    """
+    name = "selenium"
+
+    def __init__(self, extractor, standby=None):
+        """
+        Args:
+            extractor: Extractor object that owns the driver
+            standby (bool): Keep a logged-in spare browser for failover (default: $PMO_WARM_STANDBY)
+        """
+        self.extractor = extractor
+        self._modal_open = False
+        self._store_selected = False
+        self.period = None
+        if standby is None:
+            standby = os.getenv('PMO_WARM_STANDBY', '').lower() in ('1', 'true', 'yes')
+        self.standby = WarmStandby(extractor) if standby else None
+
+    @property
+    def driver(self):
+        return self.extractor.driver
+
+    @property
+    def pacer(self):
+        return getattr(self.extractor, 'pacer', None)
+
+    def login(self):
+        self.extractor.login()
+        self.extractor.navigate_to_dashboard()
+        self._modal_open = False
+        self._store_selected = False
+
+    def select_period(self, year, month):
+        self.period = (year, month)
+        self.extractor.current_year = str(year)
+        self.extractor.current_month = month
+        self.extractor.select_year_and_month()
+        if self.standby:
+            self.standby.start()
+
+    def open_modal(self):
+        """Open the View Other Scorecard modal, closing a stale one first"""
+        if self._store_selected:
+            logger.info("Preparing for next store...")
+            self.extractor.close_modal_if_open()
+        if not self.extractor.click_view_other_scorecard():
+            raise StoreFailure(FAILURE_MODAL_FAILED, "Failed to open View Other Scorecard modal")
+        self._modal_open = True
+
+    def list_stores(self, regional_letter):
+        self.open_modal()
+        return self.extractor.get_stores_by_regional_fresh(regional_letter)
+
+    def select_store(self, store_info, max_attempts=None):
+        if not self._modal_open:
+            self.open_modal()
+        self._modal_open = False
+        self._store_selected = True
+        self.extractor.last_failure = None
+        if max_attempts:
+            selected = self.extractor.select_store_robust(store_info, max_attempts=max_attempts)
+        else:
+            selected = self.extractor.select_store_robust(store_info)
+        if not selected:
+            raise StoreFailure(getattr(self.extractor, 'last_failure', None) or FAILURE_UNKNOWN,
+                               "Failed to select store")
+        return True
+
+    def reset_modal(self):
+        self._modal_open = False
+        self._store_selected = True
+
+    def relocate_node(self):
+        from selenium.webdriver.common.by import By
+
+        # select_store_robust looks the node up afresh; keep the tree if it is still showing
+        if self.driver.find_elements(By.CSS_SELECTOR, f"[id^='{TREE_ID_PREFIX}']"):
+            self._modal_open = True
+            self._store_selected = False
+        else:
+            self.reset_modal()
+
+    def recycle(self):
+        """Quit the browser and start a new one with the same settings"""
+        try:
+            self.driver.quit()
+        except Exception as e:
+            logger.warning(f"Error while quitting the old driver: {e}")
+        self.extractor.setup_driver(**getattr(self.extractor, 'driver_settings', {}))
+        self._modal_open = False
+        self._store_selected = False
+
+    def failover(self):
+        if not self.standby or not self.standby.promote():
+            return False
+        self._modal_open = False
+        self._store_selected = False
+        if self.period:
+            self.select_period(*self.period)
+        return True
+
+    def restart_browser(self):
+        """
+        Relaunch Chrome and carry the ASP.NET session cookies over, then reopen
+        the dashboard and reselect the period. Much cheaper than a full login.
+        """
+        cookies = self.export_cookies()
+        self.recycle()
+        self.adopt_cookies(cookies)
+        if self.period:
+            self.select_period(*self.period)
+        logger.info("✓ Browser restarted with the existing session")
+
+    def export_cookies(self):
+        return self.driver.get_cookies()
+
+    def adopt_cookies(self, cookies):
+        # Cookies can only be set for the domain that is loaded
+        self.driver.get(f"{BASE_URL}{LOGIN_PATH}")
+        self.driver.delete_all_cookies()
+        for cookie in cookies:
+            cookie = dict(cookie)
+            cookie.pop('sameSite', None)
+            if 'expiry' in cookie:
+                cookie['expiry'] = int(cookie['expiry'])
+            self.driver.add_cookie(cookie)
+
+        self.driver.get(f"{BASE_URL}{DASHBOARD_PATH}")
+        if self.session_expired():
+            raise BackendError("Session cookies were not accepted by the browser")
+        self._modal_open = False
+        self._store_selected = False
+
+    def memory_mb(self):
+        try:
+            return renderer_memory_mb(self.driver)
+        except Exception as e:
+            logger.warning(f"Could not read renderer memory: {e}")
+            return None
+
+    def session_expired(self):
+        """Redirected to the login page, or its user field is showing"""
+        from selenium.webdriver.common.by import By
+
+        return "Login.aspx" in self.driver.current_url or \
+            bool(self.driver.find_elements(By.ID, "txt_UserID"))
+
+    def classify_failure(self, error):
+        from selenium.common.exceptions import StaleElementReferenceException
+
+        try:
+            if self.session_expired():
+                return FAILURE_SESSION_EXPIRED
+            title = self.driver.title or ''
+        except Exception:
+            return FAILURE_DRIVER_LOST
+        if any(marker in title for marker in SERVER_ERROR_TITLES):
+            return FAILURE_SERVER_ERROR
+        if isinstance(error, StaleElementReferenceException):
+            return FAILURE_STALE_NODE
+        return super().classify_failure(error)
+
+    def read_grid(self):
+        texts = self.driver.execute_script(READ_GRID_JS) or {}
+        # Extractors with EMPTY_REVENUE_RETRIES (Storekpi) read a blank revenue cell again before accepting it
+        retries = getattr(self.extractor, 'EMPTY_REVENUE_RETRIES', 0)
+        if not retries or getattr(self.extractor, 'extract_scores', False):
+            return texts
+        value_field = getattr(self.extractor, 'VALUE_FIELD', 'YTDAchievement')
+        revenue_id = kpi_label_id(2, f"{value_field}{self.extractor.current_month}")
+        for attempt in range(1, retries + 1):
+            if texts.get(revenue_id, '').strip() not in ('', '-'):
+                break
+            logger.warning(f"Revenue empty on attempt {attempt}, retrying...")
+            if self.pacer:
+                self.pacer.retry_sleep(3)
+            else:
+                time.sleep(3)
+            texts = self.driver.execute_script(READ_GRID_JS) or {}
+        return texts
+
+    def showing(self):
+        store, year, month = self.driver.execute_script(SHOWING_JS) or (None, None, None)
+        return (store.strip() if store else None), parse_period(year, month)
+
+    def raw_grid(self):
+        # One more round trip; only made when pages are being recorded
+        return self.driver.execute_script(RAW_GRID_JS) or None
+
+    def close(self):
+        if self.standby:
+            self.standby.close()
+        if self.driver:
+            self.driver.quit()
+            logger.info("Browser closed")
+
+
+class CdpCaptureBackend(SeleniumBackend):
+    """
+    Selenium navigation, but the grid is read from the Dashboard.aspx response
+    captured through the Chrome DevTools protocol instead of from the DOM.
+    The extractor's driver must be started with capture_network=True.
+    """
+    name = "cdp"
+    method_label = "CDP-Capture"
+
+    def select_store(self, store_info, max_attempts=None):
+        self.drain_performance_log()
+        return super().select_store(store_info, max_attempts)
+
+    def drain_performance_log(self):
+        try:
+            return self.driver.get_log('performance')
+        except Exception as e:
+            logger.warning(f"Performance log not available: {e}")
+            return []
+
+    def last_dashboard_response_id(self):
+        request_id = None
+        for entry in self.drain_performance_log():
+            message = json.loads(entry['message'])['message']
+            if message.get('method') != 'Network.responseReceived':
+                continue
+            params = message['params']
+            if 'Dashboard.aspx' in params['response']['url']:
+                request_id = params['requestId']
+        return request_id
+
+    def read_grid(self):
+        self.last_body = None
+        request_id = self.last_dashboard_response_id()
+        if not request_id:
+            logger.warning("No captured Dashboard.aspx response, reading grid from DOM")
+            return super().read_grid()
+
+        body = self.driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})['body']
+        texts = grid_texts(body)
+        if texts:
+            self.last_body = body
+        return texts or super().read_grid()
+
+    def raw_grid(self):
+        return getattr(self, 'last_body', None) or super().raw_grid()
+
+
+class HttpBackend(ExtractionBackend):
+    """
+    Browserless engine: replays the ASP.NET WebForms postbacks with requests
+    and parses the returned HTML.
+    """
+    name = "http"
+    method_label = "HTTP-Postback"
+
+    def __init__(self, username, password, base_url=None, regional_divs=None,
+                 value_field="YTDAchievement", timeout=60, grid_attempts=3):
+        self.username = username
+        self.password = password
+        self.base_url = (base_url or BASE_URL).rstrip('/')
+        self.regional_divs = regional_divs
+        self.value_field = value_field
+        self.timeout = timeout
+        self.grid_attempts = grid_attempts
+        self.session = None
+        self.url = None
+        self.html = ""
+        self.month = None
+        self.recycle()
+
+    def _store_response(self, response):
+        response.raise_for_status()
+        self.url = response.url
+        self.html = response.text
+        return self.html
+
+    def get(self, url):
+        return self._store_response(self.session.get(url, timeout=self.timeout))
+
+    def postback(self, event_target=None, event_argument="", button_id=None, values=None):
+        """Re-post the current form as the browser would for a control event"""
+        fields, id_to_name, _ = parse_form_fields(self.html)
+        fields['__EVENTTARGET'] = id_to_name.get(event_target, event_target) if event_target else ''
+        fields['__EVENTARGUMENT'] = event_argument
+        if button_id:
+            button_name = id_to_name.get(button_id)
+            if not button_name:
+                raise BackendError(f"Button {button_id} not found on {self.url}")
+            fields[button_name] = ''
+        for element_id, value in (values or {}).items():
+            fields[id_to_name.get(element_id, element_id)] = value
+        return self._store_response(self.session.post(self.url, data=fields, timeout=self.timeout))
+
+    def login(self):
+        logger.info("Navigating to login page (HTTP)")
+        self.get(f"{self.base_url}{LOGIN_PATH}")
+        self.postback(button_id="robLogin",
+                      values={"txt_UserID": self.username, "txt_Password": self.password})
+        logger.info("Login credentials submitted")
+
+        if 'btnSaveInputRole' in self.html:
+            self.postback(button_id="btnSaveInputRole")
+            logger.info("Popup modal handled")
+
+        if "Home/Home.aspx" not in self.url:
+            raise BackendError(f"Login failed, landed on {self.url}")
+        logger.info("Login successful")
+
+        self.get(f"{self.base_url}{DASHBOARD_PATH}")
+        if YEAR_SELECT_ID not in self.html:
+            raise BackendError("Dashboard did not load")
+        logger.info("Successfully navigated to dashboard")
+
+    def _select_option(self, element_id, text):
+        _, id_to_name, options = parse_form_fields(self.html)
+        value = options.get(id_to_name.get(element_id), {}).get(text)
+        if value is None:
+            raise BackendError(f"Option '{text}' not found in {element_id}")
+        self.postback(event_target=element_id, values={element_id: value})
+
+    def select_period(self, year, month):
+        logger.info(f"Selecting year {year} and month {month}")
+        self.month = month
+        self._select_option(YEAR_SELECT_ID, str(year))
+        self._select_option(MONTH_SELECT_ID, MONTH_NAMES[month - 1])
+
+    def list_stores(self, regional_letter):
+        self.postback(button_id="ctl00_ContentPlaceHolder1_btnViewOtherSCO")
+        if 'OrganizationTreeView1' not in self.html:
+            raise StoreFailure(FAILURE_MODAL_FAILED, "View Other Scorecard did not show the tree")
+        stores = parse_tree_stores(self.html, regional_letter, self.regional_divs)
+        logger.info(f"✓ Found {len(stores)} active stores in Regional {regional_letter}")
+        return stores
+
+    def select_store(self, store_info, max_attempts=None):
+        """
+        Click the store in the tree. A postback can answer with the previous store's grid or a
+        blank one, so the store heading and the revenue cell are checked and the click repeated
+        up to grid_attempts times. A revenue cell still blank on the last attempt is kept.
+        max_attempts (the Selenium tree-click retries) does not apply to a postback.
+        """
+        if not store_info.get('postback'):
+            raise StoreFailure(FAILURE_STALE_NODE, f"No postback target for store '{store_info['name']}'")
+
+        target, argument = store_info['postback']
+        revenue_id = kpi_label_id(2, f"{self.value_field}{self.month}")
+        attempts = self.grid_attempts
+        for attempt in range(1, attempts + 1):
+            if 'OrganizationTreeView1' not in self.html:
+                self.postback(button_id="ctl00_ContentPlaceHolder1_btnViewOtherSCO")
+            self.postback(event_target=target, event_argument=argument)
+            shown = shown_store_name(self.html)
+            if shown is not None and shown != store_info['name'].strip():
+                logger.warning(f"Stale grid for {store_info['name']} (showing {shown}), attempt {attempt}")
+                continue
+            revenue = parse_label_texts(self.html).get(revenue_id)
+            if revenue is None:
+                return False
+            if revenue not in ('', '-') or attempt == attempts:
+                return True
+            logger.warning(f"Revenue empty for {store_info['name']}, attempt {attempt}")
+        raise StoreFailure(FAILURE_STALE_NODE, f"Grid still shows '{shown}' instead of '{store_info['name']}'")
+
+    def reset_modal(self):
+        self.postback(button_id="ctl00_ContentPlaceHolder1_btnViewOtherSCO")
+
+    def recycle(self):
+        """Start over with a new connection pool and an empty cookie jar"""
+        if self.session:
+            self.session.close()
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+                                              "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36")
+        self.url = None
+        self.html = ""
+
+    def export_cookies(self):
+        return [{'name': cookie.name, 'value': cookie.value, 'domain': cookie.domain, 'path': cookie.path}
+                for cookie in self.session.cookies]
+
+    def adopt_cookies(self, cookies):
+        self.session.cookies.clear()
+        for cookie in cookies:
+            self.session.cookies.set(cookie['name'], cookie['value'],
+                                     domain=cookie.get('domain', ''), path=cookie.get('path', '/'))
+        self.get(f"{self.base_url}{DASHBOARD_PATH}")
+        if self.session_expired() or YEAR_SELECT_ID not in self.html:
+            raise BackendError("Session cookies were not accepted")
+
+    def session_expired(self):
+        """Redirected to the login page, or the login form was served in place of the page"""
+        return (bool(self.url) and "Login.aspx" in self.url) or 'id="txt_UserID"' in self.html
+
+    def classify_failure(self, error):
+        if isinstance(error, requests.ConnectionError):
+            return FAILURE_DRIVER_LOST
+        if is_server_error(error):
+            return FAILURE_SERVER_ERROR
+        if self.session_expired():
+            return FAILURE_SESSION_EXPIRED
+        if isinstance(error, StoreFailure):
+            return error.kind
+        if "OrganizationTreeView1" not in self.html:
+            return FAILURE_MODAL_FAILED
+        return FAILURE_EMPTY_GRID
+
+    def read_grid(self):
+        return parse_label_texts(self.html)
+
+    def showing(self):
+        fields, id_to_name, options = parse_form_fields(self.html)
+
+        def selected_text(element_id):
+            name = id_to_name.get(element_id)
+            return next((text for text, value in options.get(name, {}).items() if value == fields.get(name)), None)
+        period = parse_period(selected_text(YEAR_SELECT_ID), selected_text(MONTH_SELECT_ID))
+        return shown_store_name(self.html), period
+
+    def raw_grid(self):
+        return self.html or None
+
+    def close(self):
+        self.session.close()
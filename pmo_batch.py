@@ -0,0 +1,226 @@
+"""
+Non-interactive batch extraction from a manifest.
+
+    python pmo_batch.py month_end.yaml
+
+The manifest (YAML or JSON) lists the jobs:
+
+    engine: selenium          # selenium, cdp or http
+    workers: 2                # parallel browser sessions
+    headless: true
+    lean: true
+    output_dir: exports
+    jobs:
+      - name: achievement_may
+        year: 2024
+        month: 5
+        regionals: ALL          # or [A, B] / "A,B"
+        extract_type: all       # all, financial or scores
+        column: achievement     # achievement or target
+        sinks: [csv, sqlite]
+
+Jobs that read the same column are grouped by period and packed into lanes.
+Each lane is one logged-in session that runs its jobs one after the other, and
+the lanes run in parallel. Every job writes <output_dir>/<name>.status.json as
+it goes. The exit code is non-zero when any job failed, so cron can alert.
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import threading
+from datetime import datetime
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from pmo_grid import ALL_REGIONALS
+from pmo_storage import DataStorage
+from pmo_runner import ExtractionRunner, COLUMN_SETS, create_backend
+
+logger = logging.getLogger(__name__)
+
+JOB_DEFAULTS = {'regionals': 'ALL', 'extract_type': 'all', 'column': 'achievement', 'sinks': ['csv']}
+
+
+def load_manifest(path):
+    """Read a YAML or JSON manifest and fill in job defaults"""
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+
+    if path.lower().endswith(('.yaml', '.yml')):
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError("YAML manifests need PyYAML (pip install pyyaml); or use JSON")
+        manifest = yaml.safe_load(text)
+    else:
+        manifest = json.loads(text)
+
+    jobs = []
+    for i, raw_job in enumerate(manifest.get('jobs') or [], 1):
+        job = dict(JOB_DEFAULTS, **raw_job)
+        if 'year' not in job or 'month' not in job:
+            raise ValueError(f"Job {i} needs a year and a month")
+        job['year'], job['month'] = int(job['year']), int(job['month'])
+        if not 1 <= job['month'] <= 12:
+            raise ValueError(f"Job {i}: month must be 1-12")
+        if job['column'] not in COLUMN_SETS:
+            raise ValueError(f"Job {i}: unknown column '{job['column']}'. Options: {', '.join(COLUMN_SETS)}")
+
+        regionals = job['regionals']
+        if isinstance(regionals, str):
+            regionals = ALL_REGIONALS if regionals.upper() == 'ALL' else regionals.split(',')
+        job['regionals'] = [r.strip().upper() for r in regionals if r.strip()]
+        unknown = [r for r in job['regionals'] if r not in ALL_REGIONALS]
+        if unknown:
+            raise ValueError(f"Job {i}: unknown regionals {unknown}")
+
+        if isinstance(job['sinks'], str):
+            job['sinks'] = [s.strip() for s in job['sinks'].split(',')]
+        job.setdefault('name', f"{job['column']}_{job['extract_type']}_{job['year']}_{job['month']:02d}_"
+                               f"{''.join(job['regionals'])}")
+        jobs.append(job)
+
+    if not jobs:
+        raise ValueError("Manifest has no jobs")
+    names = [job['name'] for job in jobs]
+    if len(set(names)) != len(names):
+        raise ValueError("Job names must be unique")
+
+    manifest['jobs'] = jobs
+    return manifest
+
+
+def plan_lanes(jobs, workers):
+    """
+    Group jobs that can share a session (same column and period) and spread the
+    groups over at most `workers` lanes, heaviest first onto the lightest lane.
+    """
+    groups = defaultdict(list)
+    for job in jobs:
+        groups[(job['column'], job['year'], job['month'])].append(job)
+
+    lanes = [[] for _ in range(max(1, min(workers, len(groups))))]
+    loads = [0] * len(lanes)
+    for key in sorted(groups, key=lambda k: -sum(len(job['regionals']) for job in groups[k])):
+        lightest = loads.index(min(loads))
+        lanes[lightest].extend(groups[key])
+        loads[lightest] += sum(len(job['regionals']) for job in groups[key])
+
+    # Within a lane, jobs on the same column and period sit next to each other
+    for lane in lanes:
+        lane.sort(key=lambda job: (job['column'], job['year'], job['month']))
+    return [lane for lane in lanes if lane]
+
+
+class BatchRunner:
+    def __init__(self, manifest, username, password):
+        self.manifest = manifest
+        self.username = username
+        self.password = password
+        self.output_dir = manifest.get('output_dir', '.')
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.statuses = {}
+        self._lock = threading.Lock()
+
+        for job in manifest['jobs']:
+            self.update_status(job, state='pending')
+
+    def update_status(self, job, **fields):
+        """Merge fields into the job's status and rewrite its status file"""
+        with self._lock:
+            status = self.statuses.setdefault(job['name'], {'job': job['name']})
+            status.update(fields, updated=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+            path = os.path.join(self.output_dir, f"{job['name']}.status.json")
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(status, f, indent=2, ensure_ascii=False)
+
+    def new_backend(self, column):
+        return create_backend(self.manifest.get('engine', 'selenium'), self.username, self.password,
+                              headless=self.manifest.get('headless', True),
+                              base_url=self.manifest.get('base_url'),
+                              performance_profile=self.manifest.get('lean', False),
+                              pacing_profile=self.manifest.get('pacing'),
+                              column=column)
+
+    def run_job(self, job, backend, logged_in):
+        columns = COLUMN_SETS[job['column']]
+        storage = DataStorage(os.path.join(self.output_dir, f"{job['name']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"),
+                              value_label=columns['value_label'])
+        runner = ExtractionRunner(backend, job['regionals'], job['year'], job['month'], job['extract_type'],
+                                  value_field=columns['value_field'], last_control=columns['last_control'],
+                                  on_record=storage.add_store_data)
+
+        self.update_status(job, state='running', started=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+        start_time = time.time()
+        runner.run(logged_in=logged_in)
+        saved_files = storage.save_formats(job['sinks'])
+
+        errors = sum(1 for record in runner.records if record.get('Error_Message') not in (None, '', 'None'))
+        self.update_status(job, state='done', records=len(runner.records), errors=errors,
+                           seconds=round(time.time() - start_time, 1),
+                           files=[filename for _, filename in saved_files])
+        logger.info(f"✓ Job {job['name']}: {len(runner.records)} stores, {errors} errors")
+
+    def run_lane(self, lane):
+        """Run a lane's jobs in order on one session, starting a new one only when needed"""
+        backend, column, logged_in = None, None, False
+        try:
+            for job in lane:
+                try:
+                    if backend is None or job['column'] != column:
+                        if backend:
+                            backend.close()
+                        backend, column, logged_in = self.new_backend(job['column']), job['column'], False
+                    self.run_job(job, backend, logged_in)
+                    logged_in = True
+                except Exception as e:
+                    logger.error(f"Job {job['name']} failed: {e}")
+                    self.update_status(job, state='failed', error=str(e))
+                    if backend:
+                        backend.close()
+                    backend = None
+        finally:
+            if backend:
+                backend.close()
+
+    def run(self):
+        """Run every job; returns True when all of them finished"""
+        lanes = plan_lanes(self.manifest['jobs'], int(self.manifest.get('workers', 1)))
+        logger.info(f"Running {len(self.manifest['jobs'])} job(s) in {len(lanes)} session(s)")
+        for i, lane in enumerate(lanes, 1):
+            logger.info(f"  Session {i}: {', '.join(job['name'] for job in lane)}")
+
+        with ThreadPoolExecutor(max_workers=len(lanes)) as executor:
+            list(executor.map(self.run_lane, lanes))
+
+        failed = [name for name, status in self.statuses.items() if status['state'] != 'done']
+        if failed:
+            logger.error(f"{len(failed)} job(s) failed: {', '.join(failed)}")
+        return not failed
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(threadName)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Run the PMO extraction jobs listed in a manifest")
+    parser.add_argument('manifest', help="YAML or JSON job manifest")
+    parser.add_argument('--workers', type=int, default=None, help="Override the manifest's worker count")
+    args = parser.parse_args()
+
+    manifest = load_manifest(args.manifest)
+    if args.workers:
+        manifest['workers'] = args.workers
+
+    username, password = os.getenv('PMO_USERNAME'), os.getenv('PMO_PASSWORD')
+    if not username or not password:
+        logger.error("Set PMO_USERNAME and PMO_PASSWORD for batch runs")
+        sys.exit(2)
+
+    sys.exit(0 if BatchRunner(manifest, username, password).run() else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,387 @@
+"""
+End-to-end throughput benchmark of every extractor variant against the mock PMO.
+
+Each variant runs in a fresh process against pmo_mock_server.py with a fixed
+synthetic org tree (7 regionals x 43 stores by default) and reports:
+
+    stores/min          main pass and retries, login included
+    p50 / p95           seconds per store (ExtractionRunner.extract_store)
+    peak RSS            the variant's process tree (psutil), or its own peak without psutil
+    commands/store      WebDriver commands per store (browser variants)
+    wrong values        rows whose values differ from what the mock served for that store
+
+The results are compared with a baseline JSON; a variant that is slower, uses
+more memory or more commands than the baseline by more than the threshold is
+flagged as a regression and the run exits with status 1. So does a store over
+--command-budget or a variant that recorded a wrong value.
+
+    python pmo_bench.py --headless --lean
+    python pmo_bench.py --variants fast_all,target_all --profile month_end --seed 1
+    python pmo_bench.py --headless --update-baseline
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import importlib
+import threading
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+from pmo_grid import ALL_REGIONALS, parse_number
+from pmo_mock_server import MockPMOServer, MockPMOData, FaultProfile, MOCK_PROFILES
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASELINE = "pmo_bench_baseline.json"
+# The mock's year dropdown runs from three years back to next year, so the period follows the clock
+BENCH_YEAR, BENCH_MONTH = datetime.now().year, 6
+
+# Variant -> how to build its extractor and which rows it produces
+VARIANTS = {
+    'storekpi_financial': {'module': 'Storekpi', 'class': 'PMODataExtractor',
+                           'kwargs': {'extract_scores': False}, 'extract_type': 'legacy_financial',
+                           'column': 'achievement'},
+    'storekpi_scores': {'module': 'Storekpi', 'class': 'PMODataExtractor',
+                        'kwargs': {'extract_scores': True}, 'extract_type': 'legacy_scores',
+                        'column': 'achievement'},
+    'fast_all': {'module': 'Storekpisinglepasswithlog2', 'class': 'PMOFastDataExtractor',
+                 'kwargs': {'extract_type': 'all'}, 'extract_type': 'all', 'column': 'achievement'},
+    'fast_financial': {'module': 'Storekpisinglepasswithlog2', 'class': 'PMOFastDataExtractor',
+                       'kwargs': {'extract_type': 'financial'}, 'extract_type': 'financial',
+                       'column': 'achievement'},
+    'fast_scores': {'module': 'Storekpisinglepasswithlog2', 'class': 'PMOFastDataExtractor',
+                    'kwargs': {'extract_type': 'scores'}, 'extract_type': 'scores', 'column': 'achievement'},
+    'target_all': {'module': 'target', 'class': 'PMOFastDataExtractor',
+                   'kwargs': {'extract_type': 'all'}, 'extract_type': 'all', 'column': 'target'},
+    'http_all': {'engine': 'http', 'extract_type': 'all', 'column': 'achievement'},
+}
+
+# Result field -> +1 when higher is better, -1 when lower is better
+COMPARED_FIELDS = {
+    'stores_per_min': 1,
+    'p95_seconds': -1,
+    'peak_rss_mb': -1,
+    'commands_per_store': -1,
+}
+
+# Which value of a row is checked against the mock, per extract type
+CHECKED_VALUES = {
+    'all': ('KPI_02_Value', 'value'),
+    'financial': ('Financial_Revenue_ACH', 'value'),
+    'legacy_financial': ('Revenue_ACH', 'value'),
+    'scores': ('Financial_Score', 'score'),
+    'legacy_scores': ('Financial_Score', 'score'),
+}
+
+
+class PeakRss:
+    """Peak resident memory of this process and its children (Chrome, chromedriver)"""
+
+    def __init__(self, interval=0.5):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def sample(self):
+        process = psutil.Process()
+        total = process.memory_info().rss
+        for child in process.children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except psutil.Error:
+                pass
+        self.peak = max(self.peak, total)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.sample()
+            except Exception as e:
+                logger.debug(f"RSS sample failed: {e}")
+
+    def start(self):
+        if psutil:
+            self.sample()
+            self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Peak in MB, or None when it cannot be measured on this platform"""
+        if self._thread:
+            self._stop.set()
+            self._thread.join()
+            try:
+                self.sample()
+            except Exception as e:
+                logger.debug(f"RSS sample failed: {e}")
+            return round(self.peak / 1024 / 1024, 1)
+        try:
+            import resource
+        except ImportError:
+            return None
+        # Without psutil: our own peak (kB on Linux) plus the largest finished child
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss + \
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        return round(peak / 1024, 1)
+
+
+def wrong_values(records, data, year, month, extract_type):
+    """Rows whose checked value differs from what the mock served for that store"""
+    field, kind = CHECKED_VALUES[extract_type]
+    node_by_name = {name: node_id for node_id, (_, name) in data.stores.items()}
+    wrong = 0
+    for record in records:
+        node_id = node_by_name.get(record.get('Store'))
+        if record.get('Error_Message') not in (None, '', 'None') or node_id is None:
+            continue
+        if kind == 'score':
+            expected = parse_number(data.score(node_id, str(year), month, 'Financial_Score'))
+        else:
+            expected = parse_number(data.value(node_id, str(year), month, 2))
+        if record.get(field) != expected:
+            wrong += 1
+    return wrong
+
+
+def run_variant(variant, regionals, stores_per_regional, headless, lean, command_budget, verbose):
+    """Run one variant in this (fresh) process; returns its result dict"""
+    logging.getLogger().setLevel(logging.INFO if verbose else logging.WARNING)
+    from pmo_runner import ExtractionRunner, COLUMN_SETS, create_backend
+    from pmo_metrics import StepMetrics
+    from pmo_commands import CommandBudget
+
+    spec = VARIANTS[variant]
+    columns = COLUMN_SETS[spec['column']]
+    metrics = StepMetrics(f"pmo_bench_{variant}")
+    budget = None
+    rss = PeakRss()
+    rss.start()
+
+    start_time = time.time()
+    if spec.get('engine') == 'http':
+        backend = create_backend('http', 'bench', 'bench', column=spec['column'])
+    else:
+        from pmo_backends import SeleniumBackend
+        budget = CommandBudget(command_budget or None)
+        extractor_class = getattr(importlib.import_module(spec['module']), spec['class'])
+        extractor = extractor_class('bench', 'bench', year=BENCH_YEAR, month=BENCH_MONTH,
+                                    target_regionals=regionals, headless=headless,
+                                    performance_profile=lean, **spec['kwargs'])
+        backend = SeleniumBackend(extractor, standby=False)
+    runner = ExtractionRunner(backend, regionals, BENCH_YEAR, BENCH_MONTH, spec['extract_type'],
+                              value_field=columns['value_field'], last_control=columns['last_control'],
+                              metrics=metrics, command_budget=budget)
+    try:
+        runner.run()
+    finally:
+        backend.close()
+    elapsed = time.time() - start_time
+
+    records = runner.records
+    store_times = metrics.report()['steps'].get('extract_store', {})
+    data = MockPMOData(stores_per_regional, regionals, spec['column'])
+    result = {
+        'variant': variant,
+        'stores': len(records),
+        'errors': sum(1 for record in records if record.get('Error_Message') not in (None, '', 'None')),
+        'wrong_values': wrong_values(records, data, BENCH_YEAR, BENCH_MONTH, spec['extract_type']),
+        'seconds': round(elapsed, 2),
+        'stores_per_min': round(len(records) / elapsed * 60, 2) if elapsed else 0.0,
+        'p50_seconds': store_times.get('p50'),
+        'p95_seconds': store_times.get('p95'),
+        'peak_rss_mb': rss.stop(),
+        'commands_per_store': None,
+        'commands_total': None,
+        'command_budget_violations': 0,
+    }
+    if budget:
+        report = budget.report()
+        result.update({'commands_per_store': report['commands_per_store_mean'],
+                       'commands_p95': report['commands_per_store_p95'],
+                       'commands_total': report['commands_total'],
+                       'round_trip_seconds': report['round_trip_seconds'],
+                       'command_budget_violations': report['violations']})
+    return result
+
+
+def compare(results, baseline, threshold):
+    """Regression messages for results that are worse than the baseline by more than threshold"""
+    regressions = []
+    for variant, result in results.items():
+        previous = baseline.get(variant)
+        if not previous:
+            continue
+        for field, direction in COMPARED_FIELDS.items():
+            old, new = previous.get(field), result.get(field)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if change * direction < -threshold:
+                regressions.append(f"{variant}: {field} {old} -> {new} ({change:+.0%})")
+    return regressions
+
+
+class Benchmark:
+    def __init__(self, variants, regionals=None, stores_per_regional=43, profile='ideal', seed=None,
+                 headless=True, lean=False, command_budget=None, verbose=False):
+        """
+        Args:
+            variants (list): Keys of VARIANTS to run, in order
+            regionals (list): Regionals of the mock org tree (default: all 7)
+            stores_per_regional (int): Active stores per regional in the mock
+            profile (str): Mock fault profile name or JSON file (pmo_mock_server.MOCK_PROFILES)
+            seed (int): Seed of the profile's draws
+            headless (bool), lean (bool): Chrome settings of the browser variants
+            command_budget (int): WebDriver commands allowed per store; None or 0 only counts
+            verbose (bool): Show the variants' own logging
+        """
+        self.variants = variants
+        self.regionals = regionals or ALL_REGIONALS
+        self.stores_per_regional = stores_per_regional
+        self.profile = profile
+        self.seed = seed
+        self.headless = headless
+        self.lean = lean
+        self.command_budget = command_budget
+        self.verbose = verbose
+        self.results = {}
+        self.faults = {}
+
+    def run_one(self, variant):
+        """Serve a fresh mock (same seed every variant) and run the variant in its own process"""
+        column = VARIANTS[variant]['column']
+        data = MockPMOData(self.stores_per_regional, self.regionals, column)
+        profile = FaultProfile.named(self.profile, self.seed)
+        server = MockPMOServer(port=0, data=data, profile=profile)
+        os.environ['PMO_BASE_URL'] = server.start()
+        try:
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                result = executor.submit(run_variant, variant, self.regionals, self.stores_per_regional,
+                                         self.headless, self.lean, self.command_budget, self.verbose).result()
+        finally:
+            server.stop()
+        result['postbacks'] = server.postbacks
+        result['faults'] = dict(profile.faults)
+        return result
+
+    def run(self):
+        for variant in self.variants:
+            logger.info(f"▶ {variant}")
+            try:
+                self.results[variant] = self.run_one(variant)
+            except Exception as e:
+                logger.error(f"Variant {variant} failed: {e}")
+                self.results[variant] = {'variant': variant, 'failed': str(e)}
+                continue
+            result = self.results[variant]
+            logger.info(f"  {result['stores']} stores, {result['stores_per_min']} stores/min, "
+                        f"p95 {result['p95_seconds']}s, errors {result['errors']}, "
+                        f"wrong values {result['wrong_values']}")
+        return self.results
+
+    def report(self):
+        header = f"{'variant':<20}{'stores/min':>12}{'p50 s':>9}{'p95 s':>9}{'RSS MB':>9}{'cmd/store':>11}" \
+                 f"{'errors':>8}{'wrong':>7}"
+        logger.info(header)
+        logger.info("-" * len(header))
+        for variant, result in self.results.items():
+            if 'failed' in result:
+                logger.info(f"{variant:<20}failed: {result['failed']}")
+                continue
+            logger.info(f"{variant:<20}{result['stores_per_min']:>12}{str(result['p50_seconds']):>9}"
+                        f"{str(result['p95_seconds']):>9}{str(result['peak_rss_mb']):>9}"
+                        f"{str(result['commands_per_store']):>11}{result['errors']:>8}{result['wrong_values']:>7}")
+
+    def document(self):
+        return {
+            'created': datetime.now().isoformat(),
+            'profile': self.profile,
+            'seed': self.seed,
+            'regionals': self.regionals,
+            'stores_per_regional': self.stores_per_regional,
+            'headless': self.headless,
+            'lean': self.lean,
+            'results': self.results,
+        }
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f).get('results', {})
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Throughput benchmark of the extractors against the mock PMO")
+    parser.add_argument('--variants', default='all', help=f"Comma-separated ({', '.join(VARIANTS)}) or all")
+    parser.add_argument('--regionals', default='ALL', help="Comma-separated letters or ALL")
+    parser.add_argument('--stores-per-regional', type=int, default=43)
+    parser.add_argument('--profile', default='ideal', help=f"Mock profile: {', '.join(MOCK_PROFILES)} or a JSON file")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--headless', action='store_true')
+    parser.add_argument('--lean', action='store_true')
+    parser.add_argument('--command-budget', type=int, default=None, help="Fail when a store needs more commands")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--threshold', type=float, default=0.15, help="Relative change that counts as a regression")
+    parser.add_argument('--update-baseline', action='store_true', help="Save this run as the new baseline")
+    parser.add_argument('--output', default=None, help="Also write this run's results here")
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    variants = list(VARIANTS) if args.variants == 'all' else [v.strip() for v in args.variants.split(',') if v.strip()]
+    unknown = [variant for variant in variants if variant not in VARIANTS]
+    if unknown:
+        parser.error(f"Unknown variant(s): {', '.join(unknown)}")
+    regionals = ALL_REGIONALS if args.regionals.upper() == 'ALL' else \
+        [r.strip().upper() for r in args.regionals.split(',') if r.strip()]
+
+    benchmark = Benchmark(variants, regionals, args.stores_per_regional, args.profile, args.seed,
+                          args.headless, args.lean, args.command_budget, args.verbose)
+    benchmark.run()
+    benchmark.report()
+
+    document = benchmark.document()
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(document, f, indent=2)
+        logger.info(f"✓ Results saved to {args.output}")
+
+    failed = [variant for variant, result in benchmark.results.items() if 'failed' in result]
+    over_budget = [variant for variant, result in benchmark.results.items()
+                   if result.get('command_budget_violations')]
+    wrong = [variant for variant, result in benchmark.results.items() if result.get('wrong_values')]
+    regressions = compare(benchmark.results, load_baseline(args.baseline), args.threshold)
+
+    if args.update_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(document, f, indent=2)
+        logger.info(f"✓ Baseline saved to {args.baseline}")
+
+    for regression in regressions:
+        logger.error(f"✗ Regression: {regression}")
+    for variant in over_budget:
+        logger.error(f"✗ {variant}: {benchmark.results[variant]['command_budget_violations']} store(s) "
+                     f"over the budget of {args.command_budget} WebDriver commands")
+    for variant in wrong:
+        logger.error(f"✗ {variant}: {benchmark.results[variant]['wrong_values']} row(s) with wrong values")
+    if failed or over_budget or wrong or regressions:
+        sys.exit(1)
+    logger.info("✓ No regressions")
+
+
+if __name__ == "__main__":
+    main()
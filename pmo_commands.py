@@ -0,0 +1,227 @@
+"""
+WebDriver command accounting.
+
+CountingDriver is a thin proxy around an extractor's self.driver. Every method
+call and every command-backed property (element.text, driver.current_url, ...)
+on the driver and on the WebElements it returns is one WebDriver round trip;
+the proxy times each one and charges it to the store being extracted.
+
+CommandBudget collects the counts per store, reports them in the run summary
+and can enforce a budget: a store that needs more commands than allowed is a
+regression (an extra find_element in a loop, a polling wait gone wrong), and
+benchmark runs fail on it.
+
+    PMO_COMMAND_BUDGET=10 python Storekpisinglepasswithlog2.py
+    python pmo_runner.py --command-budget 10
+"""
+import os
+import time
+import logging
+import threading
+from functools import wraps
+from collections import Counter
+
+from pmo_pacing import percentile
+from pmo_backends import BackendError
+
+logger = logging.getLogger(__name__)
+
+# Properties that are read locally and never reach the browser
+LOCAL_ATTRIBUTES = frozenset(['id', 'parent', 'session_id', 'w3c', 'caps', 'capabilities',
+                              'command_executor', 'error_handler', 'pinned_scripts'])
+
+
+class CommandBudgetExceeded(BackendError):
+    """Stores needed more WebDriver commands than the budget allows"""
+
+
+def unwrap(value):
+    if isinstance(value, CountingProxy):
+        return object.__getattribute__(value, '_target')
+    if isinstance(value, (list, tuple)):
+        return type(value)(unwrap(item) for item in value)
+    return value
+
+
+class CountingProxy:
+    def __init__(self, target, budget):
+        object.__setattr__(self, '_target', target)
+        object.__setattr__(self, '_budget', budget)
+
+    @property
+    def __class__(self):
+        # isinstance(proxy, WebElement) keeps working for Selenium's own argument encoding
+        return type(object.__getattribute__(self, '_target'))
+
+    def _wrap(self, value):
+        from selenium.webdriver.remote.webelement import WebElement
+
+        budget = object.__getattribute__(self, '_budget')
+        if isinstance(value, WebElement) and not isinstance(value, CountingProxy):
+            return CountingElement(value, budget)
+        if isinstance(value, list) and value and isinstance(value[0], WebElement):
+            return [CountingElement(item, budget) for item in value]
+        return value
+
+    def __getattr__(self, name):
+        target = object.__getattribute__(self, '_target')
+        budget = object.__getattribute__(self, '_budget')
+        if name.startswith('_') or name in LOCAL_ATTRIBUTES:
+            return getattr(target, name)
+
+        if isinstance(getattr(type(target), name, None), property):
+            start = time.perf_counter()
+            try:
+                return self._wrap(getattr(target, name))
+            finally:
+                budget.count(name, time.perf_counter() - start)
+
+        value = getattr(target, name)
+        if not callable(value):
+            return value
+
+        @wraps(value)
+        def command(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return self._wrap(value(*unwrap(list(args)), **{key: unwrap(item) for key, item in kwargs.items()}))
+            finally:
+                budget.count(name, time.perf_counter() - start)
+        return command
+
+    def __setattr__(self, name, value):
+        setattr(object.__getattribute__(self, '_target'), name, value)
+
+    def __eq__(self, other):
+        return object.__getattribute__(self, '_target') == unwrap(other)
+
+    def __hash__(self):
+        return hash(object.__getattribute__(self, '_target'))
+
+    def __repr__(self):
+        return f"<counted {object.__getattribute__(self, '_target')!r}>"
+
+
+class CountingDriver(CountingProxy):
+    """Proxy for a WebDriver"""
+
+
+class CountingElement(CountingProxy):
+    """Proxy for a WebElement returned through a CountingDriver"""
+
+
+class CommandBudget:
+    def __init__(self, max_per_store=None):
+        """
+        Args:
+            max_per_store (int): Commands allowed per store; None only counts
+        """
+        self.max_per_store = max_per_store
+        self.commands = Counter()
+        self.seconds = Counter()
+        self.stores = []  # (store key, commands, seconds)
+        self.outside_stores = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """Budget from $PMO_COMMAND_BUDGET (0 counts without a limit), or None when it is not set"""
+        value = os.getenv('PMO_COMMAND_BUDGET', '').strip()
+        if not value:
+            return None
+        return cls(int(value) or None)
+
+    def count(self, name, seconds):
+        with self._lock:
+            self.commands[name] += 1
+            self.seconds[name] += seconds
+        current = getattr(self._local, 'store', None)
+        if current is None:
+            with self._lock:
+                self.outside_stores += 1
+            return
+        current[0] += 1
+        current[1] += seconds
+
+    def start_store(self):
+        self._local.store = [0, 0.0]
+
+    def end_store(self, store_info):
+        commands, seconds = self._local.store
+        self._local.store = None
+        key = f"{store_info.get('regional')}/{store_info.get('name')}"
+        with self._lock:
+            self.stores.append((key, commands, seconds))
+        if self.max_per_store and commands > self.max_per_store:
+            logger.warning(f"Store '{store_info.get('name')}' used {commands} WebDriver commands "
+                           f"(budget {self.max_per_store})")
+
+    def attach(self, extractor):
+        """Put the proxy in front of the extractor's driver (again, after a recycle or failover)"""
+        driver = getattr(extractor, 'driver', None)
+        if driver is None or isinstance(driver, CountingProxy):
+            return
+        proxy = CountingDriver(driver, self)
+        extractor.driver = proxy
+        wait = getattr(extractor, 'wait', None)
+        if wait is not None and getattr(wait, '_driver', None) is driver:
+            # WebDriverWait keeps its own reference to the driver
+            wait._driver = proxy
+
+    def instrument_runner(self, runner):
+        """Count the commands of every store an ExtractionRunner extracts"""
+        extractor = getattr(runner.backend, 'extractor', None)
+        if extractor is None:
+            logger.info(f"Backend {runner.backend.name} does not use WebDriver; command budget not applied")
+            return
+        self.attach(extractor)
+        extract_store = runner.extract_store
+
+        @wraps(extract_store)
+        def counted_extract_store(store_info):
+            self.attach(extractor)
+            self.start_store()
+            try:
+                return extract_store(store_info)
+            finally:
+                self.end_store(store_info)
+        runner.extract_store = counted_extract_store
+
+    @property
+    def violations(self):
+        if not self.max_per_store:
+            return []
+        return [(key, commands) for key, commands, _ in self.stores if commands > self.max_per_store]
+
+    def report(self):
+        counts = [commands for _, commands, _ in self.stores]
+        return {
+            'stores': len(self.stores),
+            'commands_total': sum(self.commands.values()),
+            'commands_per_store_mean': round(sum(counts) / len(counts), 2) if counts else 0,
+            'commands_per_store_p95': percentile(counts, 95) if counts else 0,
+            'commands_per_store_max': max(counts) if counts else 0,
+            'round_trip_seconds': round(sum(self.seconds.values()), 3),
+            'outside_stores': self.outside_stores,
+            'budget': self.max_per_store,
+            'violations': len(self.violations),
+            'by_command': dict(self.commands.most_common()),
+        }
+
+    def summary(self):
+        report = self.report()
+        logger.info(f"WebDriver commands: {report['commands_total']} total, "
+                    f"{report['commands_per_store_mean']} per store (p95 {report['commands_per_store_p95']}, "
+                    f"max {report['commands_per_store_max']}), {report['round_trip_seconds']:.1f}s round trips")
+        for name, count in self.commands.most_common(8):
+            logger.info(f"  {name}: {count}x, {self.seconds[name] / count * 1000:.0f} ms avg")
+        if self.violations:
+            logger.warning(f"{len(self.violations)} store(s) over the budget of {self.max_per_store} commands")
+
+    def enforce(self):
+        """Raise CommandBudgetExceeded when any store went over the budget"""
+        if self.violations:
+            worst = max(self.violations, key=lambda violation: violation[1])
+            raise CommandBudgetExceeded(f"{len(self.violations)} store(s) over the budget of {self.max_per_store} "
+                                        f"WebDriver commands (worst: {worst[0]} with {worst[1]})")
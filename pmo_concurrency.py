@@ -0,0 +1,147 @@
+"""
+AIMD concurrency governor for the parallel runner.
+
+Every worker session is logged in up front, but only the first `limit` of them
+may take stores. After each window of finished stores the governor looks at the
+p50/p95 store latency and the error rate:
+
+    overload (timeouts, HTTP 5xx, empty grids) or p95 far above baseline -> limit = limit * decrease
+    latency holding near the baseline                                     -> limit = limit + 1
+
+so the run goes as wide as the server tolerates at the moment and backs off
+quickly when PMO slows down at month-end. The baseline is the lowest p95 of the
+last few windows, so it follows the server back up once a slow spell has lasted
+that long instead of cutting against a fast morning forever. Paused workers keep their deques;
+active workers steal from them.
+"""
+import time
+import logging
+import threading
+from collections import deque
+
+from pmo_pacing import percentile
+from pmo_backends import StoreFailure, FAILURE_EMPTY_GRID, FAILURE_SERVER_ERROR, is_server_error
+
+logger = logging.getLogger(__name__)
+
+
+def is_overload(error, kind=None):
+    """
+    True for failures that mean the server is struggling rather than our own bug
+
+    Args:
+        error (Exception): Final error of the store, or None
+        kind (str): FAILURE_* kind the backend classified it as, when known
+    """
+    if error is None:
+        return False
+    if kind in (FAILURE_SERVER_ERROR, FAILURE_EMPTY_GRID) or is_server_error(error):
+        return True
+    if isinstance(error, StoreFailure) and error.kind == FAILURE_EMPTY_GRID:
+        return True
+    return 'timeout' in type(error).__name__.lower() or 'timed out' in str(error).lower()
+
+
+class ConcurrencyGovernor:
+    def __init__(self, max_active, initial=None, min_active=1, window=10, decrease=0.5,
+                 max_error_rate=0.2, latency_tolerance=1.5, baseline_windows=5):
+        """
+        Args:
+            max_active (int): Sessions available (the ceiling)
+            initial (int): Active sessions at the start (default: half of max_active)
+            min_active (int): Floor the limit never goes below
+            window (int): Finished stores between two decisions
+            decrease (float): Multiplicative cut on overload
+            max_error_rate (float): Error rate in a window that counts as overload
+            latency_tolerance (float): p95 above baseline_p95 * this stops growth; twice this cuts
+            baseline_windows (int): Windows whose lowest p95 is the baseline
+        """
+        self.max_active = max_active
+        self.min_active = min_active
+        self.limit = max(min_active, min(max_active, initial or max(1, max_active // 2)))
+        self.window = window
+        self.decrease = decrease
+        self.max_error_rate = max_error_rate
+        self.latency_tolerance = latency_tolerance
+        self.baseline_p95 = None
+        self.recent_p95 = deque(maxlen=baseline_windows)
+        self.latencies = []
+        self.errors = 0
+        self.overloads = 0
+        self.history = []
+        self.retired = set()
+        self._condition = threading.Condition()
+
+    def resize(self, max_active):
+        """Fewer sessions started than planned: lower the ceiling to what exists"""
+        with self._condition:
+            self.max_active = max_active
+            self.min_active = min(self.min_active, max_active)
+            self.limit = max(self.min_active, min(self.limit, max_active))
+
+    def retire(self, worker):
+        """A worker stopped for good: the sessions behind it move up one slot"""
+        with self._condition:
+            self.retired.add(worker)
+            if self.max_active > 1:
+                self.resize(self.max_active - 1)
+            self._condition.notify_all()
+
+    def slot(self, worker):
+        return worker - sum(1 for retired in self.retired if retired < worker)
+
+    def wait_turn(self, worker, finished=lambda: False):
+        """Block a worker while it is above the current limit; False once the run is over"""
+        with self._condition:
+            while self.slot(worker) >= self.limit:
+                if finished():
+                    return False
+                self._condition.wait(1.0)
+        return True
+
+    def observe(self, seconds, success, error=None, kind=None):
+        """Record one finished store and its FAILURE_* kind; adjusts the limit at the end of every window"""
+        with self._condition:
+            self.latencies.append(seconds)
+            if not success:
+                self.errors += 1
+            if is_overload(error, kind):
+                self.overloads += 1
+            if len(self.latencies) >= self.window:
+                self._adjust()
+                self._condition.notify_all()
+
+    def _adjust(self):
+        p50 = percentile(self.latencies, 50)
+        p95 = percentile(self.latencies, 95)
+        error_rate = self.errors / len(self.latencies)
+        previous = self.limit
+
+        self.recent_p95.append(p95)
+        self.baseline_p95 = min(self.recent_p95)
+
+        if self.overloads or error_rate > self.max_error_rate or \
+                p95 > self.baseline_p95 * self.latency_tolerance * 2:
+            self.limit = max(self.min_active, int(self.limit * self.decrease))
+            decision = "cut"
+        elif p95 <= self.baseline_p95 * self.latency_tolerance:
+            self.limit = min(self.max_active, self.limit + 1)
+            decision = "grow"
+        else:
+            decision = "hold"
+
+        self.history.append({'time': time.time(), 'p50': p50, 'p95': p95, 'error_rate': error_rate,
+                             'overloads': self.overloads, 'limit': self.limit})
+        logger.info(f"Concurrency {decision}: {previous} -> {self.limit} sessions "
+                    f"(p50 {p50:.1f}s, p95 {p95:.1f}s, baseline p95 {self.baseline_p95:.1f}s, "
+                    f"errors {error_rate:.0%}, overloads {self.overloads})")
+        self.latencies = []
+        self.errors = 0
+        self.overloads = 0
+
+    def summary(self):
+        if not self.history:
+            return
+        limits = [entry['limit'] for entry in self.history]
+        logger.info(f"Concurrency governor: {len(self.history)} decisions, sessions min {min(limits)} / "
+                    f"max {max(limits)} / final {self.limit}")
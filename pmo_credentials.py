@@ -0,0 +1,161 @@
+"""
+Pool of PMO service accounts for parallel runs.
+
+PMO serialises the sessions of one account behind each other, so parallel
+workers only scale when each has its own account. The accounts live in a local
+JSON secrets file ($PMO_ACCOUNTS_FILE, default ~/.pmo_accounts.json):
+
+    [
+      {"username": "svc_pmo_1", "password": "...", "max_logins_per_hour": 6, "min_store_interval": 0},
+      {"username": "svc_pmo_2", "password": "..."}
+    ]
+
+CredentialPool hands out one account per worker, limits how often each account
+logs in and how fast it requests stores, and takes an account out of rotation
+after repeated login failures.
+"""
+import os
+import json
+import time
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ACCOUNTS_FILE = os.path.join(os.path.expanduser('~'), '.pmo_accounts.json')
+
+
+class Account:
+    def __init__(self, username, password, max_logins_per_hour=6, min_store_interval=0.0):
+        self.username = username
+        self.password = password
+        self.max_logins_per_hour = max_logins_per_hour
+        self.min_store_interval = min_store_interval
+        self.logins = deque()
+        self.last_store = 0.0
+        self.consecutive_failures = 0
+        self.disabled = False
+        self.in_use = False
+
+    def __repr__(self):
+        return f"Account({self.username})"
+
+
+def load_accounts(path=None):
+    """Accounts from the secrets file, or the single PMO_USERNAME/PMO_PASSWORD account"""
+    path = path or os.getenv('PMO_ACCOUNTS_FILE', DEFAULT_ACCOUNTS_FILE)
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            entries = json.load(f)
+        accounts = [Account(entry['username'], entry['password'],
+                            entry.get('max_logins_per_hour', 6), entry.get('min_store_interval', 0.0))
+                    for entry in entries]
+        logger.info(f"Loaded {len(accounts)} account(s) from {path}")
+        return accounts
+
+    if os.getenv('PMO_USERNAME') and os.getenv('PMO_PASSWORD'):
+        return [Account(os.getenv('PMO_USERNAME'), os.getenv('PMO_PASSWORD'))]
+    return []
+
+
+class CredentialPool:
+    def __init__(self, accounts, max_login_failures=2):
+        """
+        Args:
+            accounts (list): Account objects
+            max_login_failures (int): Consecutive failed logins before an account leaves the rotation
+        """
+        self.accounts = list(accounts)
+        self.max_login_failures = max_login_failures
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.healthy())
+
+    def healthy(self):
+        return [account for account in self.accounts if not account.disabled]
+
+    def acquire(self):
+        """An idle healthy account for a worker, or None"""
+        with self._lock:
+            for account in self.accounts:
+                if not account.disabled and not account.in_use:
+                    account.in_use = True
+                    return account
+        return None
+
+    def release(self, account):
+        with self._lock:
+            account.in_use = False
+
+    def wait_for_login_slot(self, account):
+        """Block until the account is below its login rate limit, then count the login"""
+        while True:
+            with self._lock:
+                now = time.time()
+                while account.logins and now - account.logins[0] > 3600:
+                    account.logins.popleft()
+                if len(account.logins) < account.max_logins_per_hour:
+                    account.logins.append(now)
+                    return
+                wait = 3600 - (now - account.logins[0])
+            logger.info(f"{account.username} reached {account.max_logins_per_hour} logins/hour, waiting {wait:.0f}s")
+            time.sleep(min(wait, 60))
+
+    def pace(self, account):
+        """Keep at least min_store_interval seconds between two stores of the account"""
+        if not account.min_store_interval:
+            return
+        wait = account.last_store + account.min_store_interval - time.time()
+        if wait > 0:
+            time.sleep(wait)
+        account.last_store = time.time()
+
+    def report_login(self, account, success, error=None):
+        """Record a login result; repeated failures take the account out of rotation"""
+        with self._lock:
+            if success:
+                account.consecutive_failures = 0
+                return
+            account.consecutive_failures += 1
+            if account.consecutive_failures >= self.max_login_failures:
+                account.disabled = True
+                account.in_use = False
+                logger.error(f"✗ Account {account.username} removed from rotation after "
+                              f"{account.consecutive_failures} failed logins ({error})")
+
+    def login(self, backend, account, start_session):
+        """Log a backend in as the account, honouring its rate limit and recording the outcome"""
+        self.wait_for_login_slot(account)
+        try:
+            start_session()
+        except Exception as e:
+            self.report_login(account, False, e)
+            raise
+        self.report_login(account, True)
+
+    def health_check(self, base_url=None):
+        """Try a browserless login with every healthy account; returns the accounts that passed"""
+        from pmo_backends import HttpBackend
+
+        passed = []
+        for account in self.healthy():
+            backend = HttpBackend(account.username, account.password, base_url=base_url)
+            try:
+                self.wait_for_login_slot(account)
+                backend.login()
+                self.report_login(account, True)
+                passed.append(account)
+                logger.info(f"✓ Account {account.username} healthy")
+            except Exception as e:
+                self.report_login(account, False, e)
+                logger.warning(f"Account {account.username} failed its health check: {e}")
+            finally:
+                backend.close()
+        return passed
+
+    def summary(self):
+        for account in self.accounts:
+            state = "removed" if account.disabled else "ok"
+            logger.info(f"  {account.username}: {state}, {len(account.logins)} login(s) in the last hour")
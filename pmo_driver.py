@@ -0,0 +1,129 @@
+"""Chrome driver construction shared by the Selenium extractors"""
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Resources the scraper never reads; blocked through CDP in the performance profile
+LEAN_BLOCKED_URLS = [
+    '*.css', '*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot',
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.svg', '*.ico', '*.webp',
+    '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*', '*hotjar.com*'
+]
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'pmo_chrome_cache')
+
+
+def build_chrome_options(headless=False, performance_profile=False, capture_network=False):
+    """Chrome options for the extractors; performance_profile trades fidelity for speed"""
+    from selenium.webdriver.chrome.options import Options
+
+    chrome_options = Options()
+    if headless:
+        chrome_options.add_argument('--headless')
+    chrome_options.add_argument('--no-sandbox')
+    chrome_options.add_argument('--disable-dev-shm-usage')
+    chrome_options.add_argument('--disable-gpu')
+    chrome_options.add_argument('--window-size=1920,1080')
+    chrome_options.add_argument('--disable-blink-features=AutomationControlled')
+
+    if performance_profile:
+        # Return from driver.get() at DOMContentLoaded instead of waiting for every asset
+        chrome_options.page_load_strategy = 'eager'
+        chrome_options.add_argument('--blink-settings=imagesEnabled=false')
+        chrome_options.add_argument('--disable-extensions')
+        chrome_options.add_argument('--disable-background-networking')
+        chrome_options.add_experimental_option('prefs', {
+            'profile.managed_default_content_settings.images': 2
+        })
+
+        cache_dir = os.getenv('PMO_CHROME_CACHE_DIR', DEFAULT_CACHE_DIR)
+        os.makedirs(cache_dir, exist_ok=True)
+        chrome_options.add_argument(f'--disk-cache-dir={cache_dir}')
+        chrome_options.add_argument('--disk-cache-size=268435456')
+
+    if capture_network:
+        chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+
+    return chrome_options
+
+
+def apply_performance_profile(driver, blocked_urls=None):
+    """Block stylesheets, fonts, images and analytics for every request of this driver"""
+    try:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': blocked_urls or LEAN_BLOCKED_URLS})
+        logger.info(f"Performance profile active: blocking {len(blocked_urls or LEAN_BLOCKED_URLS)} URL patterns")
+    except Exception as e:
+        logger.warning(f"Could not apply CDP URL blocking: {e}")
+
+
+def renderer_memory_mb(driver):
+    """JS heap in use by the page, in MB, from CDP Performance.getMetrics"""
+    driver.execute_cdp_cmd('Performance.enable', {})
+    metrics = driver.execute_cdp_cmd('Performance.getMetrics', {})['metrics']
+    values = {metric['name']: metric['value'] for metric in metrics}
+    return values.get('JSHeapUsedSize', 0) / (1024 * 1024)
+
+
+class RecyclePolicy:
+    """
+    Decides when a long run should swap its browser for a fresh one, either
+    every N stores or once the renderer heap grows past a limit.
+    """
+
+    def __init__(self, every_stores=None, max_heap_mb=None, check_every=10):
+        """
+        Args:
+            every_stores (int): Recycle after this many stores (None: never by count)
+            max_heap_mb (float): Recycle when the JS heap is larger than this (None: never by memory)
+            check_every (int): Stores between two memory measurements
+        """
+        self.every_stores = every_stores
+        self.max_heap_mb = max_heap_mb
+        self.check_every = check_every
+        self.stores_since_recycle = 0
+        self.recycles = 0
+
+    @classmethod
+    def from_env(cls):
+        """Policy from $PMO_RECYCLE_EVERY and $PMO_RECYCLE_HEAP_MB (disabled when unset)"""
+        every = os.getenv('PMO_RECYCLE_EVERY')
+        heap = os.getenv('PMO_RECYCLE_HEAP_MB')
+        return cls(int(every) if every else None, float(heap) if heap else None)
+
+    @property
+    def enabled(self):
+        return bool(self.every_stores or self.max_heap_mb)
+
+    def store_done(self, backend):
+        """Count a finished store; True when the browser should be recycled now"""
+        self.stores_since_recycle += 1
+        if self.every_stores and self.stores_since_recycle >= self.every_stores:
+            logger.info(f"Recycling browser after {self.stores_since_recycle} stores")
+            return True
+
+        if self.max_heap_mb and self.stores_since_recycle % self.check_every == 0:
+            heap = backend.memory_mb()
+            if heap is not None and heap > self.max_heap_mb:
+                logger.info(f"Recycling browser: JS heap {heap:.0f} MB > {self.max_heap_mb:.0f} MB")
+                return True
+        return False
+
+    def recycled(self):
+        self.stores_since_recycle = 0
+        self.recycles += 1
+
+
+def create_chrome_driver(headless=False, performance_profile=False, capture_network=False):
+    """Launch Chrome with the shared options"""
+    from selenium import webdriver
+
+    options = build_chrome_options(headless, performance_profile, capture_network)
+    driver = webdriver.Chrome(options=options)
+
+    if performance_profile:
+        apply_performance_profile(driver)
+    else:
+        driver.maximize_window()
+    return driver
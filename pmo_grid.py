@@ -0,0 +1,475 @@
+"""Page constants and pure parsing helpers shared by every extraction backend.
+
+Nothing in here talks to a browser or the network: it turns label texts (or raw
+page HTML) into the result records that DataStorage saves.
+"""
+import os
+import re
+import logging
+from datetime import datetime
+from html import unescape
+from html.parser import HTMLParser
+
+logger = logging.getLogger(__name__)
+
+# PMO_BASE_URL points every engine at another host, e.g. pmo_mock_server.py
+BASE_URL = os.getenv('PMO_BASE_URL', "https://pmo.mykg.id").rstrip('/')
+LOGIN_PATH = "/Systems/Login.aspx"
+DASHBOARD_PATH = "/Performance%20Review/Dashboard.aspx"
+
+ALL_REGIONALS = ['A', 'B', 'C', 'D', 'E', 'F', 'G']
+
+TREE_ID_PREFIX = 'ctl00_ContentPlaceHolder1_OrganizationTreeView1'
+# Heading above the scorecard naming the store it belongs to
+STORE_NAME_ID = 'ctl00_ContentPlaceHolder1_lblStoreName'
+YEAR_SELECT_ID = 'ctl00_ContentPlaceHolder1_ddlPeriod'
+MONTH_SELECT_ID = 'ctl00_ContentPlaceHolder1_ddlMonth'
+
+REGIONAL_DIVS = {
+    'A': 'ctl00_ContentPlaceHolder1_OrganizationTreeView1_tvHierarchyn22Nodes',
+    'B': 'ctl00_ContentPlaceHolder1_OrganizationTreeView1_tvHierarchyn43Nodes',
+    'C': 'ctl00_ContentPlaceHolder1_OrganizationTreeView1_tvHierarchyn61Nodes',
+    'D': 'ctl00_ContentPlaceHolder1_OrganizationTreeView1_tvHierarchyn84Nodes',
+    'E': 'ctl00_ContentPlaceHolder1_OrganizationTreeView1_tvHierarchyn107Nodes',
+    'F': 'ctl00_ContentPlaceHolder1_OrganizationTreeView1_tvHierarchyn128Nodes',
+    'G': 'ctl00_ContentPlaceHolder1_OrganizationTreeView1_tvHierarchyn156Nodes'
+}
+
+# The target scorecard tree (target.py) numbers B and C one node lower
+TARGET_REGIONAL_DIVS = dict(REGIONAL_DIVS,
+                            B='ctl00_ContentPlaceHolder1_OrganizationTreeView1_tvHierarchyn42Nodes',
+                            C='ctl00_ContentPlaceHolder1_OrganizationTreeView1_tvHierarchyn60Nodes')
+
+SCORE_MAPPING = {
+    'Financial_Score': 'ctl00_ContentPlaceHolder1_lblAchievementYTD_F',
+    'Customer_Score': 'ctl00_ContentPlaceHolder1_lblAchievementYTD_CS',
+    'Internal_Business_Process_Score': 'ctl00_ContentPlaceHolder1_lblAchievementYTD_IBP',
+    'Learning_and_Growth_Score': 'ctl00_ContentPlaceHolder1_lblAchievementYTD_LG',
+    'Total_Score': 'ctl00_ContentPlaceHolder1_lblAchievementYTD_Total'
+}
+
+MONTH_NAMES = ["January", "February", "March", "April", "May", "June",
+               "July", "August", "September", "October", "November", "December"]
+
+# Keywords untuk filter toko yang harus di-skip
+SKIP_KEYWORDS = ['tutup', 'renovasi', 'maintenance', 'pindah', 'closed', 'relokasi','Tutup','(Tutup)','(tutup)']
+
+# Body for driver.execute_script: every scorecard label in one round trip
+READ_GRID_JS = """
+const texts = {};
+document.querySelectorAll("[id*='grvScorecard_'], [id*='lblAchievementYTD_']").forEach(function (el) {
+    texts[el.id] = (el.innerText || el.textContent || '').trim();
+});
+return texts;
+"""
+
+# Body for driver.execute_script: the scorecard markup itself, for page recording
+RAW_GRID_JS = """
+const parts = [];
+const grid = document.querySelector("[id$='grvScorecard']");
+if (grid) parts.push(grid.outerHTML);
+document.querySelectorAll("[id*='lblAchievementYTD_']").forEach(function (el) {
+    parts.push(el.outerHTML);
+});
+return parts.join('\\n');
+"""
+
+# Body for driver.execute_script: [store heading, selected year, selected month] of the dashboard
+SHOWING_JS = f"""
+const text = function (id) {{ const el = document.getElementById(id); return el ? el.textContent : null; }};
+const selected = function (id) {{
+    const el = document.getElementById(id);
+    return el && el.selectedIndex >= 0 ? el.options[el.selectedIndex].text : null;
+}};
+return [text('{STORE_NAME_ID}'), selected('{YEAR_SELECT_ID}'), selected('{MONTH_SELECT_ID}')];
+"""
+
+GRID_ID_PATTERN = re.compile(r"grvScorecard_|lblAchievementYTD_")
+STORE_NAME_PATTERN = re.compile(rf'id="{STORE_NAME_ID}"[^>]*>([^<]*)<')
+
+
+def should_skip_store(store_name):
+    """Check if store should be skipped based on keywords"""
+    for keyword in SKIP_KEYWORDS:
+        if re.search(rf'\b{keyword}\b', store_name, re.IGNORECASE):
+            logger.info(f"⏭️  SKIPPED ({keyword.title()}): {store_name}")
+            return True
+    return False
+
+
+def kpi_label_id(control, field):
+    """Element ID of one grid cell, e.g. kpi_label_id(2, 'KPI') or kpi_label_id(2, 'YTDAchievement3')"""
+    return f"ctl00_ContentPlaceHolder1_grvScorecard_ctl{control:02d}_lbl{field}"
+
+
+def parse_number(value):
+    """Convert a grid label into a float, treating '-' and blanks as 0.0"""
+    if value in ["-", "", None]:
+        return 0.0
+    try:
+        return float(value.replace(",", ""))
+    except ValueError:
+        return 0.0
+
+
+def clean_kpi_name(kpi_name):
+    """Turn a KPI label into a column-safe name"""
+    clean_name = re.sub(r'[^\w\s]', '', kpi_name)
+    return re.sub(r'\s+', '_', clean_name.strip())
+
+
+def classify_perspective(control, kpi_name):
+    """Guess the BSC perspective of a KPI from its control number and label"""
+    name = kpi_name.lower()
+    if control <= 6 or "revenue" in name or "cogs" in name or "profit" in name or "expense" in name:
+        return "Financial"
+    elif "customer" in name or "satisfaction" in name:
+        return "Customer"
+    elif "stock" in name or "fulfillment" in name or "sales" in name:
+        return "Customer"
+    elif "productivity" in name or "conversion" in name or "fraud" in name:
+        return "Internal_Business_Process"
+    elif "learning" in name or "growth" in name or "hr" in name:
+        return "Learning_and_Growth"
+    return "Other"
+
+
+def extract_scores(texts):
+    """Score metrics from a label map"""
+    return {score_name: parse_number(texts.get(element_id, ""))
+            for score_name, element_id in SCORE_MAPPING.items()}
+
+
+def extract_kpis(texts, month, extract_type="all", value_field="YTDAchievement", last_control=22):
+    """KPI columns from a label map, matching the fast single-pass extractor"""
+    data = {}
+    kpi_count = 0
+    if extract_type == "financial":
+        last_control = 7
+
+    for i in range(2, last_control + 1):
+        kpi_name = texts.get(kpi_label_id(i, "KPI"), "")
+        if not kpi_name:
+            continue
+
+        value_id = kpi_label_id(i, f"{value_field}{month}")
+        if value_id not in texts:
+            continue
+
+        numeric_value = parse_number(texts[value_id])
+        column = clean_kpi_name(kpi_name)
+
+        if extract_type == "all":
+            data[f"{classify_perspective(i, kpi_name)}_{column}_ACH"] = numeric_value
+            data[f"KPI_{i:02d}_Value"] = numeric_value
+            data[f"KPI_{i:02d}_Name"] = kpi_name
+        else:
+            data[f"Financial_{column}_ACH"] = numeric_value
+
+        kpi_count += 1
+
+    return data, kpi_count
+
+
+def detect_store_structure(texts):
+    """
+    Detect store structure by checking which control has 'Operating Profit' label.
+    - Control 06 has 'Operating Profit' label → NO EBITDA
+    - Control 07 has 'Operating Profit' label → HAS EBITDA (ctl06 is EBITDA)
+    """
+    if "Operating Profit" in texts.get(kpi_label_id(6, "KPI"), ""):
+        return {'operating_profit_position': 6, 'ebitda_position': None,
+                'has_ebitda': False, 'structure_type': 'no_ebitda_op_at_06'}
+    if "Operating Profit" in texts.get(kpi_label_id(7, "KPI"), ""):
+        return {'operating_profit_position': 7, 'ebitda_position': 6,
+                'has_ebitda': True, 'structure_type': 'has_ebitda_op_at_07'}
+    return {'operating_profit_position': 6, 'ebitda_position': None,
+            'has_ebitda': False, 'structure_type': 'fallback_no_ebitda'}
+
+
+def build_store_record(texts, store_info, year, month, extract_type="all",
+                       value_field="YTDAchievement", last_control=22, method="Single-Pass-Fast"):
+    """
+    Build one result row from the grid labels of the currently selected store.
+
+    extract_type is one of "all", "financial", "scores" (fast extractors) or
+    "legacy_financial" / "legacy_scores" (the column layout of Storekpi.py).
+    """
+    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    if extract_type == "legacy_scores":
+        result = {'Regional': store_info['regional'], 'Store': store_info['name'],
+                  'Year': year, 'Month': month}
+        result.update(extract_scores(texts))
+        result.update({'Error_Message': 'None', 'Extraction_DateTime': timestamp})
+        return result
+
+    if extract_type == "legacy_financial":
+        structure = detect_store_structure(texts)
+
+        def metric(control):
+            return parse_number(texts.get(kpi_label_id(control, f"{value_field}{month}"), ""))
+
+        return {
+            'Regional': store_info['regional'],
+            'Store': store_info['name'],
+            'Year': year,
+            'Month': month,
+            'Revenue_ACH': metric(2),
+            'COGS_ACH': metric(3),
+            'COGS_to_Revenue_ACH': metric(4),
+            'Operating_Expense_ACH': metric(5),
+            'EBITDA_ACH': metric(structure['ebitda_position']) if structure['has_ebitda'] else 0.0,
+            'Operating_Profit_ACH': metric(structure['operating_profit_position']),
+            'Has_EBITDA': structure['has_ebitda'],
+            'Structure_Type': structure['structure_type'],
+            'OP_Position': structure['operating_profit_position'],
+            'EBITDA_Position': structure.get('ebitda_position', 'N/A'),
+            'Error_Message': 'None',
+            'Extraction_DateTime': timestamp
+        }
+
+    result = {
+        'Regional': store_info['regional'],
+        'Store': store_info['name'],
+        'Year': year,
+        'Month': month,
+        'Extraction_Type': extract_type,
+        'Error_Message': 'None',
+        'Extraction_DateTime': timestamp,
+        'Extraction_Method': method
+    }
+
+    if extract_type == "scores":
+        scores = extract_scores(texts)
+        result.update(scores)
+        result['Score_Metrics_Extracted'] = len(scores)
+        return result
+
+    if extract_type == "all":
+        result.update(extract_scores(texts))
+
+    kpis, kpi_count = extract_kpis(texts, month, extract_type, value_field, last_control)
+    result.update(kpis)
+    if extract_type == "financial":
+        result['Financial_KPIs_Extracted'] = kpi_count
+    else:
+        result['Total_KPIs_Extracted'] = kpi_count
+    return result
+
+
+def build_error_record(store_info, year, month, extract_type, error_message):
+    """Placeholder row for a store that could not be selected or read"""
+    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    result = {'Regional': store_info['regional'], 'Store': store_info['name'],
+              'Year': year, 'Month': month}
+
+    if extract_type == "legacy_scores":
+        result.update({score_name: 0.0 for score_name in SCORE_MAPPING})
+    elif extract_type == "legacy_financial":
+        result.update({
+            'Revenue_ACH': 0.0,
+            'COGS_ACH': 0.0,
+            'COGS_to_Revenue_ACH': 0.0,
+            'Operating_Expense_ACH': 0.0,
+            'EBITDA_ACH': 0.0,
+            'Operating_Profit_ACH': 0.0,
+            'Has_EBITDA': False,
+            'Structure_Type': 'error',
+            'OP_Position': 'N/A',
+            'EBITDA_Position': 'N/A'
+        })
+    else:
+        result.update({'Extraction_Type': extract_type, 'Extraction_Method': 'Error'})
+        count_key = {"financial": 'Financial_KPIs_Extracted',
+                     "scores": 'Score_Metrics_Extracted'}.get(extract_type, 'Total_KPIs_Extracted')
+        result[count_key] = 0
+
+    result.update({'Error_Message': error_message, 'Extraction_DateTime': timestamp})
+    return result
+
+
+class _LabelTextParser(HTMLParser):
+    """Collect the text of every scorecard label (by element id) in a page"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.texts = {}
+        self._stack = []
+
+    def handle_starttag(self, tag, attrs):
+        element_id = dict(attrs).get('id') or ''
+        if element_id and GRID_ID_PATTERN.search(element_id):
+            self._stack.append((tag, element_id, []))
+        elif self._stack:
+            self._stack.append((tag, None, None))
+
+    def handle_endtag(self, tag):
+        while self._stack:
+            open_tag, element_id, parts = self._stack.pop()
+            if element_id:
+                self.texts[element_id] = ''.join(parts).strip()
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        for _, element_id, parts in self._stack:
+            if element_id:
+                parts.append(data)
+
+
+def parse_label_texts(html):
+    """{element_id: text} for every scorecard label in an HTML page or fragment"""
+    parser = _LabelTextParser()
+    parser.feed(html)
+    parser.close()
+    return parser.texts
+
+
+def parse_period(year_text, month_text):
+    """(year, month) from the selected Year and Month texts, or None when either is missing"""
+    try:
+        return int(year_text.strip()), MONTH_NAMES.index(month_text.strip()) + 1
+    except (AttributeError, ValueError):
+        return None
+
+
+def shown_store_name(html):
+    """Store named above the scorecard in an HTML page, or None when there is no such heading"""
+    match = STORE_NAME_PATTERN.search(html or '')
+    return unescape(match.group(1)).strip() if match else None
+
+
+def grid_texts(raw):
+    """{element_id: text} of a raw grid: a full page, a fragment or an UpdatePanel delta"""
+    delta = parse_update_panel_delta(raw)
+    if delta:
+        raw = ''.join(content for kind, _, content in delta if kind == 'updatePanel')
+    return parse_label_texts(raw)
+
+
+class _FormParser(HTMLParser):
+    """Collect the postable fields of an ASP.NET WebForms page"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.fields = {}
+        self.id_to_name = {}
+        self.options = {}
+        self._select = None
+        self._option = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        name = attrs.get('name')
+        if attrs.get('id') and name:
+            self.id_to_name[attrs['id']] = name
+
+        if tag == 'input' and name:
+            input_type = (attrs.get('type') or 'text').lower()
+            if input_type in ('submit', 'button', 'image', 'reset'):
+                return
+            if input_type in ('checkbox', 'radio') and 'checked' not in attrs:
+                return
+            self.fields[name] = attrs.get('value') or ''
+        elif tag == 'select' and name:
+            self._select = name
+            self.options[name] = {}
+        elif tag == 'option' and self._select:
+            value = attrs.get('value') or ''
+            self._option = value
+            if 'selected' in attrs or self._select not in self.fields:
+                self.fields[self._select] = value
+
+    def handle_data(self, data):
+        if self._select and self._option is not None and data.strip():
+            self.options[self._select][data.strip()] = self._option
+            self._option = None
+
+    def handle_endtag(self, tag):
+        if tag == 'select':
+            self._select = None
+
+
+def parse_form_fields(html):
+    """Return (fields, id_to_name, select_options) for a WebForms page"""
+    parser = _FormParser()
+    parser.feed(html)
+    parser.close()
+    return parser.fields, parser.id_to_name, parser.options
+
+
+class _TreeParser(HTMLParser):
+    """Collect the store links inside one regional container of the organization tree"""
+
+    POSTBACK = re.compile(r"__doPostBack\('([^']*)','([^']*)'\)")
+
+    def __init__(self, container_id):
+        super().__init__(convert_charrefs=True)
+        self.container_id = container_id
+        self.links = []
+        self._depth = 0
+        self._link = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if self._depth:
+            if tag == 'div':
+                self._depth += 1
+            if tag == 'a' and 'NodeStyle' in (attrs.get('class') or ''):
+                match = self.POSTBACK.search(attrs.get('href') or '')
+                # The href is a JS string literal, so '\\' stands for one backslash
+                postback = (match.group(1), match.group(2).replace('\\\\', '\\')) if match else None
+                self._link = {'text': [], 'postback': postback}
+        elif tag == 'div' and attrs.get('id') == self.container_id:
+            self._depth = 1
+
+    def handle_endtag(self, tag):
+        if not self._depth:
+            return
+        if tag == 'a' and self._link is not None:
+            self.links.append((''.join(self._link['text']).strip(), self._link['postback']))
+            self._link = None
+        elif tag == 'div':
+            self._depth -= 1
+
+    def handle_data(self, data):
+        if self._link is not None:
+            self._link['text'].append(data)
+
+
+def parse_tree_stores(html, regional_letter, regional_divs=None):
+    """Active stores of a regional from the organization tree HTML"""
+    container_id = (regional_divs or REGIONAL_DIVS)[regional_letter]
+    parser = _TreeParser(container_id)
+    parser.feed(html)
+    parser.close()
+
+    stores = []
+    for i, (store_name, postback) in enumerate(parser.links):
+        if not store_name or store_name.startswith('RM -') or should_skip_store(store_name):
+            continue
+        stores.append({'name': store_name, 'regional': regional_letter,
+                       'index': i, 'postback': postback})
+    return stores
+
+
+def parse_update_panel_delta(text):
+    """
+    Split a Microsoft AJAX UpdatePanel delta ("length|type|id|content|...")
+    into a list of (type, id, content) tuples.
+    """
+    parts = []
+    pos = 0
+    while pos < len(text):
+        bar = text.find('|', pos)
+        if bar < 0 or not text[pos:bar].isdigit():
+            break
+        length = int(text[pos:bar])
+        type_end = text.index('|', bar + 1)
+        id_end = text.index('|', type_end + 1)
+        content_start = id_end + 1
+        content = text[content_start:content_start + length]
+        parts.append((text[bar + 1:type_end], text[type_end + 1:id_end], content))
+        pos = content_start + length + 1
+    return parts
@@ -0,0 +1,60 @@
+"""
+Log in once, hand out sessions to every worker.
+
+PMO authenticates with a forms-authentication ticket cookie and keeps page
+state in a separate ASP.NET_SessionId cookie. The broker logs in with one
+backend, keeps every cookie except the session id, and gives those to each new
+worker. The server then opens a fresh ASP.NET session for the worker under the
+same ticket: the worker gets its own modal and period state but skips the
+login form, the role popup and the menu navigation.
+
+If the server does not accept the ticket (for instance if it has expired), the
+worker falls back to a normal login.
+"""
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+SESSION_COOKIE_NAMES = ('ASP.NET_SessionId',)
+
+
+def ticket_cookies(cookies):
+    """Every cookie except the per-session id, so that the server starts a new session"""
+    return [cookie for cookie in cookies if cookie.get('name') not in SESSION_COOKIE_NAMES]
+
+
+class LoginBroker:
+    def __init__(self, primary_backend):
+        """
+        Args:
+            primary_backend (ExtractionBackend): A backend that has already logged in
+        """
+        self.cookies = ticket_cookies(primary_backend.export_cookies())
+        self.issued = 0
+        self.fallbacks = 0
+        self._lock = threading.Lock()
+        logger.info(f"Login broker holding {len(self.cookies)} authentication cookie(s)")
+
+    def issue(self, backend):
+        """
+        Put a new backend on the dashboard with a session of its own.
+        Returns True when the shared ticket worked, False after a normal login.
+        """
+        try:
+            backend.adopt_cookies(self.cookies)
+            with self._lock:
+                self.issued += 1
+            logger.info("✓ Worker session created from the shared login")
+            return True
+        except Exception as e:
+            logger.warning(f"Shared login not accepted ({e}), logging in normally")
+            backend.login()
+            with self._lock:
+                self.fallbacks += 1
+            return False
+
+    def start_session(self, runner):
+        """Drop-in for ExtractionRunner.start_session"""
+        self.issue(runner.backend)
+        runner.backend.select_period(runner.year, runner.month)
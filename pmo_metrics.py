@@ -0,0 +1,234 @@
+"""
+Per-step timing metrics for extraction runs.
+
+StepMetrics wraps the extractor's steps (login, navigate_to_dashboard,
+select_year_and_month, click_view_other_scorecard, get_stores_by_regional_fresh,
+select_store_robust, wait_for_data_refresh_improved), the runner's extract_*
+methods and the storage's save_to_* methods with timers, and keeps a latency
+histogram per step and per regional. At the end of a run it writes:
+
+    <prefix>.json   count / sum / p50 / p95 / max and bucket counts per step and per regional
+    <prefix>.prom   the same histograms in the Prometheus text format (node_exporter textfile collector)
+
+Enable with PMO_METRICS=<prefix> for the scripts or --metrics <prefix> on the
+module CLIs.
+
+The timers are installed on the classes and resolve self at call time (see
+MethodPatches), so only the instrumented objects are timed: a copy of an
+instrumented extractor (the warm standby's spare) runs the plain methods
+against its own driver. write() removes them again.
+"""
+import os
+import json
+import time
+import inspect
+import logging
+import weakref
+import threading
+from functools import wraps
+from collections import defaultdict
+
+from pmo_pacing import percentile
+
+logger = logging.getLogger(__name__)
+
+STEP_METHODS = (
+    'login', 'navigate_to_dashboard', 'select_year_and_month', 'click_view_other_scorecard',
+    'get_stores_by_regional_fresh', 'select_store_robust', 'wait_for_data_refresh_improved',
+)
+STEP_PREFIXES = ('extract_', 'save_to_')
+
+# Backends without a Selenium extractor behind them are timed at their own interface
+BACKEND_STEPS = ('login', 'select_period', 'list_stores', 'select_store', 'read_grid')
+
+# Steps whose first argument is the regional letter
+REGIONAL_STEPS = ('get_stores_by_regional_fresh', 'list_stores')
+
+# Histogram upper bounds in seconds
+DEFAULT_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+NO_REGIONAL = '-'
+
+
+class MethodPatches:
+    """
+    Class-level method wrappers that only act on the instances registered with
+    them. around(method, args, kwargs) receives the method bound to the object
+    it was called on; every other instance of the class calls it directly.
+    """
+
+    def __init__(self):
+        self.instances = weakref.WeakSet()
+        self.active = True
+        self._patched = {}  # (class, name) -> (attribute in the class dict or None, wrapper)
+        self._lock = threading.Lock()
+
+    def wrap(self, obj, name, around):
+        """Route obj.name through around; returns False when obj has no such plain method"""
+        cls = type(obj)
+        original = getattr(cls, name, None)
+        if not inspect.isfunction(original):
+            return False
+        with self._lock:
+            self.instances.add(obj)
+            if (cls, name) in self._patched:
+                return True
+            patches = self
+
+            @wraps(original)
+            def wrapper(instance, *args, **kwargs):
+                method = original.__get__(instance, type(instance))
+                if not patches.active or instance not in patches.instances:
+                    return method(*args, **kwargs)
+                return around(method, args, kwargs)
+            self._patched[(cls, name)] = (cls.__dict__.get(name), wrapper)
+            setattr(cls, name, wrapper)
+        return True
+
+    def undo(self):
+        """Put the original methods back on every class that was patched"""
+        with self._lock:
+            self.active = False
+            for (cls, name), (original, wrapper) in self._patched.items():
+                # A wrapper installed on top of ours stays and calls through; ours is inactive now
+                if cls.__dict__.get(name) is not wrapper:
+                    continue
+                if original is None:
+                    delattr(cls, name)
+                else:
+                    setattr(cls, name, original)
+            self._patched.clear()
+
+
+class StepMetrics:
+    def __init__(self, path_prefix="pmo_metrics", buckets=DEFAULT_BUCKETS):
+        """
+        Args:
+            path_prefix (str): Output files are <prefix>.json and <prefix>.prom
+            buckets (tuple): Histogram upper bounds in seconds
+        """
+        self.path_prefix = path_prefix
+        self.buckets = tuple(buckets)
+        self.samples = defaultdict(list)  # (step, regional) -> seconds
+        self.started = time.time()
+        self.patches = MethodPatches()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """Metrics writing to $PMO_METRICS, or None when it is not set"""
+        prefix = os.getenv('PMO_METRICS', '').strip()
+        return cls(prefix) if prefix else None
+
+    @property
+    def regional(self):
+        return getattr(self._local, 'regional', NO_REGIONAL)
+
+    @regional.setter
+    def regional(self, value):
+        self._local.regional = value
+
+    def observe(self, step, seconds, regional=None):
+        with self._lock:
+            self.samples[(step, regional or self.regional)].append(seconds)
+
+    def timed(self, step):
+        """Timer for MethodPatches.wrap; the regional comes from a store_info argument when there is one"""
+        def around(method, args, kwargs):
+            if step in REGIONAL_STEPS and args:
+                self.regional = args[0]
+            else:
+                for arg in args:
+                    if isinstance(arg, dict) and arg.get('regional'):
+                        self.regional = arg['regional']
+                        break
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                # Saving happens once for the whole run, not inside a regional
+                self.observe(step, time.perf_counter() - start,
+                             NO_REGIONAL if step.startswith('save_to_') else None)
+        return around
+
+    def instrument(self, obj, names=STEP_METHODS, prefixes=STEP_PREFIXES):
+        """Time the matching methods of one object; returns the step names"""
+        return [name for name in dir(type(obj))
+                if (name in names or name.startswith(prefixes)) and self.patches.wrap(obj, name, self.timed(name))]
+
+    def instrument_runner(self, runner):
+        """Time an ExtractionRunner: the extractor behind its backend (or the backend) and extract_*"""
+        extractor = getattr(runner.backend, 'extractor', None)
+        if extractor is not None:
+            self.instrument(extractor)
+        else:
+            self.instrument(runner.backend, names=BACKEND_STEPS, prefixes=())
+        self.instrument(runner, names=(), prefixes=('extract_',))
+
+    def histogram(self, values):
+        counts = [sum(1 for value in values if value <= bound) for bound in self.buckets]
+        return {
+            'count': len(values),
+            'sum': round(sum(values), 4),
+            'p50': round(percentile(values, 50), 4),
+            'p95': round(percentile(values, 95), 4),
+            'max': round(max(values), 4),
+            'buckets': dict(zip([str(bound) for bound in self.buckets], counts)),
+        }
+
+    def report(self):
+        """{'steps': {step: histogram}, 'regionals': {regional: {step: histogram}}}"""
+        with self._lock:
+            samples = {key: list(values) for key, values in self.samples.items()}
+        by_step = defaultdict(list)
+        by_regional = defaultdict(lambda: defaultdict(list))
+        for (step, regional), values in samples.items():
+            by_step[step].extend(values)
+            by_regional[regional][step].extend(values)
+        return {
+            'started': self.started,
+            'duration': round(time.time() - self.started, 2),
+            'steps': {step: self.histogram(values) for step, values in sorted(by_step.items())},
+            'regionals': {regional: {step: self.histogram(values) for step, values in sorted(steps.items())}
+                          for regional, steps in sorted(by_regional.items())},
+        }
+
+    def prometheus(self):
+        lines = ['# HELP pmo_step_seconds Duration of PMO extraction steps',
+                 '# TYPE pmo_step_seconds histogram']
+        with self._lock:
+            samples = sorted((key, list(values)) for key, values in self.samples.items())
+        for (step, regional), values in samples:
+            labels = f'step="{step}",regional="{regional}"'
+            for bound in self.buckets:
+                count = sum(1 for value in values if value <= bound)
+                lines.append(f'pmo_step_seconds_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'pmo_step_seconds_bucket{{{labels},le="+Inf"}} {len(values)}')
+            lines.append(f'pmo_step_seconds_sum{{{labels}}} {sum(values):.4f}')
+            lines.append(f'pmo_step_seconds_count{{{labels}}} {len(values)}')
+        return '\n'.join(lines) + '\n'
+
+    def write(self):
+        """Stop timing, write <prefix>.json and <prefix>.prom and log the per-step summary; returns both paths"""
+        self.patches.undo()
+        report = self.report()
+        json_path = f"{self.path_prefix}.json"
+        prom_path = f"{self.path_prefix}.prom"
+        try:
+            with open(json_path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+            # Write then rename so a textfile collector never reads half a file
+            with open(prom_path + '.tmp', 'w', encoding='utf-8', newline='\n') as f:
+                f.write(self.prometheus())
+            os.replace(prom_path + '.tmp', prom_path)
+        except Exception as e:
+            logger.error(f"Error writing metrics: {e}")
+            return None
+
+        logger.info("Step timings:")
+        for step, histogram in report['steps'].items():
+            logger.info(f"  {step}: {histogram['count']}x, p50 {histogram['p50']:.2f}s, "
+                        f"p95 {histogram['p95']:.2f}s, total {histogram['sum']:.1f}s")
+        logger.info(f"✓ Metrics saved to {json_path} and {prom_path}")
+        return json_path, prom_path
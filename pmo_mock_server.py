@@ -0,0 +1,691 @@
+"""
+Local mock of the PMO site for offline development and benchmarks.
+
+Serves the pages the extractors walk through with the same element IDs, form
+field names and ASP.NET behaviour:
+
+    /Systems/Login.aspx                   txt_UserID / txt_Password / robLogin, then the btnSaveInputRole popup
+    /Home/Home.aspx                       "Performance Review" menu with submenu:16 -> Dashboard.aspx
+    /Performance Review/Dashboard.aspx    ddlPeriod / ddlMonth, btnViewOtherSCO, the organization tree
+                                          modal and the grvScorecard grid inside an UpdatePanel
+
+Postbacks work both ways the real site accepts them: full form posts (what
+HttpBackend sends) and UpdatePanel async posts with the "X-MicrosoftAjax:
+Delta=true" header, answered in the "length|type|id|content|" delta format. A
+small client script stands in for the Microsoft AJAX library, so
+Sys.WebForms.PageRequestManager.get_isInAsyncPostBack() and __doPostBack behave
+as the pacing code expects.
+
+Authentication uses a forms ticket cookie (.ASPXAUTH) and per-session state
+(period, modal, selected store) keyed by ASP.NET_SessionId, so the login
+broker's cookie sharing works as well. Data is synthetic but deterministic.
+
+A fault profile (MOCK_PROFILES, or a JSON file with the same keys) makes the
+server behave like PMO on a bad day: latency drawn from a distribution for
+every request and a separate one for postbacks, occasional very slow postbacks,
+the previous store's grid delivered before the real update, sessions that
+expire after N requests, random HTTP 500s and a modal that fails to open.
+Faults are drawn from a seeded generator, so a benchmark run is repeatable.
+
+    python pmo_mock_server.py --port 8765 --stores-per-regional 43
+    python pmo_mock_server.py --profile month_end --seed 1
+    PMO_BASE_URL=http://127.0.0.1:8765 python pmo_runner.py --engine http --regionals ALL
+"""
+import os
+import html
+import json
+import math
+import time
+import random
+import logging
+import secrets
+import argparse
+import threading
+from datetime import datetime
+from collections import Counter
+from urllib.parse import parse_qs, unquote, urlsplit
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from pmo_grid import (ALL_REGIONALS, LOGIN_PATH, DASHBOARD_PATH, MONTH_NAMES, REGIONAL_DIVS,
+                      TARGET_REGIONAL_DIVS, SCORE_MAPPING, STORE_NAME_ID, TREE_ID_PREFIX, kpi_label_id)
+
+logger = logging.getLogger(__name__)
+
+HOME_PATH = "/Home/Home.aspx"
+SESSION_COOKIE = "ASP.NET_SessionId"
+TICKET_COOKIE = ".ASPXAUTH"
+
+UPDATE_PANEL_ID = "ctl00_ContentPlaceHolder1_upScorecard"
+TREE_EVENT_TARGET = "ctl00$ContentPlaceHolder1$OrganizationTreeView1$tvHierarchy"
+
+# Grid column and tree layout per scorecard, as in pmo_runner.COLUMN_SETS
+COLUMNS = {
+    'achievement': {'value_field': 'YTDAchievement', 'last_control': 22, 'regional_divs': REGIONAL_DIVS},
+    'target': {'value_field': 'YTDTarget', 'last_control': 34, 'regional_divs': TARGET_REGIONAL_DIVS},
+}
+
+# Latencies are {'median': s, 'sigma': x} (lognormal), {'low': s, 'high': s} (uniform)
+# or a number of seconds; 'max' caps a lognormal draw. Rates are per request.
+MOCK_PROFILES = {
+    'ideal': {},
+    'normal': {
+        'request_latency': {'median': 0.05, 'sigma': 0.3},
+        'postback_latency': {'median': 0.4, 'sigma': 0.4, 'max': 5},
+    },
+    'slow': {
+        'request_latency': {'median': 0.2, 'sigma': 0.5},
+        'postback_latency': {'median': 2.0, 'sigma': 0.6, 'max': 20},
+        'slow_postback_rate': 0.05, 'slow_postback_seconds': 10,
+    },
+    'month_end': {
+        'request_latency': {'median': 0.3, 'sigma': 0.6},
+        'postback_latency': {'median': 3.0, 'sigma': 0.7, 'max': 30},
+        'slow_postback_rate': 0.1, 'slow_postback_seconds': 15,
+        'stale_grid_rate': 0.15, 'stale_grid_seconds': 2.0,
+        'error_rate': 0.02, 'modal_failure_rate': 0.05, 'session_requests': 600,
+    },
+    'flaky': {
+        'request_latency': {'median': 0.05, 'sigma': 0.3},
+        'postback_latency': {'median': 0.5, 'sigma': 0.5, 'max': 10},
+        'stale_grid_rate': 0.1, 'stale_grid_seconds': 1.0,
+        'error_rate': 0.08, 'modal_failure_rate': 0.1, 'session_requests': 150,
+    },
+}
+
+KPI_NAMES = [
+    'Revenue', 'COGS', 'COGS to Revenue', 'Operating Expense', 'EBITDA', 'Operating Profit',
+    'Customer Satisfaction', 'Stock Fulfillment', 'Sales Growth', 'Sales Productivity', 'Conversion Rate',
+    'Fraud Cases', 'Inventory Accuracy', 'Waste Control', 'Service Speed', 'Store Audit',
+    'Complaint Resolution', 'Promo Compliance', 'HR Turnover', 'Training Completion', 'Learning Hours',
+    'Growth Initiatives', 'Employee Engagement', 'Cash Variance', 'Shrinkage', 'Energy Cost',
+    'Delivery Accuracy', 'Planogram Compliance', 'Mystery Shopper', 'Member Acquisition',
+    'Online Orders', 'Food Safety', 'Safety Incidents',
+]
+
+# Minimal stand-in for MicrosoftAjax.js: async UpdatePanel postbacks and the
+# PageRequestManager state the extractors poll
+CLIENT_SCRIPT = """
+var Sys = {WebForms: {PageRequestManager: {
+    _busy: false,
+    getInstance: function () { return this; },
+    get_isInAsyncPostBack: function () { return this._busy; }
+}}};
+function __pmoDelta(text) {
+    var pos = 0;
+    while (pos < text.length) {
+        var bar = text.indexOf('|', pos);
+        var length = parseInt(text.substring(pos, bar), 10);
+        var typeEnd = text.indexOf('|', bar + 1);
+        var idEnd = text.indexOf('|', typeEnd + 1);
+        var type = text.substring(bar + 1, typeEnd), id = text.substring(typeEnd + 1, idEnd);
+        var content = text.substr(idEnd + 1, length);
+        if (type === 'updatePanel') { document.getElementById(id).innerHTML = content; }
+        else if (type === 'hiddenField') { document.getElementById(id).value = content; }
+        else if (type === 'pageRedirect') { window.location.href = content; }
+        else if (type === 'pmoRefresh') { setTimeout(function () { __doPostBack('', ''); }, parseInt(content, 10)); }
+        pos = idEnd + 1 + length + 1;
+    }
+}
+function __pmoAsyncPost(submitter) {
+    var form = document.forms[0], prm = Sys.WebForms.PageRequestManager;
+    var data = new URLSearchParams(new FormData(form));
+    if (submitter && submitter.name) { data.append(submitter.name, submitter.value); }
+    data.append('__ASYNCPOST', 'true');
+    prm._busy = true;
+    fetch(window.location.href, {method: 'POST', body: data, credentials: 'same-origin',
+                                 headers: {'X-MicrosoftAjax': 'Delta=true'}})
+        .then(function (response) {
+            if (!response.ok) { throw new Error('HTTP ' + response.status); }
+            return response.text();
+        })
+        .then(__pmoDelta)
+        .finally(function () { prm._busy = false; });
+}
+function __doPostBack(eventTarget, eventArgument) {
+    var form = document.forms[0];
+    form.__EVENTTARGET.value = eventTarget;
+    form.__EVENTARGUMENT.value = eventArgument;
+    __pmoAsyncPost(null);
+}
+document.addEventListener('submit', function (event) {
+    if (!document.getElementById('%(panel)s')) { return; }
+    event.preventDefault();
+    __pmoAsyncPost(event.submitter);
+});
+""" % {'panel': UPDATE_PANEL_ID}
+
+PAGE_STYLE = """
+.menu ul { display: none; }
+.menu:hover ul { display: block; }
+.modal { border: 1px solid #888; padding: 8px; }
+"""
+
+
+def store_id(regional, index):
+    return f"{regional}{index:03d}"
+
+
+class MockPMOData:
+    """Deterministic synthetic organization and scorecards"""
+
+    def __init__(self, stores_per_regional=43, regionals=None, column="achievement", seed=7):
+        self.column = COLUMNS[column]
+        self.seed = seed
+        self.regionals = regionals or ALL_REGIONALS
+        # regional -> [(store id, display name)], including the entries the extractors skip
+        self.tree = {}
+        for regional in self.regionals:
+            nodes = [(f"RM{regional}", f"RM - Regional {regional}")]
+            nodes += [(store_id(regional, i), f"KG {regional}{i:02d} Store") for i in range(1, stores_per_regional + 1)]
+            nodes.append((store_id(regional, 999), f"KG {regional}99 Store (Tutup)"))
+            self.tree[regional] = nodes
+        self.stores = {node_id: (regional, name) for regional, nodes in self.tree.items() for node_id, name in nodes}
+
+    def kpi_names(self, node_id):
+        # About half of the stores report EBITDA, which moves Operating Profit to ctl07
+        names = list(KPI_NAMES)
+        if random.Random(f"{self.seed}|{node_id}|layout").random() < 0.5:
+            names.remove('EBITDA')
+        return names[:self.column['last_control'] - 1]
+
+    def value(self, node_id, year, month, control):
+        rng = random.Random(f"{self.seed}|{node_id}|{year}|{month}|{control}")
+        return f"{rng.uniform(40, 140):,.2f}"
+
+    def score(self, node_id, year, month, label):
+        return f"{random.Random(f'{self.seed}|{node_id}|{year}|{month}|{label}').uniform(1, 5):.2f}"
+
+
+def load_profile(name_or_path):
+    """Profile settings by name from MOCK_PROFILES, or from a JSON file"""
+    if name_or_path in MOCK_PROFILES:
+        return dict(MOCK_PROFILES[name_or_path])
+    if os.path.exists(name_or_path):
+        with open(name_or_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    raise ValueError(f"Unknown mock profile '{name_or_path}' (choose from {', '.join(MOCK_PROFILES)} or a JSON file)")
+
+
+class FaultProfile:
+    """Latency and fault decisions of the mock, drawn from one seeded generator"""
+
+    def __init__(self, settings=None, seed=None, name="custom"):
+        self.settings = settings or {}
+        self.name = name
+        self.rng = random.Random(seed)
+        self.faults = Counter()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def named(cls, name_or_path, seed=None):
+        return cls(load_profile(name_or_path), seed, os.path.basename(name_or_path))
+
+    def draw(self, spec):
+        if not spec:
+            return 0.0
+        if isinstance(spec, (int, float)):
+            return float(spec)
+        with self._lock:
+            if 'median' in spec:
+                value = self.rng.lognormvariate(math.log(spec['median']), spec.get('sigma', 0.5))
+            else:
+                value = self.rng.uniform(spec.get('low', 0.0), spec.get('high', 0.0))
+        return min(value, spec.get('max', value))
+
+    def inject(self, fault):
+        """True when the fault's <fault>_rate says this request gets it"""
+        rate = self.settings.get(f"{fault}_rate", 0)
+        if not rate:
+            return False
+        with self._lock:
+            hit = self.rng.random() < rate
+            if hit:
+                self.faults[fault] += 1
+        return hit
+
+    def delay(self, postback):
+        seconds = self.draw(self.settings.get('request_latency'))
+        if postback:
+            seconds += self.draw(self.settings.get('postback_latency'))
+            if self.inject('slow_postback'):
+                seconds += self.settings.get('slow_postback_seconds', 10)
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def session_exhausted(self, session):
+        limit = self.settings.get('session_requests')
+        session.requests += 1
+        if limit and session.requests > limit:
+            with self._lock:
+                self.faults['session_expired'] += 1
+            return True
+        return False
+
+    def summary(self):
+        injected = ', '.join(f"{fault} {count}" for fault, count in sorted(self.faults.items())) or "none"
+        logger.info(f"Mock profile '{self.name}': injected {injected}")
+
+
+class Session:
+    def __init__(self, session_id):
+        now = datetime.now()
+        self.id = session_id
+        self.year = str(now.year)
+        self.month = now.month
+        self.modal_open = False
+        self.store = None
+        self.stale_store = None   # grid shown until stale_until when the profile serves a stale update
+        self.stale_until = 0.0
+        self.requests = 0
+        self.pending_role = None  # user name between the credentials and the role popup
+        self.last_seen = time.time()
+
+
+class MockPMOServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=8765, data=None, users=None, session_timeout=1200, profile=None):
+        """
+        Args:
+            host (str), port (int): Listen address (port 0 picks a free one)
+            data (MockPMOData): Organization and scorecards to serve
+            users (dict): {username: password}; None accepts any non-empty credentials
+            session_timeout (float): Seconds of inactivity before a session and its ticket expire
+            profile (FaultProfile): Latency and faults to inject (default: none)
+        """
+        super().__init__((host, port), MockPMORequestHandler)
+        self.data = data or MockPMOData()
+        self.users = users
+        self.session_timeout = session_timeout
+        self.profile = profile or FaultProfile()
+        self.sessions = {}
+        self.tickets = {}  # ticket -> [username, last use]
+        self.lock = threading.Lock()
+        self.requests_served = 0
+        self.postbacks = 0
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def check_credentials(self, username, password):
+        if not username or not password:
+            return False
+        return self.users is None or self.users.get(username) == password
+
+    def start(self):
+        """Serve in a background thread; returns the base URL"""
+        self._thread = threading.Thread(target=self.serve_forever, name="pmo-mock", daemon=True)
+        self._thread.start()
+        logger.info(f"Mock PMO listening on {self.url}")
+        return self.url
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class MockPMORequestHandler(BaseHTTPRequestHandler):
+    server_version = "Microsoft-IIS/10.0"
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+    # --- request plumbing ---
+
+    @property
+    def path_only(self):
+        return unquote(urlsplit(self.path).path).rstrip()
+
+    def cookies(self):
+        cookies = {}
+        for part in (self.headers.get('Cookie') or '').split(';'):
+            if '=' in part:
+                name, value = part.strip().split('=', 1)
+                cookies[name] = value
+        return cookies
+
+    def form(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length).decode('utf-8') if length else ''
+        return {name: values[-1] for name, values in parse_qs(body, keep_blank_values=True).items()}
+
+    def session(self):
+        """(session, new cookie or None); expired sessions are replaced"""
+        server = self.server
+        session_id = self.cookies().get(SESSION_COOKIE)
+        with server.lock:
+            session = server.sessions.get(session_id)
+            if session and time.time() - session.last_seen > server.session_timeout:
+                session = None
+            if session is None:
+                session_id = secrets.token_hex(12)
+                session = server.sessions[session_id] = Session(session_id)
+                new_cookie = f"{SESSION_COOKIE}={session_id}; path=/; HttpOnly"
+            else:
+                new_cookie = None
+            session.last_seen = time.time()
+        return session, new_cookie
+
+    def authenticated_user(self):
+        server = self.server
+        ticket = self.cookies().get(TICKET_COOKIE)
+        with server.lock:
+            entry = server.tickets.get(ticket)
+            if not entry or time.time() - entry[1] > server.session_timeout:
+                return None
+            entry[1] = time.time()
+            return entry[0]
+
+    def expire(self, session):
+        """Forget the session and the ticket it was used with, as an app pool recycle would"""
+        server = self.server
+        with server.lock:
+            server.sessions.pop(session.id, None)
+            server.tickets.pop(self.cookies().get(TICKET_COOKIE), None)
+
+    def send(self, status, body="", cookies=(), location=None, content_type="text/html; charset=utf-8"):
+        payload = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.send_header('Cache-Control', 'private')
+        for cookie in cookies:
+            if cookie:
+                self.send_header('Set-Cookie', cookie)
+        if location:
+            self.send_header('Location', location)
+        self.end_headers()
+        self.wfile.write(payload)
+        with self.server.lock:
+            self.server.requests_served += 1
+
+    def redirect(self, location, cookies=()):
+        self.send(302, f'<html><body>Object moved to <a href="{location}">here</a>.</body></html>',
+                  cookies, location)
+
+    # --- routing ---
+
+    def do_GET(self):
+        self.handle_request(None)
+
+    def do_POST(self):
+        self.handle_request(self.form())
+
+    def handle_request(self, form):
+        path = self.path_only
+        session, session_cookie = self.session()
+        profile = self.server.profile
+        profile.delay(postback=form is not None and path == unquote(DASHBOARD_PATH))
+
+        if path == LOGIN_PATH:
+            return self.login_page(session, session_cookie, form)
+        if path.lower() == '/home/dashboard.aspx':
+            # The menu link is relative to /Home/
+            return self.redirect(unquote(DASHBOARD_PATH), [session_cookie])
+        if profile.inject('error'):
+            return self.server_error(session_cookie)
+
+        user = self.authenticated_user()
+        if user is not None and profile.session_exhausted(session):
+            self.expire(session)
+            user = None
+        if user is None:
+            if form is not None and self.headers.get('X-MicrosoftAjax'):
+                return self.send(200, self.delta([('pageRedirect', '', LOGIN_PATH)]), [session_cookie],
+                                 content_type="text/plain; charset=utf-8")
+            return self.redirect(f"{LOGIN_PATH}?ReturnUrl={self.path}", [session_cookie])
+
+        if path == HOME_PATH:
+            return self.send(200, self.home_page(user), [session_cookie])
+        if path == unquote(DASHBOARD_PATH):
+            return self.dashboard(session, session_cookie, form)
+        self.send(404, "<html><body>404 - File or directory not found.</body></html>", [session_cookie])
+
+    # --- login ---
+
+    def login_page(self, session, session_cookie, form):
+        server = self.server
+        message = ""
+        if form is not None and 'btnSaveInputRole' in form and session.pending_role:
+            ticket = secrets.token_hex(24)
+            with server.lock:
+                server.tickets[ticket] = [session.pending_role, time.time()]
+            session.pending_role = None
+            return self.redirect(HOME_PATH, [session_cookie, f"{TICKET_COOKIE}={ticket}; path=/; HttpOnly"])
+
+        if form is not None and 'robLogin' in form:
+            username, password = form.get('txt_UserID', ''), form.get('txt_Password', '')
+            if server.check_credentials(username, password):
+                session.pending_role = username
+            else:
+                message = "Invalid User ID or Password"
+
+        role_popup = ""
+        if session.pending_role:
+            role_popup = f"""
+<div id="pnlRole" class="modal">
+  <p>Select role for {html.escape(session.pending_role)}</p>
+  <select name="ddlRole" id="ddlRole"><option value="1" selected="selected">Store Performance</option></select>
+  <input type="submit" name="btnSaveInputRole" value="Next" id="btnSaveInputRole" />
+</div>"""
+        body = f"""
+<form method="post" action="Login.aspx" id="form1">
+  {self.hidden_fields('login')}
+  <input name="txt_UserID" type="text" id="txt_UserID" />
+  <input name="txt_Password" type="password" id="txt_Password" />
+  <input type="submit" name="robLogin" value="Sign In" id="robLogin" />
+  <span id="lblMessage">{message}</span>
+  {role_popup}
+</form>"""
+        self.send(200, self.page("PMO - Login", body, script=False), [session_cookie])
+
+    def home_page(self, user):
+        body = f"""
+<form method="post" action="Home.aspx" id="aspnetForm">
+  {self.hidden_fields('home')}
+  <ul id="ctl00_MenuControlHorizontal1_NavigationMenu">
+    <li class="menu"><a href="#">Home</a></li>
+    <li class="menu"><a href="#">Performance Review</a>
+      <ul id="ctl00_MenuControlHorizontal1_NavigationMenu:submenu:16">
+        <li><a href="Dashboard.aspx">Dashboard</a></li>
+      </ul>
+    </li>
+  </ul>
+  <p>Welcome, {html.escape(user)}</p>
+</form>"""
+        return self.page("PMO - Home", body)
+
+    # --- dashboard ---
+
+    def dashboard(self, session, session_cookie, form):
+        if form is not None:
+            self.apply_postback(session, form)
+        panel = self.panel_html(session)
+        if form is not None and self.headers.get('X-MicrosoftAjax'):
+            parts = [('updatePanel', UPDATE_PANEL_ID, panel),
+                     ('hiddenField', '__EVENTTARGET', ''),
+                     ('hiddenField', '__EVENTARGUMENT', ''),
+                     ('hiddenField', '__VIEWSTATE', self.viewstate('dashboard'))]
+            remaining = session.stale_until - time.time()
+            if remaining > 0:
+                # The client asks again once the real update is available
+                parts.append(('pmoRefresh', '', str(int(remaining * 1000) + 1)))
+            body = self.delta(parts)
+            return self.send(200, body, [session_cookie], content_type="text/plain; charset=utf-8")
+        self.send(200, self.dashboard_page(session, panel), [session_cookie])
+
+    def apply_postback(self, session, form):
+        """Update the session from a Dashboard postback, as the page's event handlers would"""
+        with self.server.lock:
+            self.server.postbacks += 1
+        year = form.get('ctl00$ContentPlaceHolder1$ddlPeriod')
+        if year:
+            session.year = year
+        month = form.get('ctl00$ContentPlaceHolder1$ddlMonth')
+        if month and month.isdigit():
+            session.month = int(month)
+
+        profile = self.server.profile
+        if 'ctl00$ContentPlaceHolder1$btnViewOtherSCO' in form:
+            # A failed modal leaves the page as it was, with no tree
+            session.modal_open = not profile.inject('modal_failure')
+        if form.get('__EVENTTARGET') == TREE_EVENT_TARGET:
+            node_id = form.get('__EVENTARGUMENT', '').split('\\')[-1]
+            if node_id in self.server.data.stores:
+                session.stale_until = 0.0
+                if profile.inject('stale_grid'):
+                    session.stale_store = session.store
+                    session.stale_until = time.time() + profile.settings.get('stale_grid_seconds', 2.0)
+                session.store = node_id
+                session.modal_open = False
+
+    def dashboard_page(self, session, panel):
+        years = range(datetime.now().year - 3, datetime.now().year + 2)
+        selected = ' selected="selected"'
+        year_options = ''.join(
+            f'<option{selected if str(year) == session.year else ""} value="{year}">{year}</option>'
+            for year in years)
+        month_options = ''.join(
+            f'<option{selected if i == session.month else ""} value="{i}">{name}</option>'
+            for i, name in enumerate(MONTH_NAMES, 1))
+        postback = "javascript:setTimeout('__doPostBack(\\'{0}\\',\\'\\')', 0)"
+        body = f"""
+<form method="post" action="Dashboard.aspx" id="aspnetForm">
+  {self.hidden_fields('dashboard')}
+  <select name="ctl00$ContentPlaceHolder1$ddlPeriod" id="ctl00_ContentPlaceHolder1_ddlPeriod"
+          onchange="{postback.format('ctl00$ContentPlaceHolder1$ddlPeriod')}">{year_options}</select>
+  <select name="ctl00$ContentPlaceHolder1$ddlMonth" id="ctl00_ContentPlaceHolder1_ddlMonth"
+          onchange="{postback.format('ctl00$ContentPlaceHolder1$ddlMonth')}">{month_options}</select>
+  <div id="{UPDATE_PANEL_ID}">{panel}</div>
+</form>"""
+        return self.page("PMO - Performance Review Dashboard", body)
+
+    def panel_html(self, session):
+        parts = ['<input type="submit" name="ctl00$ContentPlaceHolder1$btnViewOtherSCO" value="View Other Scorecard" '
+                 'id="ctl00_ContentPlaceHolder1_btnViewOtherSCO" />']
+        if session.modal_open:
+            parts.append(self.tree_html())
+        if session.store:
+            if time.time() < session.stale_until:
+                parts.append(self.grid_html(session, session.stale_store, blank=session.stale_store is None))
+            else:
+                parts.append(self.grid_html(session))
+        return '\n'.join(parts)
+
+    def tree_html(self):
+        data = self.server.data
+        regional_divs = data.column['regional_divs']
+        lines = ['<div id="ctl00_ContentPlaceHolder1_pnlOtherSCO" class="modal">',
+                 f'<div id="{TREE_ID_PREFIX}_tvHierarchy">']
+        node = 0
+        for regional in data.regionals:
+            node += 1
+            lines.append(f'<table><tr><td><a id="{TREE_ID_PREFIX}_tvHierarchyt{node}" '
+                         f'class="{TREE_ID_PREFIX}_tvHierarchy_0">Regional {regional}</a></td></tr></table>')
+            lines.append(f'<div id="{regional_divs[regional]}">')
+            for node_id, name in data.tree[regional]:
+                node += 1
+                # A JS string literal: the doubled backslash reaches the server as one
+                argument = f"sKG\\\\{regional}\\\\{node_id}"
+                lines.append(f'<table><tr><td><a id="{TREE_ID_PREFIX}_tvHierarchyt{node}" '
+                             f'class="{TREE_ID_PREFIX}_tvHierarchy_0 NodeStyle" '
+                             f'href="javascript:__doPostBack(\'{TREE_EVENT_TARGET}\',\'{argument}\')">'
+                             f'{html.escape(name)}</a></td></tr></table>')
+            lines.append('</div>')
+        lines.append('</div>')
+        lines.append('<input type="button" value="Close" onclick="this.parentNode.style.display=\'none\'" />')
+        lines.append('</div>')
+        return '\n'.join(lines)
+
+    def grid_html(self, session, node_id=None, blank=False):
+        """Scorecard of the session's store (or of node_id); blank shows '-' in every cell"""
+        data = self.server.data
+        node_id, year = node_id or session.store, session.year
+        value_field = data.column['value_field']
+        regional, name = data.stores[node_id]
+        rows = [f'<h3 id="{STORE_NAME_ID}">{html.escape(name)}</h3>',
+                '<table id="ctl00_ContentPlaceHolder1_grvScorecard">']
+        for control, kpi in enumerate(data.kpi_names(node_id), 2):
+            cells = [f'<td><span id="{kpi_label_id(control, "KPI")}">{html.escape(kpi)}</span></td>']
+            for month in range(1, 13):
+                text = data.value(node_id, year, month, control) if month <= session.month and not blank else '-'
+                cells.append(f'<td><span id="{kpi_label_id(control, f"{value_field}{month}")}">{text}</span></td>')
+            rows.append(f'<tr>{"".join(cells)}</tr>')
+        rows.append('</table>')
+        for label, element_id in SCORE_MAPPING.items():
+            rows.append(f'<span id="{element_id}">{data.score(node_id, year, session.month, label)}</span>')
+        return '\n'.join(rows)
+
+    def server_error(self, session_cookie):
+        body = ("<html><head><title>Runtime Error</title></head><body>"
+                "<h1>Server Error in '/' Application.</h1><h2><i>Runtime Error</i></h2></body></html>")
+        self.send(500, body, [session_cookie])
+
+    # --- markup helpers ---
+
+    def viewstate(self, page):
+        # Opaque to the clients; only its presence and round trip matter
+        return secrets.token_urlsafe(48) + page
+
+    def hidden_fields(self, page):
+        return (f'<input type="hidden" name="__EVENTTARGET" id="__EVENTTARGET" value="" />'
+                f'<input type="hidden" name="__EVENTARGUMENT" id="__EVENTARGUMENT" value="" />'
+                f'<input type="hidden" name="__VIEWSTATE" id="__VIEWSTATE" value="{self.viewstate(page)}" />'
+                f'<input type="hidden" name="__VIEWSTATEGENERATOR" id="__VIEWSTATEGENERATOR" value="CA0B0334" />')
+
+    def page(self, title, body, script=True):
+        client = f"<script>{CLIENT_SCRIPT}</script>" if script else ""
+        return (f"<!DOCTYPE html><html><head><title>{title}</title><style>{PAGE_STYLE}</style></head>"
+                f"<body>{client}{body}</body></html>")
+
+    @staticmethod
+    def delta(parts):
+        return ''.join(f"{len(content)}|{kind}|{element_id}|{content}|" for kind, element_id, content in parts)
+
+
+def parse_users(values):
+    users = {}
+    for value in values or []:
+        username, _, password = value.partition(':')
+        users[username] = password
+    return users or None
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Local mock of the PMO site")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--stores-per-regional', type=int, default=43)
+    parser.add_argument('--regionals', default='ALL', help="Comma-separated letters or ALL")
+    parser.add_argument('--column', choices=list(COLUMNS), default='achievement')
+    parser.add_argument('--user', action='append', help="username:password (repeatable); default accepts any")
+    parser.add_argument('--session-timeout', type=float, default=1200)
+    parser.add_argument('--profile', default='ideal',
+                        help=f"Fault profile: {', '.join(MOCK_PROFILES)} or a JSON file with the same keys")
+    parser.add_argument('--seed', type=int, default=None, help="Seed for the profile's latency and fault draws")
+    args = parser.parse_args()
+
+    regionals = ALL_REGIONALS if args.regionals.upper() == 'ALL' else \
+        [r.strip().upper() for r in args.regionals.split(',') if r.strip()]
+    data = MockPMOData(args.stores_per_regional, regionals, args.column)
+    server = MockPMOServer(args.host, args.port, data, parse_users(args.user), args.session_timeout,
+                           FaultProfile.named(args.profile, args.seed))
+    logger.info(f"Mock PMO on {server.url}: {len(regionals)} regionals, {args.stores_per_regional} stores each, "
+                f"profile '{args.profile}'")
+    logger.info(f"Point the extractors at it with PMO_BASE_URL={server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.profile.summary()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Adaptive pacing for the Selenium extractors.
+
+Every wait in the scripts goes through a Pacer instead of a fixed time.sleep:
+
+    pacer.settle(step, default, ready)  -> poll ready() and record how long the step really took
+    pacer.sleep(step, default)          -> sleep for the learned latency of that step
+    pacer.observe(step, seconds)        -> record a latency measured by the caller
+
+Every one of these pauses goes through pause(), which a Tracer (pmo_tracing.py)
+records as a sleep span while it is attached.
+
+The learned wait is a percentile of the recent measurements of the step, chosen
+by the profile, and never longer than the original fixed value. When the error
+rate of recent stores rises, every wait is stretched back towards (and beyond)
+the original values.
+"""
+import os
+import math
+import time
+import logging
+from collections import defaultdict, deque
+
+from pmo_grid import TREE_ID_PREFIX
+
+logger = logging.getLogger(__name__)
+
+PACING_PROFILES = {
+    # percentile: which recent latency to trust; margin: multiplier on it;
+    # floor: minimum wait in seconds before polling; min_samples: measurements before adapting
+    'fast': {'percentile': 50, 'margin': 1.0, 'floor': 0.3, 'min_samples': 3, 'max_backoff': 2.0},
+    'normal': {'percentile': 90, 'margin': 1.2, 'floor': 0.5, 'min_samples': 5, 'max_backoff': 3.0},
+    'safe': {'percentile': 99, 'margin': 1.5, 'floor': 1.0, 'min_samples': 10, 'max_backoff': 4.0},
+}
+
+POLL_INTERVAL = 0.25
+
+# Seconds a grid value must hold before it counts as stable, however fast the
+# stability poll has learned to run: the previous store's grid can linger ~2s
+STABILITY_WINDOW = 3.0
+
+# True once the page has loaded and no ASP.NET AJAX postback is in flight
+POSTBACK_IDLE_JS = """
+if (document.readyState !== 'complete') { return false; }
+if (window.Sys && Sys.WebForms && Sys.WebForms.PageRequestManager) {
+    return !Sys.WebForms.PageRequestManager.getInstance().get_isInAsyncPostBack();
+}
+return true;
+"""
+
+
+def postback_idle(driver):
+    """Readiness check shared by the settle() calls that wait on a postback"""
+    return driver.execute_script(POSTBACK_IDLE_JS)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+class Pacer:
+    def __init__(self, profile=None, window=50, error_window=20):
+        profile = profile or os.getenv('PMO_PACING_PROFILE', 'normal')
+        if profile not in PACING_PROFILES:
+            raise ValueError(f"Unknown pacing profile '{profile}'. Options: {', '.join(PACING_PROFILES)}")
+        self.profile_name = profile
+        self.profile = PACING_PROFILES[profile]
+        self.samples = defaultdict(lambda: deque(maxlen=window))
+        self.outcomes = deque(maxlen=error_window)
+        self.slept = defaultdict(float)
+        self.tracer = None  # set by Tracer.attach_sleeps
+
+    @property
+    def backoff(self):
+        """Multiplier applied to every wait, growing with the recent error rate"""
+        if not self.outcomes:
+            return 1.0
+        error_rate = self.outcomes.count(False) / len(self.outcomes)
+        return min(self.profile['max_backoff'], 1.0 + 2 * error_rate * (self.profile['max_backoff'] - 1.0))
+
+    def observe(self, step, seconds):
+        """Record a measured latency for a step"""
+        self.samples[step].append(seconds)
+
+    def record_result(self, success):
+        """Record whether a store succeeded; feeds the error backoff"""
+        self.outcomes.append(bool(success))
+
+    def delay(self, step, default):
+        """Wait time for a step: learned percentile once enough samples exist, else the default"""
+        samples = self.samples[step]
+        if len(samples) < self.profile['min_samples']:
+            wait = default
+        else:
+            learned = percentile(samples, self.profile['percentile']) * self.profile['margin']
+            wait = min(default, max(self.profile['floor'], learned))
+        return wait * self.backoff
+
+    def pause(self, seconds):
+        """time.sleep, recorded as a sleep span when a tracer is attached"""
+        if self.tracer:
+            self.tracer.sleep(seconds)
+        else:
+            time.sleep(seconds)
+
+    def sleep(self, step, default):
+        """Drop-in replacement for time.sleep(default)"""
+        wait = self.delay(step, default)
+        self.slept[step] += wait
+        self.pause(wait)
+
+    def retry_sleep(self, default):
+        """Pause between retries; only the error backoff applies"""
+        wait = default * self.backoff
+        self.slept['retry'] += wait
+        self.pause(wait)
+
+    def settle(self, step, default, ready=None):
+        """
+        Wait until ready() is truthy, at most default * backoff seconds, and record
+        the time it took. Polling starts after the floor, or after the learned
+        delay once the step has enough samples. Without a ready check this is the
+        same as sleep().
+        """
+        if ready is None:
+            return self.sleep(step, default)
+
+        start = time.time()
+        deadline = start + default * self.backoff
+        if len(self.samples[step]) < self.profile['min_samples']:
+            first_wait = min(self.profile['floor'], default)
+        else:
+            first_wait = min(self.delay(step, default), default * self.backoff)
+        self.pause(first_wait)
+
+        while True:
+            try:
+                if ready():
+                    break
+            except Exception:
+                pass
+            if time.time() >= deadline:
+                break
+            self.pause(POLL_INTERVAL)
+
+        elapsed = time.time() - start
+        self.observe(step, elapsed)
+        self.slept[step] += elapsed
+
+    def summary(self):
+        """Log where the waiting time went"""
+        logger.info(f"Pacing profile '{self.profile_name}' (current backoff x{self.backoff:.2f}):")
+        for step, seconds in sorted(self.slept.items(), key=lambda item: -item[1]):
+            samples = self.samples.get(step)
+            learned = f", p{self.profile['percentile']} {percentile(samples, self.profile['percentile']):.2f}s" \
+                if samples else ""
+            logger.info(f"  {step}: {seconds:.1f}s waited{learned}")
+
+
+def scorecard_tree_present(driver):
+    """Readiness check: the View Other Scorecard modal has rendered its tree"""
+    from selenium.webdriver.common.by import By
+
+    return bool(driver.find_elements(By.CSS_SELECTOR, f"[id^='{TREE_ID_PREFIX}']"))
+
+
+def modal_closed(driver):
+    """Readiness check: no visible Close button is left on the page"""
+    from selenium.webdriver.common.by import By
+
+    return not any(button.is_displayed()
+                   for button in driver.find_elements(By.XPATH, "//input[@value='Close']"))
@@ -0,0 +1,452 @@
+"""
+Parallel extraction at store granularity with work stealing.
+
+Splitting regionals across workers leaves most of them idle while one works
+through the biggest regional. ParallelRunner instead:
+
+1. logs every worker in and lists the regionals' stores in parallel,
+2. orders the stores longest-first by their historical latency and deals them
+   onto per-worker deques, always to the worker with the least expected work,
+3. lets each worker take from the front of its own deque and, once that is
+   empty, steal from the back of the deque with the most expected work left.
+   A worker whose session breaks for good leaves its stores to be stolen.
+
+Per-store latencies are kept in a small JSON file (exponential moving average)
+so the next run's ordering uses this run's measurements.
+
+With a credential pool (pmo_credentials.py) every worker logs in with its own
+service account instead of sharing one login.
+
+With --adaptive, a ConcurrencyGovernor (pmo_concurrency.py) decides how many of
+the logged-in sessions take stores at a time, growing while latency holds and
+halving on timeouts or server errors.
+
+    python pmo_parallel.py --workers 4 --regionals ALL --headless --lean
+    python pmo_parallel.py --workers 8 --adaptive --min-workers 2 --headless --lean
+"""
+import os
+import json
+import time
+import logging
+import argparse
+import threading
+from functools import partial
+from collections import deque
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from pmo_grid import ALL_REGIONALS
+from pmo_runner import ExtractionRunner, COLUMN_SETS, create_backend
+from pmo_login_broker import LoginBroker
+from pmo_concurrency import ConcurrencyGovernor
+from pmo_credentials import CredentialPool, DEFAULT_ACCOUNTS_FILE, load_accounts
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LATENCY_FILE = "pmo_store_latency.json"
+
+
+class LatencyHistory:
+    """Moving average of seconds per store, persisted between runs"""
+
+    def __init__(self, path=DEFAULT_LATENCY_FILE, alpha=0.3, default=20.0):
+        self.path = path
+        self.alpha = alpha
+        self.default = default
+        self.latencies = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.latencies = json.load(f)
+            except Exception as e:
+                logger.warning(f"Could not read latency history {path}: {e}")
+
+    @staticmethod
+    def key(store_info):
+        return f"{store_info['regional']}/{store_info['name']}"
+
+    def estimate(self, store_info):
+        """Expected seconds for a store: its own history, else the median of all stores"""
+        if self.key(store_info) in self.latencies:
+            return self.latencies[self.key(store_info)]
+        if self.latencies:
+            values = sorted(self.latencies.values())
+            return values[len(values) // 2]
+        return self.default
+
+    def record(self, store_info, seconds):
+        with self._lock:
+            previous = self.latencies.get(self.key(store_info))
+            self.latencies[self.key(store_info)] = seconds if previous is None else \
+                self.alpha * seconds + (1 - self.alpha) * previous
+
+    def save(self):
+        if not self.path:
+            return
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(self.latencies, f, indent=2, ensure_ascii=False, sort_keys=True)
+
+
+class WorkStealingScheduler:
+    """Per-worker deques of stores, dealt longest-first, with stealing from the busiest"""
+
+    def __init__(self, workers, history):
+        self.history = history
+        self.deques = [deque() for _ in range(workers)]
+        self.expected = [0.0] * workers
+        self.steals = 0
+        self._lock = threading.Lock()
+
+    def deal(self, stores):
+        """Longest-processing-time-first assignment"""
+        for store in sorted(stores, key=self.history.estimate, reverse=True):
+            worker = self.expected.index(min(self.expected))
+            self.deques[worker].append(store)
+            self.expected[worker] += self.history.estimate(store)
+        for i, (queue, seconds) in enumerate(zip(self.deques, self.expected)):
+            logger.info(f"  Worker {i + 1}: {len(queue)} stores, ~{seconds / 60:.1f} min expected")
+
+    def next_store(self, worker):
+        """The worker's next store: own deque front, else steal from the back of the busiest one"""
+        with self._lock:
+            if self.deques[worker]:
+                store = self.deques[worker].popleft()
+                self.expected[worker] -= self.history.estimate(store)
+                return store
+
+            victim = max(range(len(self.deques)), key=lambda i: self.expected[i] if self.deques[i] else -1)
+            if not self.deques[victim]:
+                return None
+            store = self.deques[victim].pop()
+            self.expected[victim] -= self.history.estimate(store)
+            self.steals += 1
+            logger.info(f"Worker {worker + 1} stole '{store['name']}' from worker {victim + 1}")
+            return store
+
+    def requeue(self, worker, stores):
+        """Put stores back on a worker's deque; once it has stopped, the others steal them"""
+        with self._lock:
+            for store in stores:
+                self.deques[worker].append(store)
+                self.expected[worker] += self.history.estimate(store)
+
+    def take_remaining(self):
+        """Empty every deque and return the stores no worker took"""
+        with self._lock:
+            stores = [store for queue in self.deques for store in queue]
+            for queue in self.deques:
+                queue.clear()
+            self.expected = [0.0] * len(self.deques)
+            return stores
+
+    def empty(self):
+        with self._lock:
+            return not any(self.deques)
+
+
+class ParallelRunner:
+    def __init__(self, backend_factory, target_regionals, year, month, workers=4, extract_type="all",
+                 column="achievement", on_record=None, history=None, share_login=True,
+                 credential_pool=None, governor=None, metrics=None, tracer=None, command_budget=None,
+                 recorder=None):
+        """
+        Args:
+            backend_factory (callable): Returns a new, not yet logged in ExtractionBackend;
+                called with the worker's Account when a credential pool is used
+            target_regionals (list): Regional letters to extract
+            year (int|str), month (int): Period to extract
+            workers (int): Parallel sessions
+            extract_type (str): "all", "financial" or "scores"
+            column (str): Key of pmo_runner.COLUMN_SETS
+            on_record (callable): Called with every result row (from several threads)
+            history (LatencyHistory): Per-store latencies used for ordering
+            share_login (bool): Log in once and give the other workers sessions through a LoginBroker
+            credential_pool (CredentialPool): One account per worker instead of a shared login
+            governor (ConcurrencyGovernor): Limits how many sessions take stores at a time
+            metrics (StepMetrics): Shared step timings of every worker
+            tracer (Tracer): Shared trace; every worker thread gets its own track
+            command_budget (CommandBudget): Shared WebDriver command counts of every worker
+            recorder (PageRecorder): Shared page recorder of every worker
+        """
+        self.backend_factory = backend_factory
+        self.target_regionals = target_regionals
+        self.year = year
+        self.month = month
+        self.workers = workers
+        self.extract_type = extract_type
+        self.columns = COLUMN_SETS[column]
+        self.history = history or LatencyHistory()
+        self.scheduler = WorkStealingScheduler(workers, self.history)
+        self._record_lock = threading.Lock()
+        self._on_record = on_record
+        self.runners = []
+        self.credential_pool = credential_pool
+        self.share_login = share_login and credential_pool is None
+        self.broker = None
+        self.governor = governor
+        self.metrics = metrics
+        self.tracer = tracer
+        self.command_budget = command_budget
+        self.recorder = recorder
+
+    def on_record(self, record):
+        if self._on_record:
+            with self._record_lock:
+                self._on_record(record)
+
+    @property
+    def records(self):
+        return [record for runner in self.runners for record in runner.records]
+
+    def new_runner(self, backend):
+        runner = ExtractionRunner(backend, self.target_regionals, self.year, self.month, self.extract_type,
+                                  value_field=self.columns['value_field'],
+                                  last_control=self.columns['last_control'], on_record=self.on_record,
+                                  metrics=self.metrics, tracer=self.tracer, command_budget=self.command_budget,
+                                  recorder=self.recorder)
+        runner.account = None
+        return runner
+
+    def start_worker(self, _):
+        """Start a new session; returns the runner, or None when the session could not start"""
+        if self.credential_pool:
+            return self.start_pooled_worker()
+        try:
+            runner = self.new_runner(self.backend_factory())
+            if self.broker:
+                self.broker.start_session(runner)
+            else:
+                runner.recovery.establish()
+            return runner
+        except Exception as e:
+            logger.error(f"Worker session could not start: {e}")
+            return None
+
+    def start_pooled_worker(self):
+        """Log in with the next account from the pool, moving on while logins fail"""
+        pool = self.credential_pool
+        while True:
+            account = pool.acquire()
+            if account is None:
+                logger.error("No healthy account left for this worker")
+                return None
+            backend = None
+            try:
+                backend = self.backend_factory(account)
+                runner = self.new_runner(backend)
+                runner.account = account
+                # Re-logins during recovery count against the account's rate limit too
+                runner.recovery.start_session = partial(pool.login, backend, account, runner.start_session)
+                pool.login(backend, account, runner.start_session)
+                logger.info(f"Worker logged in as {account.username}")
+                return runner
+            except Exception as e:
+                logger.error(f"Worker login as {account.username} failed: {e}")
+                if backend:
+                    backend.close()
+                pool.release(account)
+
+    @staticmethod
+    def list_stores(runner, regionals):
+        stores = []
+        for regional in regionals:
+            try:
+                stores.extend(runner.backend.list_stores(regional))
+            except Exception as e:
+                logger.error(f"Error listing Regional {regional}: {e}")
+        return stores
+
+    def work(self, worker):
+        """Take stores until none are left; a worker that breaks hands its stores to the others"""
+        runner = self.runners[worker]
+        pending = None
+        try:
+            while True:
+                # Sessions above the governor's limit wait; their deques get stolen meanwhile
+                if self.governor and not self.governor.wait_turn(worker, self.scheduler.empty):
+                    break
+                store = pending = self.scheduler.next_store(worker)
+                if store is None:
+                    break
+                if runner.account:
+                    self.credential_pool.pace(runner.account)
+                start_time = time.time()
+                success = runner.process_store(store)
+                pending = None
+                elapsed = time.time() - start_time
+                if success:
+                    self.history.record(store, elapsed)
+                if self.governor:
+                    self.governor.observe(elapsed, success, runner.last_error, runner.last_failure)
+                if runner.pacer:
+                    runner.pacer.record_result(success)
+                runner.maybe_recycle()
+            runner.drain_retries()
+        except Exception as e:
+            stores = ([pending] if pending else []) + runner.retry_queue.take_all()
+            logger.error(f"Worker {worker + 1} stopped: {e}; {len(stores)} store(s) go back to the other workers")
+            self.scheduler.requeue(worker, stores)
+            if self.governor:
+                self.governor.retire(worker)
+
+    def close(self):
+        """Close every browser, return every account and save what was learned, also after a failed run"""
+        for runner in self.runners:
+            try:
+                runner.backend.close()
+            except Exception as e:
+                logger.warning(f"Could not close a worker session: {e}")
+            if runner.account:
+                self.credential_pool.release(runner.account)
+        self.history.save()
+        if self.recorder:
+            self.recorder.close()
+
+    def run(self):
+        workers = max(1, self.workers)
+        if self.credential_pool:
+            workers = min(workers, len(self.credential_pool))
+            if not workers:
+                raise RuntimeError("The credential pool has no healthy account")
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                if self.share_login and workers > 1:
+                    # The first worker logs in; the others get sessions from its ticket
+                    first = self.start_worker(0)
+                    if first:
+                        self.runners = [first]
+                        try:
+                            self.broker = LoginBroker(first.backend)
+                        except Exception as e:
+                            logger.warning(f"Login broker unavailable ({e}), every worker logs in")
+                        others = list(executor.map(self.start_worker, range(1, workers)))
+                        self.runners = [runner for runner in [first] + others if runner]
+                if not self.runners:
+                    self.runners = [runner for runner in executor.map(self.start_worker, range(workers)) if runner]
+                if not self.runners:
+                    raise RuntimeError("No worker session could be started")
+                workers = len(self.runners)
+                self.scheduler = WorkStealingScheduler(workers, self.history)
+                if self.governor:
+                    self.governor.resize(workers)
+
+                # Store discovery is spread over the workers as well
+                assignments = [self.target_regionals[i::workers] for i in range(workers)]
+                stores = [store for worker_stores in executor.map(self.list_stores, self.runners, assignments)
+                          for store in worker_stores]
+
+                logger.info(f"Dealing {len(stores)} stores to {workers} workers (longest first)")
+                self.scheduler.deal(stores)
+                list(executor.map(self.work, range(workers)))
+
+            # Every worker stopped before its stores were done
+            for store in self.scheduler.take_remaining():
+                self.runners[0].add_error_record(store, "No worker session left")
+        finally:
+            self.close()
+
+        for runner in self.runners:
+            runner.recovery.summary()
+        if self.credential_pool:
+            logger.info("Accounts:")
+            self.credential_pool.summary()
+        if self.governor:
+            self.governor.summary()
+        if self.command_budget:
+            self.command_budget.summary()
+        logger.info(f"Work stealing: {self.scheduler.steals} store(s) moved between workers")
+        if self.broker:
+            logger.info(f"Login broker: {self.broker.issued} shared session(s), {self.broker.fallbacks} full login(s)")
+        return self.records
+
+
+def main():
+    from pmo_storage import DataStorage
+    from pmo_metrics import StepMetrics
+    from pmo_tracing import Tracer
+    from pmo_commands import CommandBudget
+    from pmo_archive import PageRecorder
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(threadName)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Parallel PMO extraction with work stealing")
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--engine', choices=['selenium', 'cdp', 'http'], default='selenium')
+    parser.add_argument('--year', type=int, default=datetime.now().year)
+    parser.add_argument('--month', type=int, default=datetime.now().month)
+    parser.add_argument('--regionals', default='ALL', help="Comma-separated letters or ALL")
+    parser.add_argument('--extract-type', choices=['all', 'financial', 'scores'], default='all')
+    parser.add_argument('--column', choices=list(COLUMN_SETS), default='achievement')
+    parser.add_argument('--formats', default='csv')
+    parser.add_argument('--latency-file', default=DEFAULT_LATENCY_FILE)
+    parser.add_argument('--headless', action='store_true')
+    parser.add_argument('--lean', action='store_true')
+    parser.add_argument('--login-each', action='store_true', help="Log every worker in instead of sharing one login")
+    parser.add_argument('--accounts-file', default=None,
+                        help=f"JSON service accounts, one per worker (default: $PMO_ACCOUNTS_FILE or {DEFAULT_ACCOUNTS_FILE})")
+    parser.add_argument('--health-check', action='store_true', help="Test every account's login before starting")
+    parser.add_argument('--adaptive', action='store_true',
+                        help="Let a concurrency governor grow/shrink the active sessions up to --workers")
+    parser.add_argument('--min-workers', type=int, default=1, help="Lowest number of active sessions with --adaptive")
+    parser.add_argument('--metrics', default=os.getenv('PMO_METRICS'),
+                        help="Write per-step timings to <prefix>.json and <prefix>.prom")
+    parser.add_argument('--trace', default=os.getenv('PMO_TRACE'),
+                        help="Write a Chrome trace_event JSON (open in Perfetto) to this file")
+    parser.add_argument('--command-budget', type=int, default=None,
+                        help="Count WebDriver commands per store and fail the run above this many (0: count only)")
+    parser.add_argument('--record', default=os.getenv('PMO_RECORD'),
+                        help="Append the raw grid of every store to this archive (.jsonl.gz, see pmo_archive.py)")
+    parser.add_argument('--raw-store', default=os.getenv('PMO_RAW_STORE'),
+                        help="Keep every store's raw grid in this content-addressed store (see pmo_rawstore.py)")
+    args = parser.parse_args()
+
+    regionals = ALL_REGIONALS if args.regionals.upper() == 'ALL' else \
+        [r.strip().upper() for r in args.regionals.split(',') if r.strip()]
+
+    credential_pool = None
+    accounts_file = args.accounts_file or os.getenv('PMO_ACCOUNTS_FILE', DEFAULT_ACCOUNTS_FILE)
+    if os.path.exists(accounts_file):
+        credential_pool = CredentialPool(load_accounts(accounts_file))
+        if args.health_check:
+            credential_pool.health_check()
+
+    def backend_factory(account=None):
+        username = account.username if account else os.getenv('PMO_USERNAME')
+        password = account.password if account else os.getenv('PMO_PASSWORD')
+        return create_backend(args.engine, username, password,
+                              headless=args.headless, performance_profile=args.lean, column=args.column)
+
+    storage = DataStorage(f"pmo_parallel_{args.column}_{args.extract_type}_{'_'.join(regionals)}_"
+                          f"{args.year}_{args.month:02d}_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+                          value_label=COLUMN_SETS[args.column]['value_label'])
+    metrics = StepMetrics(args.metrics) if args.metrics else None
+    if metrics:
+        metrics.instrument(storage)
+    runner = ParallelRunner(backend_factory, regionals, args.year, args.month, args.workers,
+                            args.extract_type, args.column, on_record=storage.add_store_data,
+                            history=LatencyHistory(args.latency_file), share_login=not args.login_each,
+                            credential_pool=credential_pool,
+                            governor=ConcurrencyGovernor(args.workers, min_active=args.min_workers)
+                            if args.adaptive else None, metrics=metrics,
+                            tracer=Tracer(args.trace) if args.trace else None,
+                            command_budget=CommandBudget(args.command_budget or None)
+                            if args.command_budget is not None else CommandBudget.from_env(),
+                            recorder=PageRecorder.create(args.record, args.raw_store))
+
+    start_time = time.time()
+    runner.run()
+    elapsed = time.time() - start_time
+    storage.save_formats(args.formats.split(','))
+    if metrics:
+        metrics.write()
+    if runner.tracer:
+        runner.tracer.write()
+    logger.info(f"{len(runner.records)} stores in {elapsed:.1f}s with {args.workers} workers "
+                f"({len(runner.records) / elapsed * 60 if elapsed else 0:.2f} stores/min)")
+    if runner.command_budget:
+        runner.command_budget.enforce()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""
+Several periods in one session.
+
+Instead of one process per period (each repeating login, dashboard navigation
+and tree discovery), MultiPeriodRunner keeps one session and changes
+ddlPeriod/ddlMonth between passes, in whichever loop order costs fewer postbacks:
+
+    period-major: for each period, select it once and walk every store
+    store-major:  select each store once and step through the periods while it
+                  is showing; the period order snakes (forward, backward, ...)
+                  so the next store starts on the period the last one ended on
+
+Changing only the month is one postback, changing the year as well is two, and
+selecting a store is two (reopen the modal, click the node). Store-major relies
+on the dashboard keeping the selected store when the period changes, so the
+store and period shown are checked (backend.showing()) before every record: a
+period that did not apply is retried period-major, and a dashboard that drops
+the store switches the rest of the run to period-major.
+
+    python pmo_periods.py --periods 2024-01..2024-06 --regionals E,F
+"""
+import os
+import time
+import logging
+import argparse
+from datetime import datetime
+
+from pmo_grid import ALL_REGIONALS, build_store_record
+from pmo_runner import ExtractionRunner, COLUMN_SETS, create_backend
+from pmo_backends import StoreFailure, FAILURE_STALE_NODE, FAILURE_UNKNOWN
+
+logger = logging.getLogger(__name__)
+
+MODAL_POSTBACKS = 1  # View Other Scorecard
+STORE_POSTBACKS = 2  # reopen the modal + click the store node
+
+
+def parse_periods(text):
+    """'2024-01..2024-03,2024-05' -> [(2024, 1), (2024, 2), (2024, 3), (2024, 5)]"""
+    periods = []
+    for part in text.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        first, _, last = part.partition('..')
+        year, month = (int(x) for x in first.split('-'))
+        end_year, end_month = (int(x) for x in (last or first).split('-'))
+        while (year, month) <= (end_year, end_month):
+            periods.append((year, month))
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return sorted(set(periods))
+
+
+def period_change_cost(previous, period):
+    """Postbacks to go from one period to another"""
+    if previous == period:
+        return 0
+    return 1 if previous[0] == period[0] else 2
+
+
+def sequence_cost(periods):
+    return sum(period_change_cost(a, b) for a, b in zip(periods, periods[1:]))
+
+
+def plan_cost(order, periods, regional_count, store_count):
+    """Estimated postbacks after the first period selection for one loop order"""
+    if order == "period-major":
+        return sequence_cost(periods) + len(periods) * (regional_count * MODAL_POSTBACKS +
+                                                         store_count * STORE_POSTBACKS)
+    return regional_count * MODAL_POSTBACKS + store_count * (STORE_POSTBACKS + sequence_cost(periods))
+
+
+def choose_order(periods, regional_count, store_count):
+    """Return (order, costs) with the cheaper loop order"""
+    costs = {order: plan_cost(order, periods, regional_count, store_count)
+             for order in ("period-major", "store-major")}
+    return min(costs, key=costs.get), costs
+
+
+class MultiPeriodRunner:
+    def __init__(self, backend, target_regionals, periods, extract_type="all", column="achievement",
+                 on_record=None, order="auto", expected_stores_per_regional=45):
+        """
+        Args:
+            backend (ExtractionBackend): Engine that talks to PMO
+            target_regionals (list): Regional letters to extract
+            periods (list): [(year, month), ...]
+            extract_type (str): "all", "financial" or "scores"
+            column (str): Key of pmo_runner.COLUMN_SETS
+            on_record (callable): Called with every result row
+            order (str): "auto", "period-major" or "store-major"
+            expected_stores_per_regional (int): Store count assumed when planning before discovery
+        """
+        self.backend = backend
+        self.target_regionals = target_regionals
+        self.periods = sorted(periods)
+        self.extract_type = extract_type
+        self.columns = COLUMN_SETS[column]
+        self.order = order
+        self.expected_stores_per_regional = expected_stores_per_regional
+        self.runners = {period: ExtractionRunner(backend, target_regionals, period[0], period[1], extract_type,
+                                                 value_field=self.columns['value_field'],
+                                                 last_control=self.columns['last_control'],
+                                                 on_record=on_record)
+                        for period in self.periods}
+
+    @property
+    def records(self):
+        return [record for runner in self.runners.values() for record in runner.records]
+
+    def plan(self, store_count=None):
+        if store_count is None:
+            store_count = len(self.target_regionals) * self.expected_stores_per_regional
+        order, costs = choose_order(self.periods, len(self.target_regionals), store_count)
+        if self.order != "auto":
+            order = self.order
+        other = "store-major" if order == "period-major" else "period-major"
+        logger.info(f"Multi-period plan: {len(self.periods)} periods x ~{store_count} stores, {order} "
+                    f"(~{costs[order]} postbacks vs {costs[other]} {other}, "
+                    f"saving {costs[other] - costs[order]}; one process per period would add "
+                    f"{len(self.periods) - 1} logins)")
+        return order
+
+    def run(self):
+        order = self.plan()
+        if len(self.periods) == 1 or order == "period-major":
+            self.run_period_major()
+        else:
+            self.run_store_major()
+
+        store_count = len({(record['Regional'], record['Store']) for record in self.records})
+        _, costs = choose_order(self.periods, len(self.target_regionals), store_count)
+        other = "store-major" if order == "period-major" else "period-major"
+        logger.info(f"Multi-period run done: {store_count} stores x {len(self.periods)} periods {order}, "
+                    f"~{costs[other] - costs[order]} postbacks saved against {other}")
+        return self.records
+
+    def run_period_major(self):
+        logged_in = False
+        for period in self.periods:
+            logger.info(f"\n{'#'*50}\nPeriod {period[0]}-{period[1]:02d}\n{'#'*50}")
+            self.runners[period].run(logged_in=logged_in)
+            logged_in = True
+
+    def verify(self, store, period):
+        """
+        Raise StoreFailure unless the dashboard shows the store (when given) and the period.
+        Whatever the backend cannot tell is taken on trust.
+        """
+        shown_store, shown_period = self.backend.showing()
+        if shown_period is not None and shown_period != tuple(period):
+            raise StoreFailure(FAILURE_UNKNOWN, f"Dashboard shows period {shown_period} instead of {period}")
+        if store and shown_store is not None and shown_store != store['name'].strip():
+            raise StoreFailure(FAILURE_STALE_NODE, f"Dashboard shows '{shown_store}' instead of '{store['name']}'")
+
+    def read_current(self, store, period):
+        """Record the grid that is showing as the given period of the store, once verified"""
+        self.verify(store, period)
+        runner = self.runners[period]
+        texts = self.backend.read_grid()
+        runner.add_record(build_store_record(texts, store, runner.year, runner.month, self.extract_type,
+                                             runner.value_field, runner.last_control,
+                                             self.backend.method_label))
+
+    def run_store_major(self):
+        first = self.runners[self.periods[0]]
+        first.recovery.establish()
+        current = self.periods[0]
+        leftovers = []
+        store_major = True
+
+        for regional in self.target_regionals:
+            logger.info(f"\n{'='*50}\nProcessing Regional {regional} (store-major)\n{'='*50}")
+            if current != self.periods[0]:
+                self.backend.select_period(*self.periods[0])
+                current = self.periods[0]
+            try:
+                stores = self.backend.list_stores(regional)
+            except Exception as e:
+                logger.error(f"Error listing Regional {regional}: {e}")
+                continue
+
+            for i, store in enumerate(stores):
+                if not store_major:
+                    leftovers.append(store)
+                    continue
+                if current not in (self.periods[0], self.periods[-1]):
+                    self.backend.select_period(*self.periods[0])
+                    current = self.periods[0]
+                sequence = self.periods if current == self.periods[0] else self.periods[::-1]
+                runner = self.runners[current]
+                runner.recovery.ensure_session()
+                logger.info(f"\n[{i + 1}/{len(stores)}] {store['name']}")
+
+                try:
+                    self.verify(None, current)
+                except StoreFailure as e:
+                    error = e
+                else:
+                    error = runner.extract_store(store)
+                if error is not None:
+                    logger.error(f"Store '{store['name']}' failed: {error}")
+                    runner.recovery.recover(error)
+                    current = None  # recovery may have logged in again
+                    leftovers.append(store)
+                    continue
+
+                for j, period in enumerate(sequence[1:], 1):
+                    try:
+                        self.backend.select_period(*period)
+                        current = period
+                        self.read_current(store, period)
+                    except Exception as e:
+                        logger.warning(f"Period {period} of '{store['name']}' failed, will retry: {e}")
+                        for remaining in sequence[j:]:
+                            self.runners[remaining].retry_queue.push(store, str(e))
+                        if isinstance(e, StoreFailure) and e.kind == FAILURE_STALE_NODE:
+                            logger.warning("The dashboard does not keep the store across period changes, "
+                                           "continuing period-major")
+                            store_major = False
+                        runner.recovery.recover(e)
+                        current = None
+                        break
+
+        # Stores that failed outright get the period-major treatment with the usual retries
+        for period in self.periods:
+            runner = self.runners[period]
+            if not leftovers and not len(runner.retry_queue):
+                continue
+            self.backend.select_period(*period)
+            for store in leftovers:
+                runner.process_store(store)
+            runner.drain_retries()
+
+
+def main():
+    from pmo_storage import DataStorage
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Extract several periods in one PMO session")
+    parser.add_argument('--periods', required=True, help="e.g. 2024-01..2024-06 or 2024-03,2024-06")
+    parser.add_argument('--engine', choices=['selenium', 'cdp', 'http'], default='selenium')
+    parser.add_argument('--regionals', default='E', help="Comma-separated letters or ALL")
+    parser.add_argument('--extract-type', choices=['all', 'financial', 'scores'], default='all')
+    parser.add_argument('--column', choices=list(COLUMN_SETS), default='achievement')
+    parser.add_argument('--order', choices=['auto', 'period-major', 'store-major'], default='auto')
+    parser.add_argument('--formats', default='csv', help="Comma-separated: csv,json,sqlite,text, or all")
+    parser.add_argument('--headless', action='store_true')
+    parser.add_argument('--lean', action='store_true')
+    args = parser.parse_args()
+
+    periods = parse_periods(args.periods)
+    regionals = ALL_REGIONALS if args.regionals.upper() == 'ALL' else \
+        [r.strip().upper() for r in args.regionals.split(',') if r.strip()]
+
+    backend = create_backend(args.engine, os.getenv('PMO_USERNAME'), os.getenv('PMO_PASSWORD'),
+                             headless=args.headless, performance_profile=args.lean, column=args.column)
+    storage = DataStorage(f"pmo_{args.column}_{args.extract_type}_{'_'.join(regionals)}_"
+                          f"{periods[0][0]}{periods[0][1]:02d}-{periods[-1][0]}{periods[-1][1]:02d}_"
+                          f"{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+                          value_label=COLUMN_SETS[args.column]['value_label'])
+    runner = MultiPeriodRunner(backend, regionals, periods, args.extract_type, args.column,
+                               on_record=storage.add_store_data, order=args.order)
+
+    start_time = time.time()
+    try:
+        runner.run()
+    finally:
+        backend.close()
+    logger.info(f"{len(runner.records)} store-periods in {time.time() - start_time:.1f}s")
+    storage.save_formats(args.formats.split(','))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Log in while the interactive prompts are still answered.
+
+With PMO_USERNAME and PMO_PASSWORD in the environment, an interactive entry
+point starts Chrome on a background thread before it asks anything; that thread
+logs in and opens the dashboard while the operator picks the period and
+regionals. Headless and lean mode then come from PMO_HEADLESS / PMO_LEAN instead
+of prompts, because the browser is already running by then.
+
+The extractor class needs prepare_session() (log in and open the dashboard) and
+configure() (take the answers afterwards), and its run_extraction() passes
+dashboard_ready on to ExtractionRunner.run(logged_in=...).
+
+    prewarm = Prewarm.from_env(PMOFastDataExtractor)
+    try:
+        ...prompts...
+    except BaseException:
+        if prewarm:
+            prewarm.discard()
+        raise
+    extractor = prewarm.take(year, month, regionals, extract_type, formats) if prewarm else None
+"""
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+def env_flag(name):
+    return os.getenv(name, '').strip().lower() in ['1', 'y', 'yes', 'true']
+
+
+class Prewarm:
+    def __init__(self, extractor_class, username, password, headless=False, performance_profile=False):
+        """
+        Args:
+            extractor_class (type): Extractor to start, e.g. PMOFastDataExtractor
+            username (str), password (str): PMO credentials
+            headless (bool): Run Chrome without a window
+            performance_profile (bool): Lean Chrome (eager page loads, no images/CSS/fonts)
+        """
+        self.extractor_class = extractor_class
+        self.headless = headless
+        self.performance_profile = performance_profile
+        executor = ThreadPoolExecutor(max_workers=1)
+        self.future = executor.submit(self.start, username, password)
+        # The login keeps running; the executor only has to go away with it
+        executor.shutdown(wait=False)
+
+    @classmethod
+    def from_env(cls, extractor_class):
+        """Prewarm when both credentials are in the environment, else None"""
+        username = os.getenv('PMO_USERNAME')
+        password = os.getenv('PMO_PASSWORD')
+        if not (username and password):
+            return None
+        return cls(extractor_class, username, password, env_flag('PMO_HEADLESS'), env_flag('PMO_LEAN'))
+
+    def start(self, username, password):
+        """Start Chrome, log in and open the dashboard; runs while the prompts are answered"""
+        extractor = self.extractor_class(username, password, headless=self.headless,
+                                         performance_profile=self.performance_profile)
+        try:
+            extractor.prepare_session()
+        except Exception:
+            extractor.driver.quit()
+            raise
+        return extractor
+
+    def take(self, year, month, target_regionals, extract_type, storage_formats):
+        """The logged-in extractor set up for the answers, or None when the background start failed"""
+        extractor = None
+        try:
+            extractor = self.future.result()
+            extractor.configure(year, month, target_regionals, extract_type, storage_formats)
+            print("✓ Browser already logged in and on the dashboard")
+            return extractor
+        except Exception as e:
+            if extractor is not None:
+                extractor.driver.quit()
+            print(f"Background login failed ({e}), starting a new browser")
+            return None
+
+    def discard(self):
+        """Quit the browser once its login finishes; used when the prompts are abandoned"""
+        if self.future.cancel():
+            return
+
+        def quit_driver(future):
+            if not future.cancelled() and future.exception() is None:
+                future.result().driver.quit()
+        self.future.add_done_callback(quit_driver)
@@ -0,0 +1,395 @@
+"""
+Durable work queue for background backfills.
+
+One SQLite row per unit of work: (period, regional, store, measure), where the
+measure is a scorecard column from pmo_runner.COLUMN_SETS. A regional is first
+queued as a discovery unit (store = '') whose worker lists the regional's
+stores and queues one unit per store.
+
+Workers are separate processes, each owning one logged-in extractor session.
+A worker leases a unit, keeps the lease alive with a heartbeat while it works
+on it and marks it done (with the result row) or failed. When a worker dies its
+lease expires and another worker picks the unit up again.
+
+    python pmo_queue.py enqueue --periods 2024-01..2024-06 --regionals ALL --measures achievement,target
+    python pmo_queue.py work --workers 3 --headless --lean
+    python pmo_queue.py status
+    python pmo_queue.py export --formats csv,sqlite
+
+Progress is also one query away:
+
+    SELECT measure, year, month, state, COUNT(*) FROM work_units GROUP BY 1, 2, 3, 4;
+"""
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import argparse
+import threading
+import multiprocessing
+from datetime import datetime
+
+from pmo_grid import ALL_REGIONALS
+from pmo_periods import parse_periods
+from pmo_runner import ExtractionRunner, COLUMN_SETS, create_backend
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB = "pmo_queue.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS work_units (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    year INTEGER NOT NULL,
+    month INTEGER NOT NULL,
+    regional TEXT NOT NULL,
+    store TEXT NOT NULL DEFAULT '',
+    measure TEXT NOT NULL,
+    extract_type TEXT NOT NULL DEFAULT 'all',
+    store_info TEXT,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    not_before REAL NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,
+    heartbeat REAL,
+    last_error TEXT,
+    result TEXT,
+    created TEXT,
+    updated TEXT,
+    UNIQUE (year, month, regional, store, measure, extract_type)
+);
+CREATE INDEX IF NOT EXISTS idx_work_units_state ON work_units (state, not_before);
+"""
+
+
+def now_text():
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+
+def portable_store_info(store_info):
+    """The JSON-serialisable part of a store dict (drops WebElements)"""
+    return {key: value for key, value in store_info.items()
+            if isinstance(value, (str, int, float, bool, list, tuple, type(None)))}
+
+
+class WorkQueue:
+    def __init__(self, db_path=DEFAULT_DB, lease_seconds=180, max_attempts=4, retry_delay=30):
+        """
+        Args:
+            db_path (str): SQLite file shared by every worker
+            lease_seconds (float): How long a lease lives without a heartbeat
+            max_attempts (int): Leases per unit before it is marked failed
+            retry_delay (float): Seconds a failed unit waits before it can be leased again
+        """
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.conn = sqlite3.connect(db_path, timeout=60, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def enqueue(self, periods, regionals, measures, extract_type="all"):
+        """Queue a discovery unit per (period, regional, measure); returns how many were new"""
+        added = 0
+        for year, month in periods:
+            for regional in regionals:
+                for measure in measures:
+                    cursor = self.conn.execute(
+                        "INSERT OR IGNORE INTO work_units (year, month, regional, measure, extract_type, created, updated) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (year, month, regional, measure, extract_type, now_text(), now_text()))
+                    added += cursor.rowcount
+        return added
+
+    def add_stores(self, unit, stores):
+        """Queue one unit per store found by a discovery unit"""
+        with self.conn:
+            for store in stores:
+                self.conn.execute(
+                    "INSERT OR IGNORE INTO work_units (year, month, regional, store, measure, extract_type, "
+                    "store_info, created, updated) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (unit['year'], unit['month'], unit['regional'], store['name'], unit['measure'],
+                     unit['extract_type'], json.dumps(portable_store_info(store)), now_text(), now_text()))
+
+    def lease(self, owner, prefer=None):
+        """
+        Lease the next unit for a worker, or None. Discovery units go first;
+        after that units on the worker's current measure, period and regional
+        (prefer = (measure, year, month, regional)) so it changes page state least.
+        """
+        measure, year, month, regional = prefer or (None, None, None, None)
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Units whose worker died too often are given up on
+            self.conn.execute(
+                "UPDATE work_units SET state = 'failed', last_error = COALESCE(last_error, 'lease expired'), "
+                "updated = ? WHERE state = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (now_text(), now, self.max_attempts))
+            row = self.conn.execute(
+                "SELECT * FROM work_units "
+                "WHERE (state = 'pending' AND not_before <= ?) OR (state = 'leased' AND lease_expires < ?) "
+                "ORDER BY store = '' DESC, (measure = ? AND year = ? AND month = ?) DESC, regional = ? DESC, id "
+                "LIMIT 1",
+                (now, now, measure, year, month, regional)).fetchone()
+            if row is None:
+                self.conn.execute("COMMIT")
+                return None
+            self.conn.execute(
+                "UPDATE work_units SET state = 'leased', lease_owner = ?, lease_expires = ?, heartbeat = ?, "
+                "attempts = attempts + 1, updated = ? WHERE id = ?",
+                (owner, now + self.lease_seconds, now, now_text(), row['id']))
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        unit = dict(row)
+        unit['attempts'] += 1
+        return unit
+
+    def heartbeat(self, unit_id, owner):
+        """Extend a lease; False when the lease was lost to another worker"""
+        now = time.time()
+        cursor = self.conn.execute(
+            "UPDATE work_units SET heartbeat = ?, lease_expires = ? "
+            "WHERE id = ? AND lease_owner = ? AND state = 'leased'",
+            (now, now + self.lease_seconds, unit_id, owner))
+        return cursor.rowcount == 1
+
+    def complete(self, unit, result=None):
+        self.conn.execute(
+            "UPDATE work_units SET state = 'done', result = ?, last_error = NULL, lease_owner = NULL, "
+            "lease_expires = NULL, updated = ? WHERE id = ?",
+            (json.dumps(result, ensure_ascii=False, default=str) if result is not None else None,
+             now_text(), unit['id']))
+
+    def fail(self, unit, error):
+        """Put a unit back with a delay, or mark it failed once its attempts are used up"""
+        state = 'failed' if unit['attempts'] >= self.max_attempts else 'pending'
+        self.conn.execute(
+            "UPDATE work_units SET state = ?, last_error = ?, not_before = ?, lease_owner = NULL, "
+            "lease_expires = NULL, updated = ? WHERE id = ?",
+            (state, str(error), time.time() + self.retry_delay, now_text(), unit['id']))
+        return state
+
+    def outstanding(self):
+        """Units that are pending or leased"""
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM work_units WHERE state IN ('pending', 'leased')").fetchone()[0]
+
+    def progress(self):
+        return [dict(row) for row in self.conn.execute(
+            "SELECT measure, year, month, state, COUNT(*) AS units FROM work_units "
+            "WHERE store != '' GROUP BY measure, year, month, state ORDER BY measure, year, month, state")]
+
+    def results(self, measure):
+        return [json.loads(row['result']) for row in self.conn.execute(
+            "SELECT result FROM work_units WHERE measure = ? AND store != '' AND state = 'done' "
+            "AND result IS NOT NULL ORDER BY year, month, regional, id", (measure,))]
+
+
+class Heartbeat(threading.Thread):
+    """Keeps the lease of the unit a worker is busy with alive"""
+
+    def __init__(self, db_path, owner, interval):
+        super().__init__(name="pmo-heartbeat", daemon=True)
+        self.db_path = db_path
+        self.owner = owner
+        self.interval = interval
+        self.unit_id = None
+        self._stop_event = threading.Event()
+
+    def run(self):
+        queue = WorkQueue(self.db_path)
+        try:
+            while not self._stop_event.wait(self.interval):
+                if self.unit_id is not None and not queue.heartbeat(self.unit_id, self.owner):
+                    logger.warning(f"Lease on unit {self.unit_id} was lost")
+        finally:
+            queue.close()
+
+    def stop(self):
+        self._stop_event.set()
+
+
+class QueueWorker:
+    """One extractor session consuming the queue until it is empty"""
+
+    def __init__(self, db_path, options, worker_id=None):
+        self.queue = WorkQueue(db_path, **options.get('queue', {}))
+        self.options = options
+        self.owner = worker_id or f"{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.heartbeat = Heartbeat(db_path, self.owner, self.queue.lease_seconds / 3)
+        self.backend = None
+        self.measure = None
+        self.runner = None
+
+    def runner_for(self, unit):
+        """Backend and runner for a unit, reusing the session whenever possible"""
+        if self.backend is None or unit['measure'] != self.measure:
+            if self.backend:
+                self.backend.close()
+            self.backend = create_backend(self.options.get('engine', 'selenium'),
+                                          os.getenv('PMO_USERNAME'), os.getenv('PMO_PASSWORD'),
+                                          headless=self.options.get('headless', True),
+                                          performance_profile=self.options.get('lean', False),
+                                          column=unit['measure'])
+            self.measure = unit['measure']
+            self.runner = None
+
+        period = (str(unit['year']), unit['month'])
+        if self.runner and (self.runner.year, self.runner.month, self.runner.extract_type) == \
+                (period[0], period[1], unit['extract_type']):
+            return self.runner
+
+        columns = COLUMN_SETS[unit['measure']]
+        logged_in = self.runner is not None
+        self.runner = ExtractionRunner(self.backend, [unit['regional']], unit['year'], unit['month'],
+                                       unit['extract_type'], value_field=columns['value_field'],
+                                       last_control=columns['last_control'])
+        if logged_in:
+            self.backend.select_period(unit['year'], unit['month'])
+        else:
+            self.runner.recovery.establish()
+        return self.runner
+
+    def work_on(self, unit):
+        runner = self.runner_for(unit)
+        if not unit['store']:
+            runner.recovery.ensure_session()
+            stores = self.backend.list_stores(unit['regional'])
+            if not stores:
+                raise RuntimeError(f"No stores found in Regional {unit['regional']}")
+            self.queue.add_stores(unit, stores)
+            self.queue.complete(unit)
+            logger.info(f"Queued {len(stores)} stores of Regional {unit['regional']} "
+                        f"({unit['measure']} {unit['year']}-{unit['month']:02d})")
+            return
+
+        store_info = json.loads(unit['store_info'])
+        runner.recovery.ensure_session()
+        error = runner.extract_store(store_info)
+        if error is not None:
+            runner.recovery.recover(error)
+            raise error
+        self.queue.complete(unit, runner.records.pop())
+
+    def run(self):
+        self.heartbeat.start()
+        prefer = None
+        idle_poll = self.options.get('poll', 10)
+        try:
+            while True:
+                unit = self.queue.lease(self.owner, prefer)
+                if unit is None:
+                    if not self.queue.outstanding():
+                        break
+                    time.sleep(idle_poll)
+                    continue
+
+                self.heartbeat.unit_id = unit['id']
+                label = f"{unit['measure']} {unit['year']}-{unit['month']:02d} {unit['regional']} " \
+                        f"{unit['store'] or '(discovery)'}"
+                try:
+                    self.work_on(unit)
+                    prefer = (unit['measure'], unit['year'], unit['month'], unit['regional'])
+                    logger.info(f"✓ [{self.owner}] {label}")
+                except Exception as e:
+                    state = self.queue.fail(unit, e)
+                    logger.error(f"[{self.owner}] {label} failed (attempt {unit['attempts']}, now {state}): {e}")
+                finally:
+                    self.heartbeat.unit_id = None
+        finally:
+            self.heartbeat.stop()
+            if self.backend:
+                self.backend.close()
+            self.queue.close()
+
+
+def worker_main(db_path, options):
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(processName)s - %(message)s')
+    QueueWorker(db_path, options).run()
+
+
+def run_workers(db_path, workers, options):
+    """Start worker processes and wait for the queue to drain"""
+    processes = [multiprocessing.Process(target=worker_main, args=(db_path, options), name=f"worker-{i + 1}")
+                 for i in range(workers)]
+    for process in processes:
+        process.start()
+        time.sleep(options.get('stagger', 2))  # spread the logins out a little
+    for process in processes:
+        process.join()
+
+
+def main():
+    from pmo_storage import DataStorage
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="SQLite-backed PMO work queue")
+    parser.add_argument('--db', default=DEFAULT_DB)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    enqueue = commands.add_parser('enqueue', help="Queue periods x regionals x measures")
+    enqueue.add_argument('--periods', required=True, help="e.g. 2024-01..2024-06")
+    enqueue.add_argument('--regionals', default='ALL')
+    enqueue.add_argument('--measures', default='achievement', help=f"Comma-separated: {','.join(COLUMN_SETS)}")
+    enqueue.add_argument('--extract-type', choices=['all', 'financial', 'scores'], default='all')
+
+    work = commands.add_parser('work', help="Run worker processes until the queue is empty")
+    work.add_argument('--workers', type=int, default=2)
+    work.add_argument('--engine', choices=['selenium', 'cdp', 'http'], default='selenium')
+    work.add_argument('--headless', action='store_true')
+    work.add_argument('--lean', action='store_true')
+
+    commands.add_parser('status', help="Show progress")
+
+    export = commands.add_parser('export', help="Save finished results per measure")
+    export.add_argument('--formats', default='csv')
+
+    args = parser.parse_args()
+
+    if args.command == 'enqueue':
+        regionals = ALL_REGIONALS if args.regionals.upper() == 'ALL' else \
+            [r.strip().upper() for r in args.regionals.split(',') if r.strip()]
+        measures = [m.strip() for m in args.measures.split(',') if m.strip()]
+        unknown = [m for m in measures if m not in COLUMN_SETS]
+        if unknown:
+            parser.error(f"Unknown measures {unknown}")
+        queue = WorkQueue(args.db)
+        added = queue.enqueue(parse_periods(args.periods), regionals, measures, args.extract_type)
+        logger.info(f"Queued {added} new discovery unit(s) in {args.db}")
+
+    elif args.command == 'work':
+        run_workers(args.db, args.workers, {'engine': args.engine, 'headless': args.headless, 'lean': args.lean})
+
+    elif args.command == 'status':
+        queue = WorkQueue(args.db)
+        for row in queue.progress():
+            print(f"{row['measure']:<12} {row['year']}-{row['month']:02d}  {row['state']:<8} {row['units']}")
+        print(f"Outstanding units: {queue.outstanding()}")
+
+    elif args.command == 'export':
+        queue = WorkQueue(args.db)
+        for measure in COLUMN_SETS:
+            results = queue.results(measure)
+            if not results:
+                continue
+            storage = DataStorage(f"pmo_queue_{measure}_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+                                  value_label=COLUMN_SETS[measure]['value_label'])
+            for record in results:
+                storage.add_store_data(record)
+            storage.save_formats(args.formats.split(','))
+
+
+if __name__ == "__main__":
+    main()
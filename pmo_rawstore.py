@@ -0,0 +1,314 @@
+"""
+Content-addressed store of raw scorecard pages.
+
+An optional sink for PageRecorder (pmo_archive.py) meant to stay on in
+production runs: every store's raw grid is hashed (SHA-256 of its text) and
+written once under its hash, so a page that has not changed since the last run
+(a closed period re-extracted, a retry, a second run of the same day) costs one
+index line and no new object. The per-session ASP.NET state (__VIEWSTATE,
+__EVENTVALIDATION, ...) is blanked first; it changes on every postback and
+nothing is extracted from it.
+
+    <root>/objects/ab/abcdef....zst     raw grid, zstd-compressed (gzip, .gz, without zstandard)
+    <root>/index/2024-06.jsonl          one line per recorded store: period, store, sha256, row
+
+reextract rebuilds the DataStorage outputs of any recorded period from the
+store with the code as it is today, without PMO or a browser, in parallel
+worker processes:
+
+    PMO_RAW_STORE=pmo_raw python Storekpisinglepasswithlog2.py
+    python pmo_runner.py --engine http --raw-store pmo_raw
+    python pmo_rawstore.py stats --root pmo_raw
+    python pmo_rawstore.py reextract --root pmo_raw --period 2024-05 --period 2024-06 --formats csv,sqlite
+    python pmo_rawstore.py reextract --root pmo_raw --all --workers 8 --check
+
+zstd needs the zstandard package (pip install zstandard); without it new
+objects are gzip-compressed and existing .zst objects cannot be read.
+"""
+import os
+import re
+import sys
+import gzip
+import json
+import time
+import hashlib
+import logging
+import argparse
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from pmo_grid import parse_update_panel_delta
+from pmo_archive import group_by_period, replay, check
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROOT = "pmo_raw"
+ZSTD_LEVEL = 10
+
+# Hidden fields that differ between sessions for the same grid
+STATE_FIELDS = ('__VIEWSTATE', '__VIEWSTATEGENERATOR', '__EVENTVALIDATION', '__PREVIOUSPAGE')
+STATE_INPUT_PATTERN = re.compile(r'(<input[^>]*?\bname="(?:%s)"[^>]*?\bvalue=")[^"]*(")' % '|'.join(STATE_FIELDS))
+
+
+def canonical_page(raw):
+    """raw with the session state blanked, so that the same grid hashes the same in every run"""
+    delta = parse_update_panel_delta(raw)
+    if not delta:
+        return STATE_INPUT_PATTERN.sub(r'\1\2', raw)
+    parts = []
+    for kind, element_id, content in delta:
+        if kind == 'hiddenField' and element_id in STATE_FIELDS:
+            content = ''
+        else:
+            content = STATE_INPUT_PATTERN.sub(r'\1\2', content)
+        parts.append(f"{len(content)}|{kind}|{element_id}|{content}|")
+    return ''.join(parts)
+
+
+def content_hash(raw):
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def period_key(year, month):
+    return f"{int(year):04d}-{int(month):02d}"
+
+
+class RawPageStore:
+    def __init__(self, root=DEFAULT_ROOT, level=ZSTD_LEVEL):
+        """
+        Args:
+            root (str): Store directory; created on first write
+            level (int): zstd compression level
+        """
+        self.root = root
+        self.level = level
+        self.stored = 0
+        self.duplicates = 0
+        self.raw_bytes = 0
+        self.stored_bytes = 0
+        self._lock = threading.Lock()
+
+    def object_path(self, sha256, suffix):
+        return os.path.join(self.root, 'objects', sha256[:2], sha256 + suffix)
+
+    def index_path(self, period):
+        return os.path.join(self.root, 'index', f"{period}.jsonl")
+
+    def find_object(self, sha256):
+        for suffix in ('.zst', '.gz'):
+            path = self.object_path(sha256, suffix)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def put(self, raw):
+        """Store one raw page unless it is already there; returns its hash"""
+        sha256 = content_hash(raw)
+        if self.find_object(sha256):
+            with self._lock:
+                self.duplicates += 1
+            return sha256
+
+        data = raw.encode('utf-8')
+        if zstandard is not None:
+            suffix, blob = '.zst', zstandard.ZstdCompressor(level=self.level).compress(data)
+        else:
+            if not self.stored:
+                logger.warning("zstandard is not installed (pip install zstandard); raw pages are gzip-compressed")
+            suffix, blob = '.gz', gzip.compress(data)
+        path = self.object_path(sha256, suffix)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename so a killed run never leaves half an object under a valid hash
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(blob)
+        os.replace(temp_path, path)
+        with self._lock:
+            self.stored += 1
+            self.raw_bytes += len(data)
+            self.stored_bytes += len(blob)
+        return sha256
+
+    def get(self, sha256):
+        """Raw page text of a hash"""
+        path = self.find_object(sha256)
+        if path is None:
+            raise KeyError(f"Raw page {sha256} is not in {self.root}")
+        with open(path, 'rb') as f:
+            blob = f.read()
+        if path.endswith('.zst'):
+            if zstandard is None:
+                raise ValueError("Reading .zst pages needs zstandard (pip install zstandard)")
+            return zstandard.ZstdDecompressor().decompress(blob).decode('utf-8')
+        return gzip.decompress(blob).decode('utf-8')
+
+    def add(self, page):
+        """PageRecorder sink: store the raw grid and index the page under its period"""
+        entry = dict(page)
+        entry['sha256'] = self.put(canonical_page(entry.pop('raw')))
+        line = json.dumps(entry, ensure_ascii=False, default=str) + '\n'
+        path = self.index_path(period_key(page['year'], page['month']))
+        with self._lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(line)
+
+    def close(self):
+        compression = f" ({1 - self.stored_bytes / self.raw_bytes:.0%} smaller compressed)" if self.raw_bytes else ""
+        logger.info(f"✓ Raw pages in {self.root}: {self.stored} new, {self.duplicates} unchanged{compression}")
+
+    def periods(self):
+        index_dir = os.path.join(self.root, 'index')
+        if not os.path.isdir(index_dir):
+            return []
+        return sorted(name[:-len('.jsonl')] for name in os.listdir(index_dir) if name.endswith('.jsonl'))
+
+    def entries(self, period):
+        """Index entries of one period (no raw text), in recording order"""
+        path = self.index_path(period)
+        if not os.path.exists(path):
+            return []
+        entries = []
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # The last line of a run that was killed mid-write
+                    logger.warning(f"Skipping a damaged line in {path}")
+        return entries
+
+    def stats(self):
+        objects, size = 0, 0
+        for directory, _, files in os.walk(os.path.join(self.root, 'objects')):
+            for name in files:
+                if name.endswith(('.zst', '.gz')):
+                    objects += 1
+                    size += os.path.getsize(os.path.join(directory, name))
+        periods = {period: len(self.entries(period)) for period in self.periods()}
+        return {'objects': objects, 'bytes': size, 'pages': sum(periods.values()), 'periods': periods}
+
+
+def reextract_chunk(root, entries, extract_type):
+    """Worker: rebuild the rows of one regional of one period; returns [(entry, row)]"""
+    store = RawPageStore(root)
+    pages = [dict(entry, raw=store.get(entry['sha256'])) for entry in entries]
+    results = replay(pages, extract_type)
+    for page, _ in results:
+        page.pop('raw', None)
+    return results
+
+
+def reextract(store, periods, extract_type=None, formats=("csv",), workers=None, output_dir="."):
+    """
+    Rebuild and save the rows of recorded periods with the current code.
+
+    Args:
+        store (RawPageStore): Where the pages are
+        periods (list): "YYYY-MM" keys to rebuild
+        extract_type (str): Build this row type instead of the recorded one
+        formats (list): DataStorage formats to write per period
+        workers (int): Worker processes (default: one per CPU)
+        output_dir (str): Directory of the output files
+    Returns:
+        [(output key, saved files, [(entry, row)])]
+    """
+    from pmo_storage import DataStorage
+    from pmo_runner import COLUMN_SETS
+
+    # One job per regional of every (period, column, extract type) that was recorded
+    groups = []
+    for period in periods:
+        entries = store.entries(period)
+        if not entries:
+            logger.warning(f"No pages recorded for {period}")
+        for key, group in group_by_period(entries).items():
+            by_regional = {}
+            for entry in group:
+                by_regional.setdefault(entry['regional'], []).append(entry)
+            groups.append((key, [by_regional[regional] for regional in sorted(by_regional)]))
+
+    outputs = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [(key, [executor.submit(reextract_chunk, store.root, chunk, extract_type) for chunk in chunks])
+                   for key, chunks in groups]
+        for (year, month, value_field, _, recorded_type), chunk_futures in futures:
+            results = [result for future in chunk_futures for result in future.result()]
+            row_type = extract_type or recorded_type
+            value_label = next((columns['value_label'] for columns in COLUMN_SETS.values()
+                                if columns['value_field'] == value_field), "YTD Achievement")
+            storage = DataStorage(os.path.join(output_dir, f"pmo_reextract_{value_field}_{row_type}_"
+                                                           f"{period_key(year, month)}"),
+                                  value_label=value_label)
+            for _, row in results:
+                storage.add_store_data(row)
+            saved_files = storage.save_formats(formats)
+            outputs.append((f"{period_key(year, month)} {row_type} ({value_field})", saved_files, results))
+    return outputs
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Content-addressed store of raw scorecard pages")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    stats_parser = subparsers.add_parser('stats', help="Pages, unique objects and size of the store")
+    stats_parser.add_argument('--root', default=os.getenv('PMO_RAW_STORE') or DEFAULT_ROOT)
+    reextract_parser = subparsers.add_parser('reextract', help="Rebuild the outputs of recorded periods offline")
+    reextract_parser.add_argument('--root', default=os.getenv('PMO_RAW_STORE') or DEFAULT_ROOT)
+    reextract_parser.add_argument('--period', action='append', default=[], help="YYYY-MM; repeat for several")
+    reextract_parser.add_argument('--all', action='store_true', help="Every recorded period")
+    reextract_parser.add_argument('--extract-type', choices=['all', 'financial', 'scores',
+                                                             'legacy_financial', 'legacy_scores'], default=None,
+                                  help="Build this row type instead of the recorded one")
+    reextract_parser.add_argument('--formats', default='csv', help="Comma-separated: csv,json,sqlite,text, or all")
+    reextract_parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPUs)")
+    reextract_parser.add_argument('--output-dir', default='.')
+    reextract_parser.add_argument('--check', action='store_true',
+                                  help="Fail when a rebuilt row differs from the one recorded at the time")
+    args = parser.parse_args()
+
+    store = RawPageStore(args.root)
+    if args.command == 'stats':
+        stats = store.stats()
+        ratio = stats['pages'] / stats['objects'] if stats['objects'] else 0
+        logger.info(f"{stats['pages']} page(s) in {stats['objects']} object(s) ({ratio:.1f} pages/object), "
+                    f"{stats['bytes'] / 1024 / 1024:.1f} MB")
+        for period, pages in stats['periods'].items():
+            logger.info(f"  {period}: {pages} page(s)")
+        return
+
+    periods = store.periods() if args.all else [period_key(*period.split('-')) for period in args.period]
+    if not periods:
+        parser.error("Give --period YYYY-MM or --all")
+    if args.check and args.extract_type:
+        parser.error("--check compares with the recorded rows; leave out --extract-type")
+    os.makedirs(args.output_dir, exist_ok=True)
+    # The runner's per-store logging would drown the summary
+    logging.getLogger('pmo_runner').setLevel(logging.WARNING)
+
+    start_time = time.time()
+    outputs = reextract(store, periods, args.extract_type, args.formats.split(','), args.workers, args.output_dir)
+    elapsed = time.time() - start_time
+    rows = sum(len(results) for _, _, results in outputs)
+    logger.info(f"Re-extracted {rows} row(s) of {len(outputs)} output(s) in {elapsed:.1f}s")
+    for name, saved_files, results in outputs:
+        logger.info(f"  {name}: {len(results)} row(s) -> {', '.join(path for _, path in saved_files or [])}")
+
+    if args.check:
+        changed = sum(check(results) for _, _, results in outputs)
+        if changed:
+            logger.error(f"✗ {changed} of {rows} row(s) differ from the recording")
+            sys.exit(1)
+        logger.info(f"✓ All {rows} rebuilt row(s) match the recording")
+
+
+if __name__ == "__main__":
+    main()
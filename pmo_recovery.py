@@ -0,0 +1,153 @@
+"""
+Targeted recovery after a failed store.
+
+The backend classifies the failure (pmo_backends FAILURE_* kinds) and the
+RecoveryManager applies the cheapest action that fixes that kind, escalating
+to the next action when it does not work:
+
+    relocate_node   -> look the store up again in the tree that is still open
+    reopen_modal    -> close and reopen View Other Scorecard
+    relogin         -> log in again and reselect the period in the same browser
+    recycle_driver  -> promote the warm standby browser if there is one,
+                       else new browser, then log in again
+
+ensure_session() probes for an expired session before each store so that a
+timeout costs one re-login instead of a failed store, and establish() retries
+the initial login and period selection, which PMO fails as often as any store.
+"""
+import time
+import logging
+from collections import Counter
+
+from pmo_backends import (FAILURE_STALE_NODE, FAILURE_EMPTY_GRID, FAILURE_MODAL_FAILED,
+                          FAILURE_SESSION_EXPIRED, FAILURE_DRIVER_LOST, FAILURE_SERVER_ERROR,
+                          FAILURE_UNKNOWN)
+
+logger = logging.getLogger(__name__)
+
+ESCALATION = ['relocate_node', 'reopen_modal', 'relogin', 'recycle_driver']
+
+RECOVERY_ACTIONS = {
+    FAILURE_STALE_NODE: 'relocate_node',
+    FAILURE_EMPTY_GRID: 'reopen_modal',
+    FAILURE_MODAL_FAILED: 'reopen_modal',
+    FAILURE_UNKNOWN: 'reopen_modal',
+    FAILURE_SERVER_ERROR: 'reopen_modal',
+    FAILURE_SESSION_EXPIRED: 'relogin',
+    FAILURE_DRIVER_LOST: 'recycle_driver',
+}
+
+
+class RecoveryManager:
+    def __init__(self, backend, start_session):
+        """
+        Args:
+            backend (ExtractionBackend): Backend whose failures are recovered
+            start_session (callable): Logs in and selects the period (ExtractionRunner.start_session)
+        """
+        self.backend = backend
+        self.start_session = start_session
+        self.failures = Counter()
+        self.recoveries = Counter()
+        # Kind of the last classified failure, for the concurrency governor
+        self.last_kind = None
+
+    def relocate_node(self):
+        self.backend.relocate_node()
+
+    def reopen_modal(self):
+        self.backend.reset_modal()
+
+    def relogin(self):
+        self.start_session()
+
+    def recycle_driver(self):
+        if self.backend.failover():
+            return
+        self.backend.recycle()
+        self.start_session()
+
+    def classify(self, error):
+        try:
+            kind = self.backend.classify_failure(error)
+        except Exception:
+            kind = FAILURE_UNKNOWN
+        self.failures[kind] += 1
+        self.last_kind = kind
+        return kind
+
+    def establish(self, attempts=5, backoff=2.0):
+        """
+        Log in and select the period, retrying a failed start with a growing pause
+        (a new browser or connection first when the old one is gone).
+
+        Args:
+            attempts (int): Starts tried before the last error is raised
+            backoff (float): Seconds before the second attempt, doubled after each failure
+        """
+        for attempt in range(1, attempts + 1):
+            try:
+                self.start_session()
+                if attempt > 1:
+                    self.recoveries['restart_session'] += 1
+                return
+            except Exception as e:
+                kind = self.classify(e)
+                if attempt == attempts:
+                    logger.error(f"Session could not start after {attempts} attempts ({kind}): {e}")
+                    raise
+                pause = backoff * 2 ** (attempt - 1)
+                logger.warning(f"Session start failed ({kind}): {e}; retrying in {pause:.0f}s")
+                time.sleep(pause)
+                if kind == FAILURE_DRIVER_LOST:
+                    self.backend.recycle()
+
+    def ensure_session(self):
+        """
+        Cheap validity probe run before every store: when the server has expired
+        the session, log in again and reselect the period before continuing.
+        """
+        try:
+            expired = self.backend.session_expired()
+        except Exception as e:
+            return self.recover(e)
+        if not expired:
+            return True
+
+        logger.warning("Session expired, logging in again before the next store")
+        self.failures[FAILURE_SESSION_EXPIRED] += 1
+        for action in ESCALATION[ESCALATION.index('relogin'):]:
+            try:
+                getattr(self, action)()
+                self.recoveries[action] += 1
+                logger.info("✓ Session restored")
+                return True
+            except Exception as e:
+                logger.warning(f"Recovery {action} failed: {e}")
+        logger.error("Could not restore the session")
+        return False
+
+    def recover(self, error):
+        """
+        Classify a store failure and run its recovery action, escalating while
+        actions fail. Returns True when the backend is ready for the next store.
+        """
+        kind = self.classify(error)
+        for action in ESCALATION[ESCALATION.index(RECOVERY_ACTIONS[kind]):]:
+            logger.info(f"🔧 Failure '{kind}': trying {action}")
+            try:
+                getattr(self, action)()
+                self.recoveries[action] += 1
+                return True
+            except Exception as e:
+                logger.warning(f"Recovery {action} failed: {e}")
+
+        logger.error(f"Could not recover from '{kind}'")
+        return False
+
+    def summary(self):
+        if not self.failures:
+            return
+        logger.info("Failures by type: " + ", ".join(f"{kind} {n}" for kind, n in self.failures.most_common()))
+        logger.info("Recoveries by action: " + (", ".join(f"{action} {n}" for action, n in
+                                                         self.recoveries.most_common()) or "none"))
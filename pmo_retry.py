@@ -0,0 +1,70 @@
+"""Deferred retry queue: failed stores are retried after the main pass instead of inline"""
+import heapq
+import random
+import time
+import logging
+from itertools import count
+
+logger = logging.getLogger(__name__)
+
+
+class RetryQueue:
+    def __init__(self, max_attempts=4, base_delay=5.0, max_delay=120.0, jitter=0.5,
+                 fresh_session_after=2):
+        """
+        Args:
+            max_attempts (int): Total tries per store, including the one in the main pass
+            base_delay (float): Backoff before the first retry, doubled on every further retry
+            max_delay (float): Upper bound of a single backoff
+            jitter (float): Random +/- fraction applied to every backoff
+            fresh_session_after (int): From this retry on, log in again instead of only reopening the modal
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.fresh_session_after = fresh_session_after
+        self._heap = []
+        self._counter = count()
+        self.tracer = None  # set by Tracer.attach_sleeps
+
+    def __len__(self):
+        return len(self._heap)
+
+    def backoff(self, attempt):
+        """Exponential backoff with jitter for the given retry number (1 = first retry)"""
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def push(self, store_info, error, attempt=1):
+        """
+        Schedule a store that failed its attempt number `attempt`.
+        Returns False when the store has used up its attempts.
+        """
+        if attempt >= self.max_attempts:
+            return False
+        due = time.time() + self.backoff(attempt)
+        heapq.heappush(self._heap, (due, next(self._counter),
+                                    {'store': store_info, 'attempt': attempt + 1, 'error': error}))
+        logger.info(f"↻ Deferred '{store_info['name']}' for retry {attempt}/{self.max_attempts - 1} "
+                    f"in {due - time.time():.0f}s ({error})")
+        return True
+
+    def pop_due(self):
+        """Wait until the earliest retry is due and return it"""
+        due, _, entry = heapq.heappop(self._heap)
+        wait = due - time.time()
+        if wait > 0:
+            logger.info(f"Waiting {wait:.1f}s before retrying '{entry['store']['name']}'")
+            if self.tracer:
+                self.tracer.sleep(wait)
+            else:
+                time.sleep(wait)
+        entry['fresh_session'] = entry['attempt'] - 1 >= self.fresh_session_after
+        return entry
+
+    def take_all(self):
+        """Remove every deferred store and return them, e.g. for another worker to retry"""
+        stores = [entry['store'] for _, _, entry in sorted(self._heap)]
+        self._heap = []
+        return stores
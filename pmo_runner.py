@@ -0,0 +1,376 @@
+"""
+Engine-independent extraction loop.
+
+ExtractionRunner walks regionals and stores on top of any ExtractionBackend
+(pmo_backends.py) and turns each grid into a result row with pmo_grid.
+"""
+import os
+import time
+import logging
+import argparse
+import importlib
+from datetime import datetime
+
+from pmo_driver import RecyclePolicy
+from pmo_grid import ALL_REGIONALS, REGIONAL_DIVS, TARGET_REGIONAL_DIVS, build_store_record, build_error_record
+from pmo_retry import RetryQueue
+from pmo_recovery import RecoveryManager
+from pmo_backends import StoreFailure, FAILURE_UNKNOWN
+
+logger = logging.getLogger(__name__)
+
+# Scorecard columns: which grid field to read and which script knows that scorecard's tree
+COLUMN_SETS = {
+    'achievement': {'value_field': 'YTDAchievement', 'last_control': 22, 'value_label': 'YTD Achievement',
+                    'module': 'Storekpisinglepasswithlog2', 'regional_divs': REGIONAL_DIVS},
+    'target': {'value_field': 'YTDTarget', 'last_control': 34, 'value_label': 'YTD Target',
+               'module': 'target', 'regional_divs': TARGET_REGIONAL_DIVS},
+}
+
+
+class ExtractionRunner:
+    def __init__(self, backend, target_regionals, year, month, extract_type="all",
+                 value_field="YTDAchievement", last_control=22, on_record=None, pacer=None,
+                 retry_queue=None, recycle_policy=None, metrics=None, tracer=None, command_budget=None,
+                 recorder=None):
+        """
+        Args:
+            backend (ExtractionBackend): Engine that talks to PMO
+            target_regionals (list): Regional letters to extract
+            year (int|str), month (int): Period to extract
+            extract_type (str): "all", "financial", "scores", "legacy_financial" or "legacy_scores"
+            value_field (str): Grid column to read ("YTDAchievement" or "YTDTarget")
+            last_control (int): Last grid row (ctlNN) read in "all" mode
+            on_record (callable): Called with every result row, e.g. DataStorage.add_store_data
+            pacer (Pacer): Receives per-store outcomes for error backoff (default: the backend's)
+            retry_queue (RetryQueue): Where failed stores wait for their next attempt
+            recycle_policy (RecyclePolicy): When to swap the browser (default: from the environment)
+            metrics (StepMetrics): Times the backend's steps and extract_store when given
+            tracer (Tracer): Records a trace span per store and step when given
+            command_budget (CommandBudget): Counts the WebDriver commands of every store when given
+            recorder (PageRecorder): Saves the raw grid of every extracted store when given
+        """
+        self.backend = backend
+        self.target_regionals = target_regionals
+        self.year = str(year)
+        self.month = month
+        self.extract_type = extract_type
+        self.value_field = value_field
+        self.last_control = last_control
+        self.on_record = on_record
+        self.pacer = pacer or getattr(backend, 'pacer', None)
+        self.retry_queue = retry_queue if retry_queue is not None else RetryQueue()
+        self.recovery = RecoveryManager(backend, self.start_session)
+        self.recycle_policy = recycle_policy if recycle_policy is not None else RecyclePolicy.from_env()
+        self.records = []
+        # Journal of (regional, store) pairs the main pass has handled, so that a
+        # regional interrupted by a dead browser resumes where it stopped
+        self.journal = set()
+        # Final error of the last process_store call and its FAILURE_* kind, for the concurrency governor
+        self.last_error = None
+        self.last_failure = None
+        self.metrics = metrics
+        self.tracer = tracer
+        self.command_budget = command_budget
+        self.recorder = recorder
+        if metrics:
+            metrics.instrument_runner(self)
+        if tracer:
+            tracer.instrument_runner(self)
+        if command_budget:
+            command_budget.instrument_runner(self)
+        if recorder:
+            recorder.instrument_runner(self)
+
+    @classmethod
+    def from_env(cls, backend, target_regionals, year, month, extract_type="all", storage=None, **kwargs):
+        """
+        Runner with the instrumentation the environment asks for: PMO_METRICS, PMO_TRACE,
+        PMO_COMMAND_BUDGET and PMO_RECORD / PMO_RAW_STORE. The interactive scripts start here.
+
+        Args:
+            storage (DataStorage): Receives every row and has its saves timed (else pass on_record)
+            kwargs: Further ExtractionRunner arguments
+        """
+        from pmo_metrics import StepMetrics
+        from pmo_tracing import Tracer
+        from pmo_commands import CommandBudget
+        from pmo_archive import PageRecorder
+
+        metrics = StepMetrics.from_env()
+        if storage is not None:
+            kwargs.setdefault('on_record', storage.add_store_data)
+            if metrics:
+                metrics.instrument(storage)
+        return cls(backend, target_regionals, year, month, extract_type, metrics=metrics,
+                   tracer=Tracer.from_env(), command_budget=CommandBudget.from_env(),
+                   recorder=PageRecorder.from_env(), **kwargs)
+
+    def finish(self):
+        """Close the page recorder and write the metrics and trace files, once the rows are saved"""
+        if self.recorder:
+            self.recorder.close()
+        if self.metrics:
+            self.metrics.write()
+        if self.tracer:
+            self.tracer.write()
+
+    def add_record(self, record):
+        self.records.append(record)
+        if self.on_record:
+            self.on_record(record)
+
+    def add_error_record(self, store_info, error_message):
+        self.add_record(build_error_record(store_info, self.year, self.month,
+                                           self.extract_type, error_message))
+
+    def start_session(self):
+        self.backend.login()
+        self.backend.select_period(self.year, self.month)
+
+    def extract_store(self, store_info):
+        """Select one store and record its grid; returns None on success, else the error"""
+        try:
+            if not self.backend.select_store(store_info, max_attempts=1):
+                raise StoreFailure(FAILURE_UNKNOWN, "Failed to select store")
+            texts = self.backend.read_grid()
+            record = build_store_record(texts, store_info, self.year, self.month, self.extract_type,
+                                        self.value_field, self.last_control, self.backend.method_label)
+            self.add_record(record)
+            logger.info(f"✓ Extraction complete for {store_info['name']}")
+            return None
+        except Exception as e:
+            return e
+
+    def process_store(self, store_info, attempt=1):
+        """
+        Extract one store; returns True on success.
+        After a failure the backend is recovered according to the failure type and
+        the store is tried once more in place; if that fails too it is deferred to
+        the retry queue while it has attempts left.
+        """
+        self.recovery.ensure_session()
+        error = self.extract_store(store_info)
+        if error is not None:
+            logger.error(f"Store '{store_info['name']}' failed on attempt {attempt}: {error}")
+            if self.recovery.recover(error) and attempt + 1 < self.retry_queue.max_attempts:
+                attempt += 1
+                logger.info(f"Retrying '{store_info['name']}' after recovery (attempt {attempt})")
+                error = self.extract_store(store_info)
+                if error is not None:
+                    logger.error(f"Store '{store_info['name']}' failed on attempt {attempt}: {error}")
+                    self.recovery.recover(error)
+
+        self.last_error = error
+        self.last_failure = self.recovery.last_kind if error is not None else None
+        if error is None:
+            return True
+        if not self.retry_queue.push(store_info, str(error), attempt):
+            self.add_error_record(store_info, str(error))
+        return False
+
+    def maybe_recycle(self):
+        """Restart the browser between stores when the recycle policy says so"""
+        if not self.recycle_policy.enabled or not self.recycle_policy.store_done(self.backend):
+            return
+        try:
+            self.backend.restart_browser()
+        except Exception as e:
+            logger.warning(f"Browser restart with the old session failed ({e}), logging in again")
+            self.recovery.recycle_driver()
+        self.recycle_policy.recycled()
+
+    def drain_retries(self):
+        """Retry deferred stores with backoff, on a fresh modal or a fresh session"""
+        if not len(self.retry_queue):
+            return
+
+        logger.info(f"\n{'='*50}")
+        logger.info(f"Retrying {len(self.retry_queue)} deferred store(s)")
+        logger.info(f"{'='*50}")
+
+        while len(self.retry_queue):
+            entry = self.retry_queue.pop_due()
+            store = entry['store']
+            logger.info(f"\n[retry {entry['attempt'] - 1}] Processing store: {store['name']}")
+            try:
+                if entry['fresh_session']:
+                    logger.info("Starting a fresh session before retrying")
+                    # Through recovery, so a pooled worker logs in again via its credential pool
+                    self.recovery.start_session()
+                else:
+                    self.backend.reset_modal()
+            except Exception as e:
+                logger.warning(f"Could not prepare retry for '{store['name']}': {e}")
+
+            success = self.process_store(store, entry['attempt'])
+            if self.pacer:
+                self.pacer.record_result(success)
+            self.maybe_recycle()
+
+    def process_regional(self, regional_letter):
+        logger.info(f"\n{'='*50}")
+        logger.info(f"Processing Regional {regional_letter}")
+        logger.info(f"{'='*50}")
+
+        self.recovery.ensure_session()
+        stores = self.backend.list_stores(regional_letter)
+        if not stores:
+            logger.warning(f"No active stores found in Regional {regional_letter}")
+            return
+
+        logger.info(f"Found {len(stores)} active stores to process")
+        successful_stores = 0
+        processed_stores = 0
+
+        for i, store in enumerate(stores, 1):
+            if (regional_letter, store['name']) in self.journal:
+                continue
+            logger.info(f"\n[{i}/{len(stores)}] Processing store: {store['name']}")
+            success = self.process_store(store)
+            self.journal.add((regional_letter, store['name']))
+            processed_stores += 1
+            if success:
+                successful_stores += 1
+            if self.pacer:
+                self.pacer.record_result(success)
+            self.maybe_recycle()
+
+        logger.info(f"Regional {regional_letter} main pass complete: "
+                    f"{successful_stores} successful, {processed_stores - successful_stores} deferred or failed")
+
+    def run(self, logged_in=False):
+        """
+        Log in, select the period, extract every target regional, then retry deferred stores.
+        With logged_in=True the backend is already on the dashboard and only the period is selected.
+        """
+        if logged_in and not self.backend.session_expired():
+            self.backend.select_period(self.year, self.month)
+        else:
+            self.recovery.establish()
+
+        for regional in self.target_regionals:
+            try:
+                self.process_regional(regional)
+            except Exception as e:
+                logger.error(f"Error processing Regional {regional}: {e}")
+                if not self.recovery.recover(e):
+                    continue
+                try:
+                    logger.info(f"Resuming Regional {regional} from the journal")
+                    self.process_regional(regional)
+                except Exception as e:
+                    logger.error(f"Error processing Regional {regional} after recovery: {e}")
+
+        self.drain_retries()
+        self.recovery.summary()
+
+        if self.pacer:
+            self.pacer.summary()
+        if self.command_budget:
+            self.command_budget.summary()
+        return self.records
+
+
+def create_backend(engine, username, password, headless=False, base_url=None, performance_profile=False,
+                   pacing_profile=None, standby=None, column="achievement"):
+    """Build a backend by name: "selenium", "cdp" or "http", reading one of COLUMN_SETS"""
+    columns = COLUMN_SETS[column]
+    if engine == "http":
+        from pmo_backends import HttpBackend
+        return HttpBackend(username, password, base_url=base_url, regional_divs=columns['regional_divs'],
+                           value_field=columns['value_field'])
+
+    from pmo_backends import SeleniumBackend, CdpCaptureBackend
+
+    extractor_options = {'capture_network': True} if engine == "cdp" else {}
+    if engine == "cdp" and column != "achievement":
+        raise ValueError("The cdp engine only supports the achievement column")
+    extractor_class = importlib.import_module(columns['module']).PMOFastDataExtractor
+    extractor = extractor_class(username, password, headless=headless,
+                                performance_profile=performance_profile,
+                                pacing_profile=pacing_profile, **extractor_options)
+    backend_class = CdpCaptureBackend if engine == "cdp" else SeleniumBackend
+    return backend_class(extractor, standby=standby)
+
+
+def main():
+    """Run one extraction with a chosen engine and report its throughput"""
+    from pmo_storage import DataStorage
+    from pmo_metrics import StepMetrics
+    from pmo_tracing import Tracer
+    from pmo_commands import CommandBudget
+    from pmo_archive import PageRecorder
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="PMO extraction on a selectable engine")
+    parser.add_argument('--engine', choices=['selenium', 'cdp', 'http'], default='selenium')
+    parser.add_argument('--year', type=int, default=datetime.now().year)
+    parser.add_argument('--month', type=int, default=datetime.now().month)
+    parser.add_argument('--regionals', default='E', help="Comma-separated letters or ALL")
+    parser.add_argument('--extract-type', choices=['all', 'financial', 'scores'], default='all')
+    parser.add_argument('--formats', default='csv', help="Comma-separated: csv,json,sqlite,text, or all")
+    parser.add_argument('--headless', action='store_true')
+    parser.add_argument('--lean', action='store_true', help="Lean Chrome profile (selenium/cdp engines)")
+    parser.add_argument('--pacing', choices=['fast', 'normal', 'safe'], default=None)
+    parser.add_argument('--standby', action='store_true', default=None,
+                        help="Keep a logged-in spare browser for failover (selenium/cdp engines)")
+    parser.add_argument('--recycle-every', type=int, default=None, help="Restart the browser every N stores")
+    parser.add_argument('--recycle-heap-mb', type=float, default=None,
+                        help="Restart the browser once the page's JS heap exceeds this many MB")
+    parser.add_argument('--metrics', default=os.getenv('PMO_METRICS'),
+                        help="Write per-step timings to <prefix>.json and <prefix>.prom")
+    parser.add_argument('--trace', default=os.getenv('PMO_TRACE'),
+                        help="Write a Chrome trace_event JSON (open in Perfetto) to this file")
+    parser.add_argument('--command-budget', type=int, default=None,
+                        help="Count WebDriver commands per store and fail the run above this many (0: count only)")
+    parser.add_argument('--record', default=os.getenv('PMO_RECORD'),
+                        help="Append the raw grid of every store to this archive (.jsonl.gz, see pmo_archive.py)")
+    parser.add_argument('--raw-store', default=os.getenv('PMO_RAW_STORE'),
+                        help="Keep every store's raw grid in this content-addressed store (see pmo_rawstore.py)")
+    args = parser.parse_args()
+
+    regionals = ALL_REGIONALS if args.regionals.upper() == 'ALL' else \
+        [r.strip().upper() for r in args.regionals.split(',') if r.strip()]
+
+    backend = create_backend(args.engine, os.getenv('PMO_USERNAME'), os.getenv('PMO_PASSWORD'),
+                             headless=args.headless, performance_profile=args.lean,
+                             pacing_profile=args.pacing, standby=args.standby)
+    storage = DataStorage(f"pmo_{args.engine}_{args.extract_type}_{'_'.join(regionals)}_"
+                          f"{args.year}_{args.month:02d}_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+    recycle_policy = RecyclePolicy(args.recycle_every, args.recycle_heap_mb) \
+        if args.recycle_every or args.recycle_heap_mb else None
+    metrics = StepMetrics(args.metrics) if args.metrics else None
+    if metrics:
+        metrics.instrument(storage)
+    runner = ExtractionRunner(backend, regionals, args.year, args.month, args.extract_type,
+                              on_record=storage.add_store_data, recycle_policy=recycle_policy,
+                              metrics=metrics, tracer=Tracer(args.trace) if args.trace else None,
+                              command_budget=CommandBudget(args.command_budget or None)
+                              if args.command_budget is not None else CommandBudget.from_env(),
+                              recorder=PageRecorder.create(args.record, args.raw_store))
+
+    start_time = time.time()
+    try:
+        runner.run()
+    finally:
+        backend.close()
+        if runner.recorder:
+            runner.recorder.close()
+    elapsed = time.time() - start_time
+
+    storage.save_formats(args.formats.split(','))
+    if metrics:
+        metrics.write()
+    if runner.tracer:
+        runner.tracer.write()
+    stores_per_minute = len(runner.records) / elapsed * 60 if elapsed else 0.0
+    logger.info(f"Engine {args.engine}: {len(runner.records)} stores in {elapsed:.1f}s "
+                f"({stores_per_minute:.2f} stores/min)")
+    if runner.command_budget:
+        runner.command_budget.enforce()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Warm standby browser for instant failover.
+
+While the primary browser extracts, a second Chrome is launched, logged in and
+put on the dashboard with the same period on a background thread. When the
+primary dies, SeleniumBackend promotes the spare instead of spending 30-60s on
+a relaunch and login, and a new spare is prepared behind it.
+
+The spare is a shallow copy of the extractor without its driver and without
+any per-instance method overrides: those are bound to the primary object and
+would send the spare's login and period selection to the primary browser.
+"""
+import copy
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class WarmStandby:
+    def __init__(self, extractor):
+        """
+        Args:
+            extractor: Selenium extractor (PMOFastDataExtractor, ...) whose driver the spare replaces
+        """
+        self.extractor = extractor
+        self._thread = None
+        self._spare = None
+        self._error = None
+        self.promotions = 0
+
+    def start(self):
+        """Begin preparing a spare in the background, unless one is ready or on its way"""
+        if self._spare is not None or (self._thread and self._thread.is_alive()):
+            return
+        self._error = None
+        self._thread = threading.Thread(target=self._prepare, name="pmo-standby", daemon=True)
+        self._thread.start()
+
+    def spawn(self):
+        """Copy of the extractor sharing credentials, period and pacer, with no driver of its own yet"""
+        shadow = copy.copy(self.extractor)
+        for name, value in list(vars(shadow).items()):
+            # Instance-level wrappers (bound methods of the primary) fall back to the class methods
+            if callable(value) and callable(getattr(type(shadow), name, None)):
+                delattr(shadow, name)
+        shadow.driver = None
+        shadow.wait = None
+        return shadow
+
+    def _prepare(self):
+        shadow = self.spawn()
+        try:
+            shadow.setup_driver(**getattr(self.extractor, 'driver_settings', {}))
+            shadow.login()
+            shadow.navigate_to_dashboard()
+            shadow.select_year_and_month()
+            self._spare = shadow
+            logger.info("✓ Standby browser logged in and waiting")
+        except Exception as e:
+            self._error = e
+            logger.warning(f"Standby browser could not be prepared: {e}")
+            if shadow.driver:
+                try:
+                    shadow.driver.quit()
+                except Exception:
+                    pass
+
+    @property
+    def ready(self):
+        return self._spare is not None
+
+    def promote(self, timeout=120):
+        """
+        Swap the spare's driver into the extractor and start a new spare.
+        Returns False when no spare could be made ready within timeout.
+        """
+        if self._thread:
+            self._thread.join(timeout)
+        spare = self._spare
+        if spare is None:
+            logger.warning(f"No standby browser to promote ({self._error or 'still starting'})")
+            return False
+
+        old_driver = self.extractor.driver
+        self.extractor.driver = spare.driver
+        self.extractor.wait = spare.wait
+        self._spare = None
+        self.promotions += 1
+        logger.info("✓ Standby browser promoted to primary")
+
+        try:
+            old_driver.quit()
+        except Exception:
+            pass
+        self.start()
+        return True
+
+    def close(self):
+        if self._thread:
+            self._thread.join(60)
+        if self._spare:
+            try:
+                self._spare.driver.quit()
+            except Exception:
+                pass
+            self._spare = None
@@ -0,0 +1,293 @@
+"""Multi-format result storage shared by every extractor"""
+import json
+import sqlite3
+import logging
+from datetime import datetime
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+class DataStorage:
+    """Class to handle multiple storage formats"""
+    
+    def __init__(self, base_filename=None, value_label="YTD Achievement"):
+        self.base_filename = base_filename or f"pmo_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        self.value_label = value_label  # "YTD Target" for the target scorecard
+        self.all_data = []
+        
+    def add_store_data(self, store_data):
+        """Add store data to storage"""
+        self.all_data.append(store_data)
+    
+    def save_to_csv(self, data=None):
+        """Save data to CSV file"""
+        data_to_save = data if data is not None else self.all_data
+        
+        if not data_to_save:
+            logger.warning("No data to save to CSV")
+            return None
+        
+        filename = f"{self.base_filename}.csv"
+        try:
+            df = pd.DataFrame(data_to_save)
+            df.to_csv(filename, index=False, encoding='utf-8-sig')
+            logger.info(f"✓ Data saved to CSV: {filename}")
+            logger.info(f"  Total records: {len(data_to_save)}")
+            return filename
+        except Exception as e:
+            logger.error(f"Error saving to CSV: {e}")
+            return None
+    
+    def save_to_json(self, data=None):
+        """Save data to JSON file with structured format"""
+        data_to_save = data if data is not None else self.all_data
+        
+        if not data_to_save:
+            logger.warning("No data to save to JSON")
+            return None
+        
+        filename = f"{self.base_filename}.json"
+        try:
+            # Create structured JSON format
+            json_data = {
+                "metadata": {
+                    "extraction_date": datetime.now().isoformat(),
+                    "total_stores": len(data_to_save),
+                    "data_format": "structured"
+                },
+                "stores": data_to_save
+            }
+            
+            with open(filename, 'w', encoding='utf-8') as f:
+                json.dump(json_data, f, ensure_ascii=False, indent=2)
+            
+            logger.info(f"✓ Data saved to JSON: {filename}")
+            return filename
+        except Exception as e:
+            logger.error(f"Error saving to JSON: {e}")
+            return None
+    
+    def save_to_sqlite(self, data=None):
+        """Save data to SQLite database"""
+        data_to_save = data if data is not None else self.all_data
+        
+        if not data_to_save:
+            logger.warning("No data to save to SQLite")
+            return None
+        
+        filename = f"{self.base_filename}.db"
+        try:
+            conn = sqlite3.connect(filename)
+            cursor = conn.cursor()
+            
+            # Create table for store information
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS stores (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    regional TEXT,
+                    store_name TEXT,
+                    year INTEGER,
+                    month INTEGER,
+                    extraction_type TEXT,
+                    extraction_datetime TEXT,
+                    error_message TEXT
+                )
+            ''')
+            
+            # Create table for scores
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS scores (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    store_id INTEGER,
+                    score_type TEXT,
+                    score_value REAL,
+                    FOREIGN KEY (store_id) REFERENCES stores (id)
+                )
+            ''')
+            
+            # Create table for KPIs
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS kpis (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    store_id INTEGER,
+                    kpi_number TEXT,
+                    kpi_name TEXT,
+                    kpi_value REAL,
+                    achievement_value TEXT,
+                    FOREIGN KEY (store_id) REFERENCES stores (id)
+                )
+            ''')
+            
+            # Insert data
+            for store_data in data_to_save:
+                # Insert store info
+                cursor.execute('''
+                    INSERT INTO stores (regional, store_name, year, month, extraction_type, 
+                                      extraction_datetime, error_message)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', (
+                    store_data.get('Regional'),
+                    store_data.get('Store'),
+                    store_data.get('Year'),
+                    store_data.get('Month'),
+                    store_data.get('Extraction_Type'),
+                    store_data.get('Extraction_DateTime'),
+                    store_data.get('Error_Message', 'None')
+                ))
+                
+                store_id = cursor.lastrowid
+                
+                # Insert scores
+                score_types = ['Financial', 'Customer', 'Internal_Business_Process', 
+                             'Learning_and_Growth', 'Total']
+                for score_type in score_types:
+                    score_key = f"{score_type}_Score"
+                    if score_key in store_data:
+                        cursor.execute('''
+                            INSERT INTO scores (store_id, score_type, score_value)
+                            VALUES (?, ?, ?)
+                        ''', (store_id, score_type, store_data[score_key]))
+                
+                # Insert KPIs
+                for key, value in store_data.items():
+                    if key.startswith('KPI_') and key.endswith('_Name'):
+                        kpi_num = key.replace('_Name', '').replace('KPI_', '')
+                        kpi_name = value
+                        kpi_value_key = f"KPI_{kpi_num}_Value"
+                        kpi_value = store_data.get(kpi_value_key, 0.0)
+                        
+                        cursor.execute('''
+                            INSERT INTO kpis (store_id, kpi_number, kpi_name, kpi_value)
+                            VALUES (?, ?, ?, ?)
+                        ''', (store_id, kpi_num, kpi_name, kpi_value))
+            
+            conn.commit()
+            conn.close()
+            
+            logger.info(f"✓ Data saved to SQLite database: {filename}")
+            return filename
+        except Exception as e:
+            logger.error(f"Error saving to SQLite: {e}")
+            return None
+    
+    def save_to_text(self, data=None):
+        """Save data to human-readable text file"""
+        data_to_save = data if data is not None else self.all_data
+        
+        if not data_to_save:
+            logger.warning("No data to save to text")
+            return None
+        
+        filename = f"{self.base_filename}_report.txt"
+        try:
+            with open(filename, 'w', encoding='utf-8') as f:
+                f.write("=" * 80 + "\n")
+                f.write("PMO DATA EXTRACTION REPORT\n")
+                f.write("=" * 80 + "\n\n")
+                f.write(f"Extraction Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+                f.write(f"Total Stores: {len(data_to_save)}\n\n")
+                
+                for i, store_data in enumerate(data_to_save, 1):
+                    f.write(f"\n{'='*60}\n")
+                    f.write(f"STORE {i}: {store_data.get('Store', 'Unknown')}\n")
+                    f.write(f"{'='*60}\n")
+                    f.write(f"Regional: {store_data.get('Regional', 'N/A')}\n")
+                    f.write(f"Year: {store_data.get('Year', 'N/A')}\n")
+                    f.write(f"Month: {store_data.get('Month', 'N/A')}\n")
+                    f.write(f"Extraction Type: {store_data.get('Extraction_Type', 'N/A')}\n")
+                    
+                    # Write scores
+                    f.write("\nSCORES:\n")
+                    f.write("-" * 40 + "\n")
+                    score_keys = [k for k in store_data.keys() if k.endswith('_Score')]
+                    for key in sorted(score_keys):
+                        score_name = key.replace('_', ' ').replace('Score', '').strip()
+                        f.write(f"{score_name}: {store_data[key]:.2f}\n")
+                    
+                    # Write KPIs
+                    f.write("\nKPIs:\n")
+                    f.write("-" * 40 + "\n")
+                    
+                    # Group KPIs by their numbers
+                    kpi_numbers = set()
+                    for key in store_data.keys():
+                        if key.startswith('KPI_') and '_Name' in key:
+                            kpi_num = key.split('_')[1]
+                            kpi_numbers.add(kpi_num)
+                    
+                    for kpi_num in sorted(kpi_numbers, key=lambda x: int(x)):
+                        name_key = f"KPI_{kpi_num}_Name"
+                        value_key = f"KPI_{kpi_num}_Value"
+                        
+                        if name_key in store_data and value_key in store_data:
+                            kpi_name = store_data[name_key]
+                            kpi_value = store_data[value_key]
+                            f.write(f"Control {kpi_num}: {kpi_name}\n")
+                            f.write(f"  {self.value_label}: {kpi_value:,.2f}\n")
+                    
+                    # Write extracted KPI count
+                    total_key = 'Total_KPIs_Extracted' if 'Total_KPIs_Extracted' in store_data else 'Financial_KPIs_Extracted'
+                    if total_key in store_data:
+                        f.write(f"\nTotal KPIs Extracted: {store_data[total_key]}\n")
+                    
+                    if store_data.get('Error_Message') not in ['None', None]:
+                        f.write(f"\n⚠️  ERROR: {store_data.get('Error_Message')}\n")
+            
+            logger.info(f"✓ Report saved to text file: {filename}")
+            return filename
+        except Exception as e:
+            logger.error(f"Error saving to text file: {e}")
+            return None
+    
+    def save_all_formats(self):
+        """Save data in all available formats"""
+        if not self.all_data:
+            logger.warning("No data to save")
+            return []
+        
+        saved_files = []
+        
+        # Save to CSV
+        csv_file = self.save_to_csv()
+        if csv_file:
+            saved_files.append(("CSV", csv_file))
+        
+        # Save to JSON
+        json_file = self.save_to_json()
+        if json_file:
+            saved_files.append(("JSON", json_file))
+        
+        # Save to SQLite
+        sqlite_file = self.save_to_sqlite()
+        if sqlite_file:
+            saved_files.append(("SQLite", sqlite_file))
+        
+        # Save to Text
+        text_file = self.save_to_text()
+        if text_file:
+            saved_files.append(("Text Report", text_file))
+        
+        return saved_files
+
+    def save_formats(self, storage_formats):
+        """Save data in the selected formats ("all" for every one), returning [(label, filename)]"""
+        savers = [("csv", "CSV", self.save_to_csv),
+                  ("json", "JSON", self.save_to_json),
+                  ("sqlite", "SQLite Database", self.save_to_sqlite),
+                  ("text", "Text Report", self.save_to_text)]
+
+        known = [fmt for fmt, _, _ in savers]
+        storage_formats = [fmt.strip().lower() for fmt in storage_formats if fmt.strip()]
+        if 'all' in storage_formats:
+            storage_formats = known
+        unknown = [fmt for fmt in storage_formats if fmt not in known]
+        if unknown:
+            logger.warning(f"Ignoring unknown storage format(s): {', '.join(unknown)}")
+
+        saved_files = []
+        for fmt, label, saver in savers:
+            if fmt in storage_formats:
+                filename = saver()
+                if filename:
+                    saved_files.append((label, filename))
+        return saved_files
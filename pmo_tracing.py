@@ -0,0 +1,269 @@
+"""
+Chrome trace_event tracing of extraction runs.
+
+With tracing on, every store becomes one span with child spans for its steps:
+
+    store
+      modal_open     click_view_other_scorecard / close_modal_if_open
+      select_store   select_store_robust
+        tree_lookup  get_stores_by_regional_fresh
+        click        the WebDriver click on the tree node
+        refresh_wait wait_for_data_refresh_improved
+      grid_read      backend.read_grid
+      sink_write     the result row going to storage
+
+Waits are recorded as "sleep" spans and every WebDriver command as a
+"webdriver" span. The stretches in between are our own code: they
+become "python" spans (category cpu) when the thread was mostly on the CPU and
+"io_wait" spans (category other) when it was blocked on something else, such as
+an HTTP request. Each store span also splits its duration into sleep /
+webdriver / python CPU / other.
+
+Every wait of the extraction goes through a Pacer (pmo_pacing.py) or the
+RetryQueue, so the tracer attaches itself to those instead of replacing
+time.sleep for the whole process; sleeps anywhere else show up as io_wait. The
+step spans use pmo_metrics.MethodPatches, and write() removes them and detaches
+from the pacers and retry queues.
+
+The file is Chrome trace_event JSON; open it in https://ui.perfetto.dev or
+chrome://tracing. Enable with PMO_TRACE=<file> for the scripts or --trace <file>
+on the module CLIs.
+"""
+import os
+import json
+import time
+import logging
+import threading
+from functools import wraps
+from contextlib import contextmanager
+
+from pmo_metrics import MethodPatches
+
+logger = logging.getLogger(__name__)
+
+# Method -> span name, per object the runner talks to
+EXTRACTOR_SPANS = {
+    'login': 'login',
+    'navigate_to_dashboard': 'navigate_to_dashboard',
+    'select_year_and_month': 'select_period',
+    'click_view_other_scorecard': 'modal_open',
+    'close_modal_if_open': 'modal_open',
+    'get_stores_by_regional_fresh': 'tree_lookup',
+    'select_store_robust': 'select_store',
+    'wait_for_data_refresh_improved': 'refresh_wait',
+}
+SELENIUM_BACKEND_SPANS = {
+    'read_grid': 'grid_read',
+}
+# Backends without a browser: the postback that selects the store stands in for the click
+BACKEND_SPANS = {
+    'login': 'login',
+    'select_period': 'select_period',
+    'list_stores': 'tree_lookup',
+    'select_store': 'click',
+    'read_grid': 'grid_read',
+}
+RUNNER_SPANS = {
+    'extract_store': 'store',
+    'add_record': 'sink_write',
+}
+
+# WebDriver commands with a step name of their own
+COMMAND_SPANS = {
+    'clickElement': 'click',
+}
+
+# Shorter stretches of our own code are not worth a span of their own
+MIN_SEGMENT_SECONDS = 0.001
+
+
+class Tracer:
+    def __init__(self, path="pmo_trace.json"):
+        """
+        Args:
+            path (str): Output file (Chrome trace_event JSON)
+        """
+        self.path = path
+        self.events = []
+        self.pid = os.getpid()
+        self.origin = time.perf_counter()
+        self._threads = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._sleepers = []
+        self.patches = MethodPatches()
+
+    @classmethod
+    def from_env(cls):
+        """Tracer writing to $PMO_TRACE, or None when it is not set"""
+        path = os.getenv('PMO_TRACE', '').strip()
+        return cls(path) if path else None
+
+    def tid(self):
+        ident = threading.get_ident()
+        with self._lock:
+            if ident not in self._threads:
+                self._threads[ident] = len(self._threads) + 1
+                self.events.append({'name': 'thread_name', 'ph': 'M', 'pid': self.pid,
+                                    'tid': self._threads[ident],
+                                    'args': {'name': threading.current_thread().name}})
+            return self._threads[ident]
+
+    def totals(self):
+        """Sleep and WebDriver seconds spent so far on this thread, and its open span depth"""
+        if not hasattr(self._local, 'sleep'):
+            self._local.sleep = 0.0
+            self._local.webdriver = 0.0
+            self._local.depth = 0
+            self._local.mark = None
+        return self._local
+
+    def segment(self):
+        """Close the stretch of our own code since the last boundary (span edge, sleep, command)"""
+        local = self.totals()
+        now, cpu = time.perf_counter(), time.thread_time()
+        if local.mark is not None and now - local.mark[0] >= MIN_SEGMENT_SECONDS:
+            start, cpu_start = local.mark
+            cpu_ms = round((cpu - cpu_start) * 1000, 2)
+            if cpu - cpu_start >= (now - start) / 2:
+                self.complete('python', 'cpu', start, now - start, {'cpu_ms': cpu_ms})
+            else:
+                self.complete('io_wait', 'other', start, now - start, {'cpu_ms': cpu_ms})
+        local.mark = (now, cpu) if local.depth else None
+
+    def resume(self):
+        """Our own code runs again after a sleep or command"""
+        local = self.totals()
+        local.mark = (time.perf_counter(), time.thread_time()) if local.depth else None
+
+    def complete(self, name, cat, start, duration, args=None):
+        event = {'name': name, 'cat': cat, 'ph': 'X', 'pid': self.pid, 'tid': self.tid(),
+                 'ts': round((start - self.origin) * 1e6, 1), 'dur': round(duration * 1e6, 1)}
+        if args:
+            event['args'] = args
+        with self._lock:
+            self.events.append(event)
+
+    @contextmanager
+    def span(self, name, cat='step', args=None):
+        totals = self.totals()
+        self.segment()
+        totals.depth += 1
+        sleep, webdriver = totals.sleep, totals.webdriver
+        cpu = time.thread_time()
+        start = time.perf_counter()
+        totals.mark = (start, cpu)
+        try:
+            yield
+        finally:
+            self.segment()
+            totals.depth -= 1
+            self.resume()
+            duration = time.perf_counter() - start
+            args = dict(args or {})
+            args['cpu_ms'] = round((time.thread_time() - cpu) * 1000, 2)
+            if cat == 'store':
+                args['sleep_ms'] = round((totals.sleep - sleep) * 1000, 1)
+                args['webdriver_ms'] = round((totals.webdriver - webdriver) * 1000, 1)
+                args['other_ms'] = round(max(0.0, duration * 1000 - args['sleep_ms'] -
+                                             args['webdriver_ms'] - args['cpu_ms']), 1)
+            self.complete(name, cat, start, duration, args)
+
+    def sleep(self, seconds):
+        """time.sleep recorded as a sleep span; called by the attached pacers and retry queues"""
+        self.segment()
+        start = time.perf_counter()
+        try:
+            time.sleep(seconds)
+        finally:
+            duration = time.perf_counter() - start
+            self.totals().sleep += duration
+            self.complete('sleep', 'sleep', start, duration)
+            self.resume()
+
+    def traced(self, name, cat='step'):
+        """Span for MethodPatches.wrap; a store_info argument labels it with the store"""
+        def around(method, args, kwargs):
+            span_args = {}
+            for arg in args:
+                if isinstance(arg, dict) and 'name' in arg:
+                    span_args = {'store': arg['name'], 'regional': arg.get('regional')}
+                    break
+            with self.span(name, cat, span_args):
+                return method(*args, **kwargs)
+        return around
+
+    def instrument(self, obj, spans, cat='step'):
+        for method, name in spans.items():
+            self.patches.wrap(obj, method, self.traced(name, cat))
+
+    def attach_sleeps(self, *owners):
+        """Record the waits of Pacers and RetryQueues (objects with a tracer attribute)"""
+        for owner in owners:
+            if owner is not None and getattr(owner, 'tracer', self) is None:
+                owner.tracer = self
+                with self._lock:
+                    self._sleepers.append(owner)
+
+    def attach_driver(self, driver):
+        """Record every WebDriver command of a driver (elements send theirs through driver.execute)"""
+        execute = getattr(driver, 'execute', None)
+        if not callable(execute) or getattr(execute, '_pmo_traced', False):
+            return
+
+        @wraps(execute)
+        def traced_execute(driver_command, params=None):
+            self.segment()
+            start = time.perf_counter()
+            try:
+                return execute(driver_command, params)
+            finally:
+                duration = time.perf_counter() - start
+                self.totals().webdriver += duration
+                self.complete(COMMAND_SPANS.get(driver_command, driver_command), 'webdriver', start, duration)
+                self.resume()
+        traced_execute._pmo_traced = True
+        driver.execute = traced_execute
+
+    def instrument_runner(self, runner):
+        """Trace an ExtractionRunner's stores, its backend and the extractor and driver behind it"""
+        extractor = getattr(runner.backend, 'extractor', None)
+        if extractor is not None:
+            self.instrument(extractor, EXTRACTOR_SPANS)
+            self.instrument(runner.backend, SELENIUM_BACKEND_SPANS)
+            if getattr(extractor, 'driver', None) is not None:
+                self.attach_driver(extractor.driver)
+        else:
+            self.instrument(runner.backend, BACKEND_SPANS)
+        self.instrument(runner, {'add_record': RUNNER_SPANS['add_record']})
+        self.attach_sleeps(runner.pacer, runner.retry_queue, getattr(extractor, 'pacer', None))
+
+        store_span = self.traced(RUNNER_SPANS['extract_store'], cat='store')
+
+        def store_around(method, args, kwargs):
+            # Recycling and failover replace the driver, so attach before every store
+            current = getattr(method.__self__.backend, 'extractor', None)
+            if current is not None and getattr(current, 'driver', None) is not None:
+                self.attach_driver(current.driver)
+            self.attach_sleeps(getattr(current, 'pacer', None))
+            return store_span(method, args, kwargs)
+        self.patches.wrap(runner, 'extract_store', store_around)
+
+    def write(self):
+        """Stop tracing and write the trace file; returns its path"""
+        self.patches.undo()
+        with self._lock:
+            sleepers, self._sleepers = self._sleepers, []
+        for owner in sleepers:
+            owner.tracer = None
+        try:
+            with self._lock:
+                events = list(self.events)
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+        except Exception as e:
+            logger.error(f"Error writing trace: {e}")
+            return None
+        stores = sum(1 for event in events if event.get('cat') == 'store')
+        logger.info(f"✓ Trace with {len(events)} events ({stores} stores) saved to {self.path}")
+        return self.path
@@ -0,0 +1,31 @@
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+# The modules live at the top of the repository, next to the scripts
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pmo_mock_server import MockPMOServer, MockPMOData, FaultProfile  # noqa: E402
+
+# The mock's year dropdown runs from three years back to next year
+YEAR = datetime.now().year
+MONTH = 6
+
+
+@pytest.fixture
+def mock_pmo():
+    """Factory for a mock PMO server on a free port; every server is stopped after the test"""
+    servers = []
+
+    def start(stores_per_regional=5, regionals=('A',), profile=None):
+        server = MockPMOServer(port=0, data=MockPMOData(stores_per_regional, list(regionals)),
+                               profile=FaultProfile(profile, seed=1) if profile else None)
+        server.start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
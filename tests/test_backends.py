@@ -0,0 +1,97 @@
+from types import SimpleNamespace
+
+import pytest
+
+requests = pytest.importorskip('requests')
+
+from pmo_backends import (HttpBackend, StoreFailure, FAILURE_STALE_NODE, FAILURE_SERVER_ERROR,  # noqa: E402
+                          FAILURE_MODAL_FAILED, FAILURE_DRIVER_LOST)
+from pmo_grid import kpi_label_id  # noqa: E402
+from pmo_mock_server import store_id  # noqa: E402
+from conftest import YEAR, MONTH  # noqa: E402
+
+
+def logged_in(server, **kwargs):
+    backend = HttpBackend('user', 'secret', base_url=server.url, **kwargs)
+    backend.login()
+    backend.select_period(YEAR, MONTH)
+    return backend
+
+
+def revenue(backend):
+    return backend.read_grid()[kpi_label_id(2, f"YTDAchievement{MONTH}")]
+
+
+def test_http_backend_reads_every_store(mock_pmo):
+    server = mock_pmo(stores_per_regional=3)
+    backend = logged_in(server)
+    stores = backend.list_stores('A')
+    assert [store['name'] for store in stores] == ['KG A01 Store', 'KG A02 Store', 'KG A03 Store']
+
+    node_by_name = {name: node_id for node_id, (_, name) in server.data.stores.items()}
+    for store in stores:
+        assert backend.select_store(store)
+        assert revenue(backend) == server.data.value(node_by_name[store['name']], str(YEAR), MONTH, 2)
+    backend.close()
+
+
+STALE = {'stale_grid_rate': 1.0, 'stale_grid_seconds': 60}
+
+
+def test_http_backend_clicks_again_on_the_previous_stores_grid(mock_pmo):
+    server = mock_pmo(profile=STALE)
+    backend = logged_in(server)
+    first, second = backend.list_stores('A')[:2]
+    # The first click answers with a blank grid, the second with the first store's grid
+    assert backend.select_store(first)
+    assert backend.select_store(second)
+    assert revenue(backend) == server.data.value(store_id('A', 2), str(YEAR), MONTH, 2)
+    backend.close()
+
+
+def test_http_backend_tells_which_store_and_period_it_shows(mock_pmo):
+    backend = logged_in(mock_pmo())
+    assert backend.showing() == (None, (YEAR, MONTH))
+    store = backend.list_stores('A')[0]
+    backend.select_store(store)
+    backend.select_period(YEAR, MONTH - 1)
+    assert backend.showing() == (store['name'], (YEAR, MONTH - 1))
+    backend.close()
+
+
+def test_http_backend_rejects_the_previous_stores_grid(mock_pmo):
+    backend = logged_in(mock_pmo(profile=STALE), grid_attempts=1)
+    first, second = backend.list_stores('A')[:2]
+    backend.select_store(first)
+    with pytest.raises(StoreFailure) as failure:
+        backend.select_store(second)
+    assert failure.value.kind == FAILURE_STALE_NODE
+    backend.close()
+
+
+def test_http_backend_classifies_failures(mock_pmo):
+    backend = logged_in(mock_pmo())
+    server_error = requests.HTTPError("500 Error", response=SimpleNamespace(status_code=500))
+    assert backend.classify_failure(server_error) == FAILURE_SERVER_ERROR
+    assert backend.classify_failure(requests.ConnectionError("refused")) == FAILURE_DRIVER_LOST
+    assert backend.classify_failure(StoreFailure(FAILURE_STALE_NODE, "gone")) == FAILURE_STALE_NODE
+    backend.close()
+
+
+def test_http_backend_notices_an_expired_session(mock_pmo):
+    backend = logged_in(mock_pmo())
+    assert not backend.session_expired()
+    # Some timeouts serve the login form under the dashboard URL instead of redirecting
+    backend.html = '<form><input name="txt_UserID" type="text" id="txt_UserID" /></form>'
+    assert backend.session_expired()
+    backend.get(f"{backend.base_url}/Systems/Login.aspx")
+    assert backend.session_expired()
+    backend.close()
+
+
+def test_http_backend_reports_a_modal_that_did_not_open(mock_pmo):
+    backend = logged_in(mock_pmo(profile={'modal_failure_rate': 1.0}))
+    with pytest.raises(StoreFailure) as failure:
+        backend.list_stores('A')
+    assert failure.value.kind == FAILURE_MODAL_FAILED
+    backend.close()
@@ -0,0 +1,74 @@
+import pytest
+
+pytest.importorskip('requests')
+
+from pmo_backends import StoreFailure, FAILURE_EMPTY_GRID, FAILURE_SERVER_ERROR  # noqa: E402
+from pmo_concurrency import ConcurrencyGovernor, is_overload  # noqa: E402
+
+
+def finish_window(governor, seconds, error=None, kind=None):
+    for _ in range(governor.window):
+        governor.observe(seconds, error is None, error, kind)
+
+
+def test_is_overload():
+    assert not is_overload(None)
+    assert is_overload(StoreFailure(FAILURE_EMPTY_GRID, "blank"))
+    assert is_overload(RuntimeError("boom"), FAILURE_SERVER_ERROR)
+    assert is_overload(TimeoutError("read timed out"))
+    assert not is_overload(RuntimeError("element not found"))
+
+
+def test_governor_grows_while_latency_holds():
+    governor = ConcurrencyGovernor(max_active=4, initial=2, window=5)
+    for _ in range(3):
+        finish_window(governor, 10)
+    assert governor.limit == 4
+    assert [entry['limit'] for entry in governor.history] == [3, 4, 4]
+
+
+def test_governor_cuts_on_overload():
+    governor = ConcurrencyGovernor(max_active=8, initial=8, window=5)
+    finish_window(governor, 10, StoreFailure(FAILURE_EMPTY_GRID, "blank"), FAILURE_EMPTY_GRID)
+    assert governor.limit == 4
+    finish_window(governor, 10, TimeoutError("read timed out"))
+    assert governor.limit == 2
+    assert governor.overloads == 0
+
+
+def test_governor_cuts_when_latency_far_exceeds_the_baseline():
+    governor = ConcurrencyGovernor(max_active=8, initial=6, window=5)
+    finish_window(governor, 10)
+    finish_window(governor, 40)
+    assert governor.limit == 3
+
+
+def test_governor_baseline_rises_after_a_lasting_slowdown():
+    governor = ConcurrencyGovernor(max_active=8, initial=4, window=5, baseline_windows=3)
+    finish_window(governor, 10)
+    for _ in range(3):
+        finish_window(governor, 40)
+    assert governor.baseline_p95 == 40
+    limit = governor.limit
+    finish_window(governor, 40)
+    assert governor.limit == limit + 1
+
+
+def test_governor_never_leaves_its_bounds():
+    governor = ConcurrencyGovernor(max_active=3, initial=2, min_active=1, window=2)
+    for _ in range(5):
+        finish_window(governor, 10, StoreFailure(FAILURE_EMPTY_GRID, "blank"))
+    assert governor.limit == 1
+    governor.resize(1)
+    for _ in range(5):
+        finish_window(governor, 10)
+    assert governor.limit == 1
+
+
+def test_a_retired_worker_frees_its_slot():
+    governor = ConcurrencyGovernor(max_active=3, initial=1, window=5)
+    assert governor.slot(1) == 1
+    governor.retire(0)
+    assert governor.slot(1) == 0 and governor.slot(2) == 1
+    assert governor.wait_turn(1)
+    assert governor.max_active == 2
@@ -0,0 +1,70 @@
+from pmo_grid import (STORE_NAME_ID, kpi_label_id, parse_label_texts, grid_texts, parse_tree_stores,
+                      parse_form_fields, shown_store_name, build_store_record, build_error_record)
+
+STORE = {'name': 'KG A01 Store', 'regional': 'A'}
+
+
+def grid_html(revenue="1,234.50", store="KG A01 Store"):
+    return (f'<h3 id="{STORE_NAME_ID}">{store}</h3>'
+            f'<table><tr><td><span id="{kpi_label_id(2, "KPI")}">Revenue</span></td>'
+            f'<td><span id="{kpi_label_id(2, "YTDAchievement6")}"> {revenue} </span></td></tr>'
+            f'<tr><td><span id="{kpi_label_id(3, "KPI")}">COGS</span></td>'
+            f'<td><span id="{kpi_label_id(3, "YTDAchievement6")}"><b>98.10</b></span></td></tr></table>'
+            '<span id="ctl00_ContentPlaceHolder1_lblAchievementYTD_Total">3.75</span>')
+
+
+def test_parse_label_texts_reads_nested_labels():
+    texts = parse_label_texts(grid_html())
+    assert texts[kpi_label_id(2, "YTDAchievement6")] == "1,234.50"
+    assert texts[kpi_label_id(3, "YTDAchievement6")] == "98.10"
+    assert texts["ctl00_ContentPlaceHolder1_lblAchievementYTD_Total"] == "3.75"
+    assert STORE_NAME_ID not in texts
+
+
+def test_grid_texts_reads_update_panel_delta():
+    panel = grid_html()
+    delta = f"{len(panel)}|updatePanel|ctl00_ContentPlaceHolder1_upScorecard|{panel}|3|hiddenField|__VIEWSTATE|abc|"
+    assert grid_texts(delta) == parse_label_texts(panel)
+
+
+def test_shown_store_name():
+    assert shown_store_name(grid_html(store="KG A02 Store &amp; Cafe")) == "KG A02 Store & Cafe"
+    assert shown_store_name("<div>no heading</div>") is None
+    assert shown_store_name(None) is None
+
+
+def test_parse_tree_stores_skips_regional_and_closed_stores():
+    html = ('<div id="ctl00_ContentPlaceHolder1_OrganizationTreeView1_tvHierarchyn1Nodes">'
+            '<a class="NodeStyle" href="javascript:__doPostBack(\'tree\',\'sA\\\\RMA\')">RM - Regional A</a>'
+            '<a class="NodeStyle" href="javascript:__doPostBack(\'tree\',\'sA\\\\A01\')">KG A01 Store</a>'
+            '<a class="NodeStyle" href="javascript:__doPostBack(\'tree\',\'sA\\\\A99\')">KG A99 Store (Tutup)</a>'
+            '</div>')
+    stores = parse_tree_stores(html, 'A', {'A': 'ctl00_ContentPlaceHolder1_OrganizationTreeView1_tvHierarchyn1Nodes'})
+    assert [store['name'] for store in stores] == ['KG A01 Store']
+    assert stores[0]['regional'] == 'A'
+    assert stores[0]['postback'][0] == 'tree'
+
+
+def test_parse_form_fields_maps_ids_and_options():
+    html = ('<form><input type="hidden" name="__VIEWSTATE" id="__VIEWSTATE" value="vs" />'
+            '<select name="ctl00$ddlMonth" id="ctl00_ddlMonth">'
+            '<option value="1">January</option><option selected="selected" value="6">June</option></select></form>')
+    fields, id_to_name, options = parse_form_fields(html)
+    assert fields['__VIEWSTATE'] == 'vs'
+    assert fields['ctl00$ddlMonth'] == '6'
+    assert id_to_name['ctl00_ddlMonth'] == 'ctl00$ddlMonth'
+    assert options['ctl00$ddlMonth'] == {'January': '1', 'June': '6'}
+
+
+def test_build_store_record_financial():
+    record = build_store_record(parse_label_texts(grid_html()), STORE, '2025', 6, 'financial')
+    assert record['Store'] == 'KG A01 Store'
+    assert record['Financial_Revenue_ACH'] == 1234.5
+    assert record['Financial_KPIs_Extracted'] >= 1
+
+
+def test_build_error_record_keeps_legacy_placeholders():
+    record = build_error_record(STORE, '2025', 6, 'legacy_financial', 'boom')
+    assert record['OP_Position'] == 'N/A'
+    assert record['EBITDA_Position'] == 'N/A'
+    assert record['Error_Message'] == 'boom'
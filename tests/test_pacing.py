@@ -0,0 +1,35 @@
+from pmo_pacing import Pacer, percentile
+
+
+def test_percentile_is_nearest_rank():
+    assert percentile(range(10), 50) == 4
+    assert percentile(range(20), 95) == 18
+    assert percentile(range(10), 91) == 9
+    assert percentile([3.0], 99) == 3.0
+    assert percentile(range(10), 0) == 0
+
+
+def test_delay_uses_the_default_until_enough_samples():
+    pacer = Pacer('normal')
+    for _ in range(4):
+        pacer.observe('grid', 0.8)
+    assert pacer.delay('grid', 3) == 3
+    pacer.observe('grid', 0.8)
+    assert abs(pacer.delay('grid', 3) - 0.96) < 1e-9
+
+
+def test_delay_stays_between_the_floor_and_the_default():
+    pacer = Pacer('normal')
+    for _ in range(5):
+        pacer.observe('fast', 0.01)
+        pacer.observe('slow', 10)
+    assert pacer.delay('fast', 3) == 0.5
+    assert pacer.delay('slow', 3) == 3
+
+
+def test_errors_stretch_every_wait():
+    pacer = Pacer('normal')
+    for success in [True, False] * 5:
+        pacer.record_result(success)
+    assert pacer.backoff == 3.0
+    assert pacer.delay('grid', 2) == 6.0
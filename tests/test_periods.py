@@ -0,0 +1,40 @@
+import pytest
+
+pytest.importorskip('requests')
+
+from pmo_periods import parse_periods, period_change_cost, sequence_cost, plan_cost, choose_order  # noqa: E402
+
+
+def test_parse_periods_expands_ranges_across_years():
+    assert parse_periods('2024-11..2025-02, 2024-05') == [(2024, 5), (2024, 11), (2024, 12), (2025, 1), (2025, 2)]
+
+
+def test_parse_periods_drops_duplicates_and_empty_parts():
+    assert parse_periods('2025-03,,2025-03..2025-04,') == [(2025, 3), (2025, 4)]
+
+
+def test_period_change_cost():
+    assert period_change_cost((2025, 3), (2025, 3)) == 0
+    assert period_change_cost((2025, 3), (2025, 4)) == 1
+    assert period_change_cost((2024, 12), (2025, 1)) == 2
+    assert sequence_cost([(2024, 12), (2025, 1), (2025, 2)]) == 3
+
+
+def test_plan_cost_of_each_order():
+    periods = [(2025, 1), (2025, 2)]
+    # One period change, then the modal and every store again for each period
+    assert plan_cost('period-major', periods, 2, 10) == 1 + 2 * (2 * 1 + 10 * 2)
+    # The modal once per regional, every store once plus a period change per store
+    assert plan_cost('store-major', periods, 2, 10) == 2 * 1 + 10 * (2 + 1)
+
+
+def test_choose_order_prefers_store_major_for_a_few_periods_of_many_stores():
+    order, costs = choose_order([(2025, 1), (2025, 2)], 7, 300)
+    assert order == 'store-major'
+    assert costs['store-major'] < costs['period-major']
+
+
+def test_choose_order_keeps_period_major_for_a_single_period():
+    order, costs = choose_order([(2025, 6)], 7, 300)
+    assert order == 'period-major'
+    assert costs['period-major'] == costs['store-major']
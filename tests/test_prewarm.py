@@ -0,0 +1,68 @@
+import time
+import threading
+from types import SimpleNamespace
+
+from pmo_prewarm import Prewarm
+
+
+class FakeExtractor:
+    """Stands in for PMOFastDataExtractor; logs in once `gate` is set"""
+    gate = None
+    fail = False
+
+    def __init__(self, username, password, headless=False, performance_profile=False):
+        self.driver = SimpleNamespace(quit=self.quit)
+        self.quit_calls = 0
+        self.configured = None
+        self.headless = headless
+
+    def quit(self):
+        self.quit_calls += 1
+
+    def prepare_session(self):
+        if self.gate:
+            self.gate.wait(5)
+        if self.fail:
+            raise RuntimeError("login failed")
+
+    def configure(self, *answers):
+        self.configured = answers
+
+
+def extractor_class(gate=None, fail=False):
+    return type('Extractor', (FakeExtractor,), {'gate': gate, 'fail': fail})
+
+
+def test_from_env_needs_both_credentials(monkeypatch):
+    monkeypatch.delenv('PMO_PASSWORD', raising=False)
+    monkeypatch.setenv('PMO_USERNAME', 'user')
+    assert Prewarm.from_env(FakeExtractor) is None
+    monkeypatch.setenv('PMO_PASSWORD', 'secret')
+    monkeypatch.setenv('PMO_HEADLESS', 'yes')
+    prewarm = Prewarm.from_env(FakeExtractor)
+    assert prewarm.headless and not prewarm.performance_profile
+    prewarm.take(2025, 6, ['A'], 'all', ['csv'])
+
+
+def test_take_configures_the_logged_in_extractor():
+    extractor = Prewarm(extractor_class(), 'user', 'secret').take(2025, 6, ['A'], 'all', ['csv'])
+    assert extractor.configured == (2025, 6, ['A'], 'all', ['csv'])
+    assert extractor.quit_calls == 0
+
+
+def test_take_returns_none_after_a_failed_login():
+    prewarm = Prewarm(extractor_class(fail=True), 'user', 'secret')
+    assert prewarm.take(2025, 6, ['A'], 'all', ['csv']) is None
+
+
+def test_discard_quits_the_browser_once_the_login_finishes():
+    gate = threading.Event()
+    prewarm = Prewarm(extractor_class(gate=gate), 'user', 'secret')
+    prewarm.discard()
+    gate.set()
+    extractor = prewarm.future.result(5)
+    # Done callbacks may run just after result() returns
+    deadline = time.time() + 5
+    while not extractor.quit_calls and time.time() < deadline:
+        time.sleep(0.01)
+    assert extractor.quit_calls == 1
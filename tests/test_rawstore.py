@@ -0,0 +1,62 @@
+import gzip
+
+import pytest
+
+pytest.importorskip('requests')
+
+import pmo_rawstore  # noqa: E402
+from pmo_rawstore import canonical_page, content_hash, RawPageStore  # noqa: E402
+
+DELTA = ('{panel_length}|updatePanel|ctl00_ContentPlaceHolder1_upScorecard|{panel}|'
+         '{state_length}|hiddenField|__VIEWSTATE|{state}|')
+
+
+def delta(panel, state):
+    return DELTA.format(panel_length=len(panel), panel=panel, state_length=len(state), state=state)
+
+
+def test_canonical_page_blanks_the_session_state_of_a_delta():
+    first = canonical_page(delta('<span>1,234.50</span>', 'session-one'))
+    assert first == canonical_page(delta('<span>1,234.50</span>', 'another-session'))
+    assert 'session-one' not in first
+    assert first != canonical_page(delta('<span>9.99</span>', 'session-one'))
+
+
+def test_canonical_page_blanks_state_inputs_of_a_full_page():
+    page = '<input type="hidden" name="__VIEWSTATE" id="__VIEWSTATE" value="{}" /><span>1</span>'
+    assert canonical_page(page.format('abc')) == canonical_page(page.format('xyz')) == page.format('')
+
+
+def test_put_stores_each_page_once(tmp_path):
+    store = RawPageStore(root=str(tmp_path))
+    sha256 = store.put('<span>1,234.50</span>')
+    assert store.put('<span>1,234.50</span>') == sha256 == content_hash('<span>1,234.50</span>')
+    assert (store.stored, store.duplicates) == (1, 1)
+    assert store.get(sha256) == '<span>1,234.50</span>'
+
+
+def test_put_falls_back_to_gzip_without_zstandard(tmp_path, monkeypatch):
+    monkeypatch.setattr(pmo_rawstore, 'zstandard', None)
+    store = RawPageStore(root=str(tmp_path))
+    sha256 = store.put('<span>98.10</span>')
+    assert store.find_object(sha256).endswith('.gz')
+    with open(store.find_object(sha256), 'rb') as f:
+        assert gzip.decompress(f.read()) == b'<span>98.10</span>'
+    assert store.get(sha256) == '<span>98.10</span>'
+
+
+def test_get_of_an_unknown_hash_raises(tmp_path):
+    with pytest.raises(KeyError):
+        RawPageStore(root=str(tmp_path)).get('0' * 64)
+
+
+def test_add_indexes_pages_by_period(tmp_path):
+    store = RawPageStore(root=str(tmp_path))
+    for state in ('session-one', 'session-two'):
+        store.add({'raw': delta('<span>1</span>', state), 'year': 2025, 'month': 6,
+                   'store': 'KG A01 Store', 'regional': 'A'})
+    entries = store.entries('2025-06')
+    assert store.periods() == ['2025-06']
+    assert len(entries) == 2 and entries[0]['sha256'] == entries[1]['sha256']
+    assert 'raw' not in entries[0]
+    assert store.stats()['objects'] == 1
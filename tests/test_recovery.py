@@ -0,0 +1,96 @@
+from types import SimpleNamespace
+
+import pytest
+
+requests = pytest.importorskip('requests')
+
+from pmo_backends import (ExtractionBackend, StoreFailure, FAILURE_STALE_NODE, FAILURE_EMPTY_GRID,  # noqa: E402
+                          FAILURE_DRIVER_LOST, FAILURE_SERVER_ERROR)
+from pmo_recovery import RecoveryManager  # noqa: E402
+
+
+class FakeBackend(ExtractionBackend):
+    """Records every recovery call; actions named in `broken` raise"""
+
+    def __init__(self, broken=(), expired=False):
+        self.broken = set(broken)
+        self.expired = expired
+        self.calls = []
+
+    def act(self, action):
+        self.calls.append(action)
+        if action in self.broken:
+            raise RuntimeError(f"{action} failed")
+
+    def relocate_node(self):
+        self.act('relocate_node')
+
+    def reset_modal(self):
+        self.act('reopen_modal')
+
+    def recycle(self):
+        self.act('recycle')
+
+    def session_expired(self):
+        return self.expired
+
+
+def manager_for(backend, login_failures=0):
+    logins = []
+
+    def start_session():
+        logins.append(len(logins))
+        if len(logins) <= login_failures:
+            raise requests.HTTPError("500 Error", response=SimpleNamespace(status_code=500))
+
+    return RecoveryManager(backend, start_session), logins
+
+
+def test_recover_runs_the_cheapest_action_for_the_kind():
+    backend = FakeBackend()
+    manager, logins = manager_for(backend)
+    assert manager.recover(StoreFailure(FAILURE_STALE_NODE, "node gone"))
+    assert manager.recover(StoreFailure(FAILURE_EMPTY_GRID, "blank"))
+    assert backend.calls == ['relocate_node', 'reopen_modal']
+    assert not logins
+    assert manager.failures[FAILURE_STALE_NODE] == 1 and manager.failures[FAILURE_EMPTY_GRID] == 1
+
+
+def test_recover_escalates_while_actions_fail():
+    backend = FakeBackend(broken={'relocate_node', 'reopen_modal'})
+    manager, logins = manager_for(backend)
+    assert manager.recover(StoreFailure(FAILURE_STALE_NODE, "node gone"))
+    assert backend.calls == ['relocate_node', 'reopen_modal']
+    assert len(logins) == 1
+    assert manager.recoveries == {'relogin': 1}
+
+
+def test_recover_gives_up_when_every_action_fails():
+    backend = FakeBackend(broken={'recycle'})
+    manager, _ = manager_for(backend)
+    assert not manager.recover(StoreFailure(FAILURE_DRIVER_LOST, "browser crashed"))
+    assert backend.calls == ['recycle']
+    assert manager.last_kind == FAILURE_DRIVER_LOST
+
+
+def test_recover_classifies_server_errors():
+    manager, _ = manager_for(FakeBackend())
+    manager.recover(requests.HTTPError("503 Error", response=SimpleNamespace(status_code=503)))
+    assert manager.last_kind == FAILURE_SERVER_ERROR
+
+
+def test_ensure_session_logs_in_again_when_expired():
+    manager, logins = manager_for(FakeBackend(expired=True))
+    assert manager.ensure_session()
+    assert len(logins) == 1
+    assert manager.recoveries == {'relogin': 1}
+
+
+def test_establish_retries_with_growing_pauses(monkeypatch):
+    pauses = []
+    monkeypatch.setattr('pmo_recovery.time.sleep', pauses.append)
+    manager, logins = manager_for(FakeBackend(), login_failures=2)
+    manager.establish(attempts=5, backoff=2.0)
+    assert len(logins) == 3
+    assert pauses == [2.0, 4.0]
+    assert manager.recoveries['restart_session'] == 1
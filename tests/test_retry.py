@@ -0,0 +1,40 @@
+from pmo_retry import RetryQueue
+
+STORE = {'name': 'KG A01 Store', 'regional': 'A'}
+
+
+def test_backoff_doubles_up_to_the_ceiling():
+    queue = RetryQueue(base_delay=5, max_delay=30, jitter=0)
+    assert [queue.backoff(attempt) for attempt in range(1, 5)] == [5, 10, 20, 30]
+
+
+def test_backoff_jitter_stays_within_the_fraction():
+    queue = RetryQueue(base_delay=10, jitter=0.5)
+    assert all(5 <= queue.backoff(1) <= 15 for _ in range(50))
+
+
+def test_push_refuses_a_store_out_of_attempts():
+    queue = RetryQueue(max_attempts=3, base_delay=0, jitter=0)
+    assert queue.push(STORE, "empty grid", attempt=1)
+    assert queue.push(STORE, "empty grid", attempt=2)
+    assert not queue.push(STORE, "empty grid", attempt=3)
+    assert len(queue) == 2
+
+
+def test_pop_due_returns_the_earliest_retry_with_its_attempt():
+    queue = RetryQueue(base_delay=0, jitter=0, fresh_session_after=2)
+    queue.push(STORE, "empty grid", attempt=1)
+    queue.push({'name': 'KG A02 Store', 'regional': 'A'}, "stale node", attempt=2)
+    first, second = queue.pop_due(), queue.pop_due()
+    assert (first['store'], first['attempt'], first['fresh_session']) == (STORE, 2, False)
+    assert (second['error'], second['attempt'], second['fresh_session']) == ("stale node", 3, True)
+    assert len(queue) == 0
+
+
+def test_pop_due_waits_for_the_backoff(monkeypatch):
+    waits = []
+    monkeypatch.setattr('pmo_retry.time.sleep', waits.append)
+    queue = RetryQueue(base_delay=30, jitter=0)
+    queue.push(STORE, "empty grid")
+    queue.pop_due()
+    assert len(waits) == 1 and 29 < waits[0] <= 30
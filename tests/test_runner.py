@@ -0,0 +1,126 @@
+from types import SimpleNamespace
+
+import pytest
+
+requests = pytest.importorskip('requests')
+
+from pmo_backends import ExtractionBackend, StoreFailure, FAILURE_EMPTY_GRID  # noqa: E402
+from pmo_grid import kpi_label_id  # noqa: E402
+from pmo_retry import RetryQueue  # noqa: E402
+from pmo_runner import ExtractionRunner, create_backend  # noqa: E402
+from conftest import YEAR, MONTH  # noqa: E402
+
+
+class FakeBackend(ExtractionBackend):
+    """In-memory PMO: every store's revenue is its number; failures are scripted per store"""
+
+    def __init__(self, stores, select_failures=None, login_failures=0):
+        self.stores = stores
+        self.select_failures = dict(select_failures or {})
+        self.login_failures = login_failures
+        self.logins = 0
+        self.current = None
+
+    def login(self):
+        self.logins += 1
+        if self.login_failures:
+            self.login_failures -= 1
+            raise requests.HTTPError("500 Error", response=SimpleNamespace(status_code=500))
+
+    def select_period(self, year, month):
+        self.period = (year, month)
+
+    def list_stores(self, regional_letter):
+        return [{'name': name, 'regional': regional_letter} for name in self.stores]
+
+    def select_store(self, store_info, max_attempts=None):
+        if self.select_failures.get(store_info['name']):
+            self.select_failures[store_info['name']] -= 1
+            raise StoreFailure(FAILURE_EMPTY_GRID, "grid never filled")
+        self.current = store_info['name']
+        return True
+
+    def read_grid(self):
+        return {kpi_label_id(2, "KPI"): "Revenue",
+                kpi_label_id(2, f"YTDAchievement{MONTH}"): str(self.stores.index(self.current) + 1)}
+
+    def recycle(self):
+        pass
+
+
+def failed(record):
+    # Successful rows carry the string 'None'
+    return record.get('Error_Message') not in (None, '', 'None')
+
+
+def runner_for(backend, **kwargs):
+    return ExtractionRunner(backend, ['A'], YEAR, MONTH, 'financial',
+                            retry_queue=RetryQueue(base_delay=0, jitter=0), **kwargs)
+
+
+def test_runner_extracts_every_store_over_http(mock_pmo):
+    server = mock_pmo(stores_per_regional=4)
+    runner = ExtractionRunner(create_backend('http', 'user', 'secret', base_url=server.url),
+                              ['A'], YEAR, MONTH, 'financial')
+    records = runner.run()
+    assert [record['Store'] for record in records] == [f'KG A0{i} Store' for i in range(1, 5)]
+    assert not any(failed(record) for record in records)
+
+
+def test_runner_defers_a_failing_store_and_retries_it():
+    backend = FakeBackend(['one', 'two', 'three'], select_failures={'two': 2})
+    runner = runner_for(backend)
+    records = runner.run()
+    assert sorted(record['Store'] for record in records) == ['one', 'three', 'two']
+    assert {record['Store']: record['Financial_Revenue_ACH'] for record in records}['two'] == 2.0
+    assert runner.recovery.failures[FAILURE_EMPTY_GRID] == 2
+
+
+def test_runner_records_an_error_row_after_the_last_attempt():
+    backend = FakeBackend(['one', 'two'], select_failures={'two': 99})
+    runner = runner_for(backend)
+    records = {record['Store']: record for record in runner.run()}
+    assert records['two']['Error_Message'] == 'grid never filled'
+    assert not failed(records['one'])
+
+
+def test_fresh_session_retries_log_in_through_recovery():
+    backend = FakeBackend(['one', 'two'], select_failures={'two': 3})
+    runner = ExtractionRunner(backend, ['A'], YEAR, MONTH, 'financial',
+                              retry_queue=RetryQueue(base_delay=0, jitter=0, fresh_session_after=1))
+    logins = []
+    start_session = runner.recovery.start_session
+    # A pooled worker replaces this with CredentialPool.login
+    runner.recovery.start_session = lambda: logins.append(start_session())
+    runner.run()
+    assert len(logins) == backend.logins
+
+
+def test_runner_retries_a_failed_login(monkeypatch):
+    monkeypatch.setattr('pmo_recovery.time.sleep', lambda seconds: None)
+    backend = FakeBackend(['one'], login_failures=2)
+    records = runner_for(backend).run()
+    assert backend.logins == 3
+    assert [record['Store'] for record in records] == ['one']
+
+
+def test_runner_gives_up_after_bounded_login_attempts(monkeypatch):
+    monkeypatch.setattr('pmo_recovery.time.sleep', lambda seconds: None)
+    backend = FakeBackend(['one'], login_failures=99)
+    with pytest.raises(requests.HTTPError):
+        runner_for(backend).run()
+    assert backend.logins == 5
+
+
+def test_runner_from_env_writes_the_requested_metrics_and_trace(tmp_path, monkeypatch):
+    monkeypatch.setenv('PMO_METRICS', str(tmp_path / 'metrics'))
+    monkeypatch.setenv('PMO_TRACE', str(tmp_path / 'trace.json'))
+    records = []
+    runner = ExtractionRunner.from_env(FakeBackend(['one', 'two']), ['A'], YEAR, MONTH, 'financial',
+                                       on_record=records.append,
+                                       retry_queue=RetryQueue(base_delay=0, jitter=0))
+    assert runner.metrics and runner.tracer and not runner.command_budget and not runner.recorder
+    runner.run()
+    runner.finish()
+    assert [record['Store'] for record in records] == ['one', 'two']
+    assert (tmp_path / 'metrics.json').exists() and (tmp_path / 'trace.json').exists()
@@ -0,0 +1,90 @@
+import pytest
+
+pytest.importorskip('requests')
+
+from pmo_parallel import WorkStealingScheduler, LatencyHistory, ParallelRunner  # noqa: E402
+from pmo_runner import ExtractionRunner  # noqa: E402
+from test_runner import FakeBackend, failed  # noqa: E402
+from conftest import YEAR, MONTH  # noqa: E402
+
+
+def stores(*seconds):
+    return [{'name': f'KG A0{i} Store', 'regional': 'A', 'seconds': s} for i, s in enumerate(seconds, 1)]
+
+
+def history_for(store_list):
+    history = LatencyHistory(path=None)
+    history.latencies = {history.key(store): store['seconds'] for store in store_list}
+    return history
+
+
+def test_deal_assigns_longest_stores_first_to_the_least_loaded_worker():
+    store_list = stores(10, 40, 20, 30)
+    scheduler = WorkStealingScheduler(2, history_for(store_list))
+    scheduler.deal(store_list)
+    assert [[store['seconds'] for store in queue] for queue in scheduler.deques] == [[40, 10], [30, 20]]
+    assert scheduler.expected == [50, 50]
+
+
+def test_an_idle_worker_steals_from_the_back_of_the_busiest_deque():
+    store_list = stores(10, 40, 20, 30, 5)
+    scheduler = WorkStealingScheduler(2, history_for(store_list))
+    scheduler.deal(store_list)
+    assert [[store['seconds'] for store in queue] for queue in scheduler.deques] == [[40, 10, 5], [30, 20]]
+    assert [scheduler.next_store(1)['seconds'] for _ in range(3)] == [30, 20, 5]
+    assert scheduler.steals == 1
+    assert scheduler.next_store(0)['seconds'] == 40
+
+
+def test_next_store_is_none_once_every_deque_is_empty():
+    store_list = stores(10, 20)
+    scheduler = WorkStealingScheduler(3, history_for(store_list))
+    scheduler.deal(store_list)
+    taken = [scheduler.next_store(2), scheduler.next_store(2)]
+    assert sorted(store['seconds'] for store in taken) == [10, 20]
+    assert scheduler.next_store(0) is None
+    assert scheduler.empty()
+
+
+class ClosingBackend(FakeBackend):
+    def close(self):
+        self.closed = True
+
+
+def test_a_broken_worker_hands_its_stores_to_the_others(monkeypatch):
+    backends = []
+
+    def backend_factory():
+        backends.append(ClosingBackend(['one', 'two', 'three']))
+        return backends[-1]
+
+    def maybe_recycle(runner):
+        if runner.backend is backends[0]:
+            raise RuntimeError("browser restart failed")
+
+    monkeypatch.setattr(ExtractionRunner, 'maybe_recycle', maybe_recycle)
+    parallel = ParallelRunner(backend_factory, ['A', 'B'], YEAR, MONTH, workers=2, extract_type='financial',
+                              history=LatencyHistory(path=None), share_login=False)
+    records = parallel.run()
+    assert sorted((record['Regional'], record['Store']) for record in records) == \
+        sorted((regional, name) for regional in 'AB' for name in ['one', 'two', 'three'])
+    assert not any(failed(record) for record in records)
+    assert all(getattr(backend, 'closed', False) for backend in backends)
+
+
+def test_sessions_are_closed_when_the_run_fails(monkeypatch):
+    backends = []
+
+    def backend_factory():
+        backends.append(ClosingBackend(['one']))
+        return backends[-1]
+
+    def deal(self, stores):
+        raise RuntimeError("scheduler broke")
+
+    monkeypatch.setattr(WorkStealingScheduler, 'deal', deal)
+    parallel = ParallelRunner(backend_factory, ['A'], YEAR, MONTH, workers=2, extract_type='financial',
+                              history=LatencyHistory(path=None), share_login=False)
+    with pytest.raises(RuntimeError):
+        parallel.run()
+    assert len(backends) == 2 and all(getattr(backend, 'closed', False) for backend in backends)
@@ -0,0 +1,26 @@
+import pytest
+
+pytest.importorskip('pandas')
+
+from pmo_storage import DataStorage  # noqa: E402
+
+
+@pytest.fixture
+def storage(monkeypatch):
+    storage = DataStorage('pmo_test')
+    for fmt in ('csv', 'json', 'sqlite', 'text'):
+        monkeypatch.setattr(storage, f'save_to_{fmt}', lambda fmt=fmt: f'pmo_test.{fmt}')
+    return storage
+
+
+def test_save_formats_saves_the_selected_formats(storage):
+    assert storage.save_formats(['json', ' CSV ']) == [('CSV', 'pmo_test.csv'), ('JSON', 'pmo_test.json')]
+
+
+def test_save_formats_expands_all(storage):
+    assert [label for label, _ in storage.save_formats('all'.split(','))] == \
+        ['CSV', 'JSON', 'SQLite Database', 'Text Report']
+
+
+def test_save_formats_ignores_unknown_formats(storage):
+    assert storage.save_formats(['xlsx', 'text']) == [('Text Report', 'pmo_test.text')]
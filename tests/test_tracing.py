@@ -0,0 +1,49 @@
+import json
+import time
+
+import pytest
+
+from pmo_pacing import Pacer
+from pmo_tracing import Tracer
+
+
+def events(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)['traceEvents']
+
+
+def test_pacer_waits_become_sleep_spans_without_patching_time_sleep(tmp_path):
+    sleep = time.sleep
+    tracer = Tracer(str(tmp_path / 'trace.json'))
+    pacer = Pacer('normal')
+    tracer.attach_sleeps(pacer)
+    with tracer.span('store', 'store', {'store': 'KG A01 Store'}):
+        pacer.sleep('grid', 0.02)
+    assert time.sleep is sleep
+    tracer.write()
+    assert pacer.tracer is None
+
+    trace = events(tmp_path / 'trace.json')
+    assert [event['dur'] >= 15000 for event in trace if event['name'] == 'sleep'] == [True]
+    store = next(event for event in trace if event.get('cat') == 'store')
+    assert store['args']['sleep_ms'] >= 15
+
+
+def test_runner_retry_waits_are_traced(tmp_path):
+    pytest.importorskip('requests')
+    from pmo_retry import RetryQueue
+    from pmo_runner import ExtractionRunner
+    from test_runner import FakeBackend
+    from conftest import YEAR, MONTH
+
+    tracer = Tracer(str(tmp_path / 'trace.json'))
+    retry_queue = RetryQueue(base_delay=0.01, jitter=0)
+    runner = ExtractionRunner(FakeBackend(['one', 'two'], select_failures={'two': 2}), ['A'], YEAR, MONTH,
+                              'financial', retry_queue=retry_queue, tracer=tracer)
+    runner.run()
+    tracer.write()
+    assert retry_queue.tracer is None
+
+    trace = events(tmp_path / 'trace.json')
+    assert any(event['name'] == 'sleep' for event in trace)
+    assert sum(1 for event in trace if event.get('cat') == 'store') == 4